@@ -34,6 +34,19 @@ def create_app(config_name='development'):
     app.register_blueprint(users_bp)
     
     print(" All blueprints registered")
+
+    from app.agents.llm_init import warm_up_llm_clients, get_llm_client_stats
+    from app.agents.llm_cache import get_llm_cache_stats
+    from app.external.google_maps.places_cache import get_places_cache_stats
+    from app.external.google_maps.geocode import get_geocode_cache_stats
+    from app.external.openweather.weather import get_weather_cache_stats
+    from app.utils.async_runtime import get_async_runtime_stats
+    from app.utils.metrics import get_metrics
+
+    try:
+        warm_up_llm_clients()
+    except Exception as e:
+        print(f" LLM client warm-up failed: {e}")
     
     @app.route('/')
     def index():
@@ -46,5 +59,17 @@ def create_app(config_name='development'):
     @app.route('/health')
     def health():
         return {"status": "healthy"}, 200
+
+    @app.route('/metrics')
+    def metrics():
+        return {
+            "llm_clients": get_llm_client_stats(),
+            "llm_cache": get_llm_cache_stats(),
+            "places_cache": get_places_cache_stats(),
+            "geocode_cache": get_geocode_cache_stats(),
+            "weather_cache": get_weather_cache_stats(),
+            "async_runtime": get_async_runtime_stats(),
+            **get_metrics()
+        }, 200
     
     return app
@@ -0,0 +1,99 @@
+import os
+
+from app.agents.llm_init import get_llm
+from app.database.chat_storage import get_conversation_context, get_conversation_runs, update_conversation_summary
+
+# -------------------------
+# CONFIG
+# -------------------------
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "4"))
+CONTEXT_MAX_MESSAGE_CHARS = 600
+SUMMARY_MAX_WORDS = 120
+
+# Rough token budget for the history block of each agent prompt.
+CONTEXT_TOKEN_BUDGETS = {
+    "supervisor": 600,
+    "initial_agent": 1200,
+    "route_extract": 1200,
+    "general_chat": 1000,
+    "follow_up": 500,
+}
+DEFAULT_TOKEN_BUDGET = 800
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for Gemini on English text.
+    return len(str(text)) // 4 + 1
+
+
+def _clip(text, max_chars=CONTEXT_MAX_MESSAGE_CHARS):
+    text = str(text)
+    return text if len(text) <= max_chars else text[:max_chars] + "…"
+
+
+def build_conversation_context(conversation_id, agent="default", conversation=None):
+    """History block for an agent prompt: rolling summary + last N turns verbatim.
+
+    Oldest verbatim messages are dropped first, then the summary is clipped, until
+    the block fits the agent's token budget. Returns the same list-of-dicts shape
+    as get_conversation_messages, with the summary as a leading {"role": "summary"} entry.
+    """
+    budget = CONTEXT_TOKEN_BUDGETS.get(agent, DEFAULT_TOKEN_BUDGET)
+    conversation = conversation or get_conversation_context(conversation_id, CONTEXT_RECENT_TURNS)
+
+    recent = [{"role": m["role"], "content": _clip(m["content"])} for m in conversation["recent_messages"]]
+    summary = conversation.get("summary") or ""
+
+    def used():
+        return estimate_tokens(summary) + sum(estimate_tokens(m["content"]) + 2 for m in recent)
+
+    # Always keep the latest message; drop older turns until we fit.
+    while len(recent) > 1 and used() > budget:
+        recent.pop(0)
+
+    if summary and used() > budget:
+        remaining_chars = max(0, (budget - used() + estimate_tokens(summary)) * 4)
+        summary = _clip(summary, remaining_chars) if remaining_chars else ""
+
+    context = [{"role": "summary", "content": summary}] if summary else []
+    return context + recent
+
+
+def update_rolling_summary(conversation_id):
+    """Fold turns that have scrolled out of the verbatim window into the stored summary.
+
+    Incremental: only runs between the last summarized run and the verbatim window
+    are sent to the LLM, together with the previous summary.
+    """
+    conversation = get_conversation_context(conversation_id, CONTEXT_RECENT_TURNS)
+    summarized_runs = conversation["summarized_runs"]
+    fold_until = conversation["run_count"] - CONTEXT_RECENT_TURNS
+
+    if fold_until <= summarized_runs:
+        return conversation["summary"]
+
+    new_messages = get_conversation_runs(conversation_id, summarized_runs, fold_until)
+    if not new_messages:
+        return conversation["summary"]
+
+    transcript = "\n".join(f"{m['role']}: {_clip(m['content'])}" for m in new_messages)
+    prompt = f"""
+        You maintain the running summary of a conversation between a user and a travel assistant.
+
+        Previous summary:
+        {conversation["summary"] or "(none)"}
+
+        New messages to fold in:
+        {transcript}
+
+        Write the updated summary in at most {SUMMARY_MAX_WORDS} words. Keep destinations, dates,
+        travellers, budgets, chosen plans and bookings; drop greetings and small talk.
+        Output the summary text only.
+    """
+
+    summary = get_llm().invoke(prompt).text.strip()
+    if update_conversation_summary(conversation_id, summary, fold_until):
+        print(f" Rolling summary updated for {conversation_id} (runs folded: {fold_until})")
+    else:
+        print(f" Rolling summary for {conversation_id} skipped: a newer fold is already stored")
+    return summary
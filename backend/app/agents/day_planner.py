@@ -0,0 +1,145 @@
+import os
+import time
+
+import numpy as np
+
+from app.utils.metrics import incr, observe
+from app.utils.routing import improve_route
+
+# -------------------------
+# CONFIG
+# -------------------------
+DAY_PLANNER_TIME_BUDGET_MS = int(os.getenv("DAY_PLANNER_TIME_BUDGET_MS", "50"))
+DAY_CAPACITY_SLACK = 1.2  # a day may take up to 20% more dwell time than the even share
+KMEDOIDS_MAX_ITER = 10
+DEFAULT_TRIP_DAYS = 3
+
+DEFAULT_DWELL_MIN = 90
+DWELL_BY_TYPE = {
+    "amusement_park": 180,
+    "beach": 180,
+    "zoo": 150,
+    "natural_feature": 120,
+    "museum": 120,
+    "aquarium": 120,
+    "shopping_mall": 120,
+    "park": 90,
+    "art_gallery": 90,
+    "tourist_attraction": 90,
+    "hindu_temple": 60,
+    "place_of_worship": 60,
+    "church": 45,
+    "mosque": 45,
+}
+
+
+def estimate_dwell_min(types):
+    """Rough minutes spent at a spot, from its Places types."""
+    known = [DWELL_BY_TYPE[t] for t in (types or []) if t in DWELL_BY_TYPE]
+    return max(known) if known else DEFAULT_DWELL_MIN
+
+
+def _finite(matrix):
+    m = np.asarray(matrix, dtype=np.float64)
+    m = (m + m.T) / 2
+    finite = m[np.isfinite(m)]
+    return np.where(np.isfinite(m), m, (finite.max() if finite.size else 1.0) * 10 + 1)
+
+
+def _assign_with_capacity(cost, dwell, capacity):
+    """Nearest-medoid assignment, highest-regret spots first, respecting day capacity."""
+    n, k = cost.shape
+    if k > 1:
+        two_best = np.sort(cost, axis=1)[:, :2]
+        regret = two_best[:, 1] - two_best[:, 0]
+    else:
+        regret = np.zeros(n)
+
+    load = np.zeros(k)
+    assignment = np.full(n, -1, dtype=np.intp)
+    for i in np.argsort(-regret, kind="stable"):
+        for c in np.argsort(cost[i], kind="stable"):
+            if load[c] + dwell[i] <= capacity:
+                break
+        else:
+            c = int(np.argmin(load))
+        assignment[i] = c
+        load[c] += dwell[i]
+    return assignment
+
+
+def cluster_spots(time_matrix, hotel_min, dwell, num_days):
+    """Capacity-aware k-medoids over spot-to-spot travel time. Returns lists of spot indices."""
+    n = len(dwell)
+    k = max(1, min(num_days, n))
+    d = _finite(time_matrix)
+    hotel = np.nan_to_num(np.asarray(hotel_min, dtype=np.float64), nan=0.0)
+    capacity = max(dwell.sum() / k * DAY_CAPACITY_SLACK, dwell.max())
+
+    # Deterministic farthest-first seeding, starting from the spot farthest from the hotel.
+    medoids = [int(np.argmax(hotel))]
+    while len(medoids) < k:
+        nearest = d[:, medoids].min(axis=1)
+        nearest[medoids] = -1
+        medoids.append(int(np.argmax(nearest)))
+
+    for _ in range(KMEDOIDS_MAX_ITER):
+        assignment = _assign_with_capacity(d[:, medoids], dwell, capacity)
+        updated = []
+        for c in range(k):
+            members = np.flatnonzero(assignment == c)
+            if len(members) == 0:
+                updated.append(medoids[c])
+                continue
+            within = d[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[np.argmin(within)]))
+        if updated == medoids:
+            break
+        medoids = updated
+
+    clusters = [np.flatnonzero(assignment == c).tolist() for c in range(k)]
+    clusters = [c for c in clusters if c]
+    # Day 1 is the area closest to the hotel.
+    clusters.sort(key=lambda members: float(hotel[members].mean()))
+    return clusters
+
+
+def route_day(members, time_matrix, hotel_min, deadline=None):
+    """Order one day's spots as a hotel ➜ spots ➜ hotel loop. Returns (ordered indices, travel minutes)."""
+    if not members:
+        return [], 0.0
+
+    # Node 0 is the hotel, node i + 1 is members[i].
+    hotel = np.nan_to_num(np.asarray(hotel_min, dtype=np.float64)[members], nan=0.0)
+    nodes = np.zeros((len(members) + 1, len(members) + 1))
+    nodes[0, 1:] = nodes[1:, 0] = hotel
+    nodes[1:, 1:] = np.asarray(time_matrix, dtype=np.float64)[np.ix_(members, members)]
+
+    seed = [0] + [i + 1 for i in np.argsort(hotel, kind="stable")]
+    budget_ms = None if deadline is None else max(0.0, (deadline - time.perf_counter()) * 1000)
+    tour, lengths = improve_route(nodes, initial=seed, closed=True, time_budget_ms=budget_ms)
+    return [members[node - 1] for node in tour[1:]], lengths["final"]
+
+
+def plan_days(spots, time_matrix, num_days):
+    """Cluster `spots` (a SpotTable) into `num_days` areas and route each day.
+
+    Returns [[spot index, ...], ...] with Day 1 first.
+    """
+    start = time.perf_counter()
+    if len(spots) == 0:
+        return []
+
+    dwell = np.array([estimate_dwell_min(t) for t in spots.types], dtype=np.float64)
+    clusters = cluster_spots(time_matrix, spots.hotel_min, dwell, num_days or DEFAULT_TRIP_DAYS)
+
+    deadline = start + DAY_PLANNER_TIME_BUDGET_MS / 1000
+    days = []
+    for n, members in enumerate(clusters, start=1):
+        ordered, travel_min = route_day(members, time_matrix, spots.hotel_min, deadline)
+        days.append(ordered)
+        print(f"   Day {n}: {len(ordered)} spots, ~{travel_min:.0f} min travel, ~{dwell[ordered].sum():.0f} min at spots")
+
+    observe("day_planner.plan_days", time.perf_counter() - start)
+    incr("day_planner.days", len(days))
+    return days
@@ -1,4 +1,4 @@
-from app.database.chat_storage import get_conversation_messages
+from app.agents.context_builder import build_conversation_context
 from datetime import datetime
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
@@ -7,7 +7,7 @@ from app.agents.llm_init import get_llm
 def general_chat_agent(state):
     user_query = state["user_query"]
 
-    conversation_messages = get_conversation_messages(state["conversation_id"])
+    conversation_messages = build_conversation_context(state["conversation_id"], "general_chat", state.get("conversation_history"))
     system_instruction = f"""
         You are a General Conversation & Context Agent in a travel assistant system.
 
@@ -30,7 +30,7 @@ def general_chat_agent(state):
 
         INPUTS YOU'RE GIVEN WITH:
         1. current user query: {state["user_query"]}
-        2. last 4 conversation b/w user and assistant: {conversation_messages[:4]}
+        2. last 4 conversation b/w user and assistant: {conversation_messages}
         3.  current date and time : {datetime.now()}
 
         GREETING HANDLING:
@@ -1,20 +1,16 @@
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from app.database.chat_storage import get_conversation_messages
+from app.agents.context_builder import build_conversation_context
 from langgraph.types import Command
 from typing import TypedDict, Annotated, List, Literal, Any, Dict
 from datetime import datetime, timedelta
 import json
-from app.agents.llm_init import get_llm
+from app.agents.llm_init import get_llm, DEFAULT_MODEL
+from app.agents.llm_cache import cached_llm_json
 
 # 9.  If you have more question to be asked then do not ask more then two questions to the user.
 
-def _initial_agent(state) :
-
-    conversation_messages_list = get_conversation_messages(state["conversation_id"])
-
-    user_query = state["messages"][-1].content
-
-    system_prompt = f"""
+def _build_initial_agent_prompt(user_query, conversation_messages_list, current_time):
+    return f"""
         You are a travel intent analyzer.
 
         Your job is to extract intent and entities from the CURRENT user query.
@@ -50,7 +46,7 @@ def _initial_agent(state) :
         {conversation_messages_list}
 
         Current date:
-        {datetime.now()} -> if the user mentioned date do not take past date so ask clarification question.
+        {current_time} -> if the user mentioned date do not take past date so ask clarification question.
 
         If information is missing, set the field to null.
 
@@ -88,15 +84,29 @@ def _initial_agent(state) :
         }}
 """
 
-    raw_content = get_llm().invoke(system_prompt).content
 
-    clean_content = raw_content.strip()
+def _initial_agent(state) :
+
+    conversation_messages_list = build_conversation_context(state["conversation_id"], "initial_agent", state.get("conversation_history"))
+
+    user_query = state["messages"][-1].content
+
+    system_prompt = _build_initial_agent_prompt(user_query, conversation_messages_list, datetime.now())
+
+    def extract():
+        raw_content = get_llm().invoke(system_prompt).content
+
+        clean_content = raw_content.strip()
+
+        clean_content = clean_content.replace("```json", "")
+        clean_content = clean_content.replace("```", "")
+        clean_content = clean_content.strip()
 
-    clean_content = clean_content.replace("```json", "")
-    clean_content = clean_content.replace("```", "")
-    clean_content = clean_content.strip()
+        return json.loads(clean_content)
 
-    resp = json.loads(clean_content)
+    # Key on the prompt without the wall-clock time; the cache's date bucket covers "today".
+    cache_prompt = _build_initial_agent_prompt("", conversation_messages_list, "")
+    resp = cached_llm_json(DEFAULT_MODEL, cache_prompt, user_query, extract)
 
     origin_city = resp["origin_city"]
     destination_city = resp["destination_city"]
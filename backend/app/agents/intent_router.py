@@ -0,0 +1,92 @@
+import os
+import re
+
+# -------------------------
+# CONFIG
+# -------------------------
+# FAST_ROUTER_MODE:
+#   on     -> route locally when confidence >= threshold, else ask the Supervisor LLM
+#   shadow -> always ask the LLM, but log whether the local router agreed
+#   off    -> LLM only
+FAST_ROUTER_MODE = os.getenv("FAST_ROUTER_MODE", "on").lower()
+FAST_ROUTER_THRESHOLD = float(os.getenv("FAST_ROUTER_THRESHOLD", "0.85"))
+
+# scenario (as produced by the initial agent) -> worker node
+SCENARIO_AGENTS = {
+    "trip": "Iterationagent",
+    "flight": "FlightBookingagent",
+    "bus": "BusBookingAgent",
+    "hotel": "AccomodationAgent",
+}
+
+SCENARIO_PATTERNS = {
+    "trip": re.compile(r"\b(trip|itinerar(y|ies)|vacation|holiday|getaway|sightseeing|honeymoon|\d+\s*(days?|nights?))\b"),
+    "flight": re.compile(r"\b(flights?|fly|flying|airfare|airlines?|plane|air ticket)\b"),
+    "bus": re.compile(r"\b(bus|buses|coach)\b"),
+    "hotel": re.compile(r"\b(hotels?|accommodations?|accomodations?|lodging|resorts?|hostels?|homestay)\b"),
+}
+
+# Words that also show up when talking about an existing plan ("summarize plan 2",
+# "what's the stay like"). On their own they only hint at a scenario; the
+# Supervisor LLM makes the call.
+WEAK_SCENARIO_PATTERNS = {
+    "trip": re.compile(r"\b(plans?|tours?)\b"),
+    "hotel": re.compile(r"\b(stay|rooms?)\b"),
+}
+
+SMALL_TALK_PATTERN = re.compile(
+    r"^(hi+|hello+|hey+|hiya|yo|namaste|good (morning|afternoon|evening|night)|"
+    r"thanks?( you)?( so much)?|thank u|thx|ty|ok(ay)?|cool|great|awesome|nice|bye|goodbye|"
+    r"see you|how are you|who are you|what can you do)[\s!.?🙂😊👍]*$"
+)
+
+SUMMARY_PATTERN = re.compile(r"\b(summari[sz]e|explain|tell me more|more details|what is|what's)\b")
+
+
+def _matched_scenarios(text, patterns=SCENARIO_PATTERNS):
+    return [scenario for scenario, pattern in patterns.items() if pattern.search(text)]
+
+
+def classify_intent(user_query, initial_agent_done=False, scenario=None):
+    """Rule-based routing decision in the Supervisor's Router shape plus a confidence.
+
+    Returns {"next": <node>, "reasoning": str, "confidence": float}. A confidence
+    of 0.0 means "no opinion" and the caller should fall back to the LLM.
+    """
+    text = " ".join(str(user_query or "").lower().split())
+
+    # Second hop: the initial agent already classified the scenario.
+    if initial_agent_done and scenario:
+        agent = SCENARIO_AGENTS.get(str(scenario).lower().strip())
+        if agent:
+            return {"next": agent, "reasoning": f"initial agent resolved scenario '{scenario}'", "confidence": 0.97}
+
+    if not text:
+        return {"next": "GeneralChatagent", "reasoning": "empty query", "confidence": 0.9}
+
+    if SMALL_TALK_PATTERN.match(text):
+        return {"next": "GeneralChatagent", "reasoning": "greeting / small talk", "confidence": 0.95}
+
+    # Questions about a plan go to the LLM, whatever travel words they contain.
+    if SUMMARY_PATTERN.search(text):
+        return {"next": "GeneralChatagent", "reasoning": "question about a plan or place", "confidence": 0.7}
+
+    matched = _matched_scenarios(text)
+
+    if not matched:
+        weak = _matched_scenarios(text, WEAK_SCENARIO_PATTERNS)
+        if weak:
+            return {"next": "initialAgent", "reasoning": f"weak {', '.join(weak)} keyword only", "confidence": 0.6}
+
+    if len(matched) == 1:
+        if not initial_agent_done:
+            return {"next": "initialAgent", "reasoning": f"{matched[0]} intent, details not collected yet", "confidence": 0.9}
+        return {"next": SCENARIO_AGENTS[matched[0]], "reasoning": f"{matched[0]} intent", "confidence": 0.88}
+
+    if len(matched) > 1:
+        if not initial_agent_done:
+            # Any travel intent needs the initial agent first, whichever scenario wins.
+            return {"next": "initialAgent", "reasoning": f"travel intent ({', '.join(matched)})", "confidence": 0.86}
+        return {"next": "initialAgent", "reasoning": f"ambiguous scenarios: {', '.join(matched)}", "confidence": 0.4}
+
+    return {"next": "GeneralChatagent", "reasoning": "no rule matched", "confidence": 0.0}
@@ -0,0 +1,39 @@
+import os
+from datetime import date
+
+from app.utils.cache import TieredCache, make_cache_key, normalize_text
+
+# -------------------------
+# CONFIG
+# -------------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(6 * 3600)))
+LLM_CACHE_MAXSIZE = int(os.getenv("LLM_CACHE_MAXSIZE", "512"))
+
+_llm_cache = TieredCache("llm_responses", maxsize=LLM_CACHE_MAXSIZE, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+
+
+def llm_cache_key(model, system_prompt, user_text, date_bucket=None):
+    """Content address for an extraction call.
+
+    Prompts are compared after lower-casing and collapsing whitespace, and the
+    date bucket keeps answers that depend on "today" from leaking across days.
+    """
+    return make_cache_key(
+        model,
+        normalize_text(system_prompt),
+        normalize_text(user_text),
+        date_bucket or date.today().isoformat(),
+    )
+
+
+def cached_llm_json(model, system_prompt, user_text, compute):
+    """Return the cached parsed JSON for this extraction, or run `compute()` and store it."""
+    if not LLM_CACHE_ENABLED:
+        return compute()
+    key = llm_cache_key(model, system_prompt, user_text)
+    return _llm_cache.get_or_compute(key, compute)
+
+
+def get_llm_cache_stats():
+    return _llm_cache.stats()
@@ -1,21 +1,117 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_vertexai import ChatVertexAI
+from google import genai
+from google.oauth2 import service_account
+import itertools
+import threading
 import os
 
-def get_llm():
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=os.getenv("GOOGLE_API_KEY"))
+from app.utils.metrics import incr
 
-def get_llm2_0():
-    return ChatVertexAI(
-        model="gemini-2.0-flash",
-        project="anish-ai-planner",
-        location="us-central1"
+# -------------------------
+# CONFIG
+# -------------------------
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_TEMPERATURE = 0.0
+LLM_CLIENT_POOL_SIZE = max(1, int(os.getenv("LLM_CLIENT_POOL_SIZE", "1")))
+
+SERVICE_ACCOUNT_PATH = os.getenv("SERVICE_ACCOUNT_PATH")
+VERTEX_PROJECT = os.getenv("VERTEX_PROJECT")
+VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+SCOPES = os.getenv("SCOPES").split(",") if os.getenv("SCOPES") else ["https://www.googleapis.com/auth/cloud-platform"]
+
+
+# -------------------------
+# CLIENT REGISTRY
+# -------------------------
+# One pool of clients per (provider, model, temperature). Clients are built once
+# per process and handed out round-robin, so TLS/auth setup is paid only on the
+# first request instead of on every agent call.
+_registry_lock = threading.Lock()
+_pools = {}
+# Separate lock: client factories resolve credentials while _registry_lock is held.
+_credentials_lock = threading.Lock()
+_credentials = None
+
+
+class _ClientPool:
+    def __init__(self, factory, size):
+        self.clients = [factory() for _ in range(size)]
+        self._cycle = itertools.cycle(self.clients)
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            return next(self._cycle)
+
+
+def _get_client(key, factory):
+    pool = _pools.get(key)
+    if pool is None:
+        with _registry_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _ClientPool(factory, LLM_CLIENT_POOL_SIZE)
+                _pools[key] = pool
+                incr("llm_clients.created", len(pool.clients))
+                print(f" LLM client pool ready: {key} x{len(pool.clients)}")
+    incr("llm_clients.checkout")
+    return pool.next()
+
+
+def get_service_account_credentials():
+    global _credentials
+    if _credentials is None:
+        with _credentials_lock:
+            if _credentials is None:
+                _credentials = service_account.Credentials.from_service_account_file(
+                    SERVICE_ACCOUNT_PATH, scopes=SCOPES
+                )
+    return _credentials
+
+
+def get_llm(model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE):
+    return _get_client(
+        ("google_genai", model, temperature),
+        lambda: ChatGoogleGenerativeAI(model=model, temperature=temperature, api_key=os.getenv("GOOGLE_API_KEY")),
     )
 
 
+def get_llm2_0():
+    return _get_client(
+        ("vertexai", "gemini-2.0-flash", None),
+        lambda: ChatVertexAI(
+            model="gemini-2.0-flash",
+            project="anish-ai-planner",
+            location="us-central1"
+        ),
+    )
 
 
+def get_genai_client():
+    """Shared Vertex AI `genai.Client` used by the planner / re-planner."""
+    return _get_client(
+        ("vertex_genai", VERTEX_PROJECT, VERTEX_LOCATION),
+        lambda: genai.Client(
+            vertexai=True,
+            project=VERTEX_PROJECT,
+            location=VERTEX_LOCATION,
+            credentials=get_service_account_credentials(),
+        ),
+    )
 
 
+def warm_up_llm_clients():
+    get_llm()
+    if SERVICE_ACCOUNT_PATH and os.path.exists(SERVICE_ACCOUNT_PATH):
+        get_genai_client()
 
 
+def get_llm_client_stats():
+    with _registry_lock:
+        pools = {"/".join(str(part) for part in key): len(pool.clients) for key, pool in _pools.items()}
+    return {
+        "live_clients": sum(pools.values()),
+        "pools": pools,
+        "pool_size": LLM_CLIENT_POOL_SIZE,
+    }
@@ -1,6 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional, Dict, Tuple
-import random
 # from google import genai
 # from google import genai
 # import google.generativeai as genai
@@ -8,17 +7,32 @@ import random
 # from google.generativeai import types
 from google import genai
 from google.genai import types
-from google.oauth2 import service_account
 import aiohttp
 from aiohttp import ClientTimeout
 import httpx
 import json
 import time
-import math
+import numpy as np
 import asyncio
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.agents.llm_init import get_genai_client
+from app.agents.llm_cache import cached_llm_json
+from app.utils.metrics import incr
+from app.utils.json_repair import repair_json
+from app.external.google_maps.places_cache import cached_places_search
+from app.external.google_maps.place_index import places_within
+from app.external.google_maps.geocode import geocode_record
+from app.external.openweather.weather import annotate_weather
+from app.utils.async_runtime import client_session
+from app.utils.geo import pairwise_distance_km, pairwise_matrices, point_to_set_km, weighted_medoid_index
+from app.utils.routing import improve_route
+from app.agents.spot_table import SpotTable, day_plan_to_llm_json
+from app.agents.day_planner import plan_days
+from app.external.google_maps.distance_matrix import build_distance_matrix
 load_dotenv()
 
 # -------------------------
@@ -27,6 +41,9 @@ load_dotenv()
 PER_KM_COST = 15
 MAX_TRAVEL_DISTANCE_PER_SPOT = 150
 MAX_DAILY_TRAVEL_MIN = 480
+LOCAL_AVG_SPEED_KMPH = 35
+# cluster -> k-medoids days + per-day route improvement; greedy -> legacy nearest-next split
+DAY_PLANNER_MODE = os.getenv("DAY_PLANNER_MODE", "cluster").lower()
 
 SERVICE_ACCOUNT_PATH = os.getenv("SERVICE_ACCOUNT_PATH")
 VERTEX_PROJECT = os.getenv("VERTEX_PROJECT")
@@ -37,7 +54,6 @@ SCOPES = os.getenv("SCOPES").split(",") if os.getenv("SCOPES") else []
 
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 GOOGLE_API_KEY = GOOGLE_MAPS_API_KEY
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
 OUTPUT_FILE = "fast_output.json"
 
@@ -49,16 +65,7 @@ MODEL_ID = "gemini-2.5-flash-lite"
 # -------------------------
 # CLIENTS
 # -------------------------
-_credentials = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_PATH, scopes=SCOPES
-)
-
-_client = genai.Client(
-    vertexai=True,
-    project=VERTEX_PROJECT,
-    location=VERTEX_LOCATION,
-    credentials=_credentials,
-)
+# Vertex client comes from the process-wide registry in llm_init.
 
 
 # -------------------------
@@ -92,12 +99,7 @@ def get_structured_trip_details(user_prompt: str) -> Optional[TripDetails]:
 
     try:
 
-        client = genai.Client(
-            vertexai=True,
-            project=VERTEX_PROJECT,
-            location=VERTEX_LOCATION,
-            credentials=_credentials,
-        )
+        client = get_genai_client()
 
         system_instruction = f"""
         You are an expert travel planner assistant. Convert the user's text into **strict JSON only**.
@@ -148,17 +150,19 @@ def get_structured_trip_details(user_prompt: str) -> Optional[TripDetails]:
         }}
         """
 
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=user_prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_schema=TripDetails,
-                response_mime_type="application/json",
-            ),
-        )
-
-        parsed_data = json.loads(response.text)
+        def extract():
+            response = client.models.generate_content(
+                model=MODEL_ID,
+                contents=user_prompt,
+                config=types.GenerateContentConfig(
+                    system_instruction=system_instruction,
+                    response_schema=TripDetails,
+                    response_mime_type="application/json",
+                ),
+            )
+            return json.loads(response.text)
+
+        parsed_data = cached_llm_json(MODEL_ID, system_instruction, user_prompt, extract)
         return TripDetails.model_validate(parsed_data)
 
     except Exception as e:
@@ -170,6 +174,18 @@ def get_structured_trip_details(user_prompt: str) -> Optional[TripDetails]:
 # STEP 2 – Places search (optimized)
 # -------------------------
 MIN_RATING = 3.5
+PLACES_SEARCH_CONCURRENCY = int(os.getenv("PLACES_SEARCH_CONCURRENCY", "4"))
+# Move the medoid anchor to the nearest lodging from a (cached) "hotels in <destination>" search
+HOTEL_ANCHOR_SNAP_LODGING = os.getenv("HOTEL_ANCHOR_SNAP_LODGING", "false").lower() == "true"
+HOTEL_SNAP_MAX_KM = float(os.getenv("HOTEL_SNAP_MAX_KM", "5"))
+# A geocoded state / country centre says nothing about where its spots are.
+BROAD_REGION_TYPES = {"country", "administrative_area_level_1"}
+
+# Post-LLM enrichment: connection cap when not on the shared async runtime (which pools
+# its own), and an optional deadline (seconds, 0 = wait for every plan) after which
+# only finished plans are returned.
+PIPELINE_CONNECTION_LIMIT = int(os.getenv("PIPELINE_CONNECTION_LIMIT", "20"))
+PIPELINE_DEADLINE_SECONDS = float(os.getenv("PIPELINE_DEADLINE_SECONDS", "0"))
 
 
 async def fetch_json(session, url, params):
@@ -178,12 +194,19 @@ async def fetch_json(session, url, params):
 
 
 async def places_text_search(session, query, location):
+    """Top text-search hits for `query` in `location` as trimmed spot records (cached)."""
+
+    async def fetch():
+        url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+        params = {"query": f"{query} in {location}", "key": GOOGLE_API_KEY}
+        data = await fetch_json(session, url, params)
+        if data.get("status") not in ("OK", "ZERO_RESULTS"):
+            print(f"⚠️ Places search '{query}' returned {data.get('status')}")
+            return None
+        # Limit per query to top 10 results to cap load
+        return [fetch_spot_data_from_text(place) for place in data.get("results", [])[:10]]
 
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    params = {"query": f"{query} in {location}", "key": GOOGLE_API_KEY}
-    data = await fetch_json(session, url, params)
-    # Limit per query to top 10 results to cap load
-    return data.get("results", [])[:10]
+    return await cached_places_search(query, location, "textsearch_top10", fetch)
 
 
 def fetch_spot_data_from_text(place):
@@ -199,9 +222,96 @@ def fetch_spot_data_from_text(place):
 
 
 def select_central_hotel_location(spots):
+    """Rating-weighted geometric medoid of `spots` (deterministic for a given spot set)."""
     if not spots:
         return {"lat": None, "lng": None}
-    return random.choice(spots)
+    ratings = np.array([np.nan if s.get("rating") is None else s["rating"] for s in spots], dtype=np.float64)
+    fill = np.nanmedian(ratings) if np.isfinite(ratings).any() else 1.0
+    weights = np.where(np.isfinite(ratings), ratings, fill)
+    anchor = weighted_medoid_index(spots, weights, tie_keys=[s.get("id") or s.get("name") for s in spots])
+    return dict(spots[anchor])
+
+
+def _within_radius(spots, radius_km, centre=None):
+    has_coords = [spot.get("lat") is not None and spot.get("lng") is not None for spot in spots]
+    located = [spot for spot, ok in zip(spots, has_coords) if ok]
+    if not located or not radius_km:
+        return spots
+    if centre is None:
+        medoid = select_central_hotel_location(located)
+        centre = (medoid["lat"], medoid["lng"])
+    distance = iter(point_to_set_km(centre, located).tolist())
+    # Spots without coordinates (resolved later) are kept.
+    return [spot for spot, ok in zip(spots, has_coords) if not ok or next(distance) <= radius_km]
+
+
+def filter_spots_by_radius(spots, radius_km, centre=None):
+    """Drop spots farther than `radius_km` from `centre` (lat, lng).
+
+    Without a geocoded centre, the spots' own rating-weighted medoid is used. Text
+    search happily returns same-named places in other regions; those end up far
+    from where the bulk of the results cluster.
+    """
+    kept = _within_radius(spots, radius_km, centre)
+    if len(kept) < len(spots):
+        incr("places.radius_filtered", len(spots) - len(kept))
+        print(f"   Dropped {len(spots) - len(kept)} spots outside {radius_km} km")
+    return kept
+
+
+def destination_centre(destination):
+    """Geocoded (lat, lng) of a city-sized destination; None for states / countries or failures."""
+    record = geocode_record(destination)
+    if not record or set(record.get("types") or []) & BROAD_REGION_TYPES:
+        return None
+    return record["lat"], record["lng"]
+
+
+async def snap_to_lodging(anchor, destination):
+    """Nearest well-rated lodging to `anchor` (within HOTEL_SNAP_MAX_KM), else `anchor` unchanged.
+
+    Lodging we have already seen is answered from the place index; otherwise a
+    (cached) "hotels in <destination>" search fills it.
+    """
+    if not HOTEL_ANCHOR_SNAP_LODGING or anchor.get("lat") is None:
+        return anchor
+
+    for hotel in places_within(anchor["lat"], anchor["lng"], HOTEL_SNAP_MAX_KM, kind="lodging"):
+        if (hotel.get("rating") or 0) >= MIN_RATING:
+            incr("hotel_anchor.snapped_local")
+            return hotel
+
+    try:
+        async with client_session() as session:
+            hotels = await places_text_search(session, "hotels", destination)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"⚠️ Lodging search failed for '{destination}': {e}")
+        return anchor
+
+    hotels = [h for h in hotels if h.get("lat") is not None and (h.get("rating") or 0) >= MIN_RATING]
+    if not hotels:
+        return anchor
+    distance = point_to_set_km((anchor["lat"], anchor["lng"]), hotels)
+    nearest = int(np.argmin(distance))
+    if distance[nearest] > HOTEL_SNAP_MAX_KM:
+        return anchor
+    incr("hotel_anchor.snapped")
+    return hotels[nearest]
+
+
+async def _search_qualified_spots(session, semaphore, query, location):
+    async with semaphore:
+        try:
+            results = await places_text_search(session, query, location)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            incr("places.search.error")
+            print(f"⚠️ Places search failed for '{query}': {e}")
+            return []
+
+    return [
+        spot for spot in results
+        if (spot.get("rating") or 0) >= MIN_RATING and spot.get("lat") is not None and spot.get("lng") is not None
+    ]
 
 
 async def run_step2(input_data: Dict) -> Dict:
@@ -216,24 +326,39 @@ async def run_step2(input_data: Dict) -> Dict:
     search_queries = [f"{kw} top attractions in {destination}" for kw in raw_keywords]
 
     all_spots = []
+    radius_km = input_data.get("search_radius_km")
+    # The destination centre for the radius filter resolves alongside the searches.
+    centre_task = asyncio.create_task(asyncio.to_thread(destination_centre, destination))
+
+    # Queries run concurrently (bounded), but results are consumed in keyword priority
+    # order and we stop at the same point the sequential loop would, so the spot list
+    # is identical to a one-at-a-time search. Anything still in flight is cancelled.
+    async with client_session() as session:
+        semaphore = asyncio.Semaphore(PLACES_SEARCH_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(_search_qualified_spots(session, semaphore, query, destination))
+            for query in search_queries
+        ]
 
-    async with aiohttp.ClientSession() as session:
-
-        for query in search_queries:
-
-            results = await places_text_search(session, query, destination)
-
-            for r in results:
-                if (
-                        r.get("rating", 0) >= MIN_RATING
-                        and r.get("geometry", {}).get("location")
-                ):
-                    all_spots.append(fetch_spot_data_from_text(r))
-
-            if len(all_spots) >= max_spots_required:
-                break
+        try:
+            centre = await centre_task
+            for task in tasks:
+                all_spots.extend(await task)
+                # Stop once enough spots survive the radius filter, not just once
+                # enough came back: out-of-region hits must not end the search early.
+                unique_spots = list({spot["id"]: spot for spot in all_spots}.values())
+                if len(_within_radius(unique_spots, radius_km, centre)) >= max_spots_required:
+                    break
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if pending:
+                incr("places.search.cancelled", len(pending))
 
     unique_spots = list({spot["id"]: spot for spot in all_spots}.values())
+    unique_spots = filter_spots_by_radius(unique_spots, radius_km, centre)
     final_spots = unique_spots[:max_spots_required]
 
     if len(final_spots) == 0:
@@ -244,9 +369,9 @@ async def run_step2(input_data: Dict) -> Dict:
         }
 
     return {
-        "spots": final_spots,
-        "hotel_location": select_central_hotel_location(final_spots),
-
+        "spots": SpotTable.from_records(final_spots),
+        "hotel_location": await snap_to_lodging(select_central_hotel_location(final_spots), destination),
+        "duration_days": input_data.get("duration_days"),
     }
 
 
@@ -254,70 +379,18 @@ async def run_step2(input_data: Dict) -> Dict:
 # -------------------------
 # Distance helpers
 # -------------------------
-async def build_distance_matrix_async(
-    origins: List[Tuple[float, float]], destinations: List[Tuple[float, float]]
-) -> Dict:
-
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-    origin_str = "|".join([f"{lat},{lng}" for lat, lng in origins])
-    dest_str = "|".join([f"{lat},{lng}" for lat, lng in destinations])
-    params = {
-        "origins": origin_str,
-        "destinations": dest_str,
-        "key": GOOGLE_MAPS_API_KEY,
-        "units": "metric",
-    }
-
-    async with httpx.AsyncClient(timeout=20) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-
-
 def estimate_travel_cost(distance_km: float) -> int:
     return int(distance_km * PER_KM_COST)
 
 
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = (
-        math.sin(dphi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    )
-    return 2 * R * math.asin(math.sqrt(a))
-
-
-def build_local_spot_to_spot_matrix(spots: List[Dict]) -> Dict[str, Dict[str, Dict[str, float]]]:
-    AVG_SPEED_KMPH = 35
-    matrix: Dict[str, Dict[str, Dict[str, float]]] = {}
-
-    for i, s1 in enumerate(spots):
-        s1_name = s1["name"]
-        matrix[s1_name] = {}
-        lat1, lng1 = s1["lat"], s1["lng"]
-
-        for j, s2 in enumerate(spots):
-            if i == j:
-                continue
-            lat2, lng2 = s2["lat"], s2["lng"]
-            dist_km = haversine_km(lat1, lng1, lat2, lng2)
-            time_min = (dist_km / AVG_SPEED_KMPH) * 60 if AVG_SPEED_KMPH > 0 else 0
-            matrix[s1_name][s2["name"]] = {
-                "distance_km": round(dist_km, 1),
-                "time_min": round(time_min, 1),
-            }
-
-    return matrix
-
-
 # -------------------------
 # STEP 3 – Distance + cost (optimized)
 # -------------------------
 async def process_spots(step2_data: Dict) -> Dict:
-    """Processes hotel–spot and spot–spot distance features (few API calls)."""
+    """Hotel ➜ spot legs from the Distance Matrix API plus a local spot ➜ spot matrix.
+
+    Returns the filtered SpotTable and dense matrices indexed by its positions.
+    """
 
     if "error" in step2_data:
         return step2_data
@@ -325,57 +398,29 @@ async def process_spots(step2_data: Dict) -> Dict:
     start_total = time.time()
 
     hotel = step2_data["hotel_location"]
-    spots = step2_data["spots"]
-
-    origins = [(hotel["lat"], hotel["lng"])]
-    destinations = [(s["lat"], s["lng"]) for s in spots]
+    spots: SpotTable = step2_data["spots"]
 
     print("\n🚀 STEP 3.1: Distance Matrix for Hotel ➜ Spots...")
     start_hotel_to_spots = time.time()
 
-    dm_response = await build_distance_matrix_async(origins, destinations)
+    hotel_row = await build_distance_matrix([(hotel["lat"], hotel["lng"])], spots.coords().tolist())
+    spots.hotel_km = np.array([np.nan if d is None else d for d in hotel_row["distance_km"][0]])
+    spots.hotel_min = np.array([np.nan if t is None else t for t in hotel_row["time_min"][0]])
 
     hotel_to_spots_time = round(time.time() - start_hotel_to_spots, 2)
 
-    results = []
-    budget_used = 0
-
-    for i, row in enumerate(dm_response["rows"][0]["elements"]):
-        spot = spots[i]
-        if row["status"] != "OK":
-            continue
-
-        dist_km = round(row["distance"]["value"] / 1000, 2)
-        time_min = round(row["duration"]["value"] / 60, 1)
-
-        if dist_km > MAX_TRAVEL_DISTANCE_PER_SPOT:
-            continue
-
-        travel_cost = estimate_travel_cost(dist_km)
-        budget_used += travel_cost
-
-        results.append(
-            {
-                "name": spot["name"],
-                "distance_from_hotel_km": dist_km,
-                "travel_time_min": time_min,
-                "travel_cost": travel_cost,
-                "entry_fee": spot.get("entry_fee", 0),
-                "lat": spot["lat"],
-                "lng": spot["lng"],
-            }
-        )
+    reachable = np.flatnonzero(~np.isnan(spots.hotel_km) & (spots.hotel_km <= MAX_TRAVEL_DISTANCE_PER_SPOT))
+    spots = spots.subset(reachable)
+    budget_used = sum(estimate_travel_cost(d) for d in spots.hotel_km.tolist())
 
     print(f"✅ Hotel ➜ Spots completed in {hotel_to_spots_time}s")
 
     print("\n🌍 STEP 3.2: Local Spot ➜ Spot matrix (no API)...")
     start_spot_to_spot = time.time()
 
-    filtered_spots = [
-        {"name": r["name"], "lat": r["lat"], "lng": r["lng"]} for r in results
-    ]
-
-    pair_matrix = build_local_spot_to_spot_matrix(filtered_spots)
+    distance_km, time_min = pairwise_matrices(spots.coords(), speed_kmph=LOCAL_AVG_SPEED_KMPH)
+    # Same 0.1 resolution the optimizer always compared on.
+    distance_km, time_min = np.round(distance_km, 1), np.round(time_min, 1)
 
     spot_to_spot_time = round(time.time() - start_spot_to_spot, 2)
     total_time = round(time.time() - start_total, 2)
@@ -384,8 +429,9 @@ async def process_spots(step2_data: Dict) -> Dict:
     print(f"\n⏱️ TOTAL Step 3 processing time: {total_time}s")
 
     return {
-        "spots_distance_features": results,
-        "distance_matrix": pair_matrix,
+        "spots": spots,
+        "distance_km": distance_km,
+        "time_min": time_min,
         "budget_used_so_far": budget_used,
         "travel_constraints": {"max_daily_travel_min": MAX_DAILY_TRAVEL_MIN},
         "time_taken": {
@@ -400,9 +446,18 @@ async def process_spots(step2_data: Dict) -> Dict:
 # JSON Auto Fixer
 # ===========================
 def fix_broken_json(bad_json: str) -> dict:
-    """Repair malformed or truncated JSON using Gemini safely."""
+    """Repair malformed or truncated JSON locally, falling back to Gemini only if that fails."""
     print("⚙️ Attempting to auto-fix malformed JSON...")
 
+    try:
+        fixed = repair_json(bad_json, required_keys=("hotel", "itinerary"))
+        incr("fix_broken_json.local")
+        print("✅ JSON repaired locally")
+        return fixed
+    except ValueError as e:
+        incr("fix_broken_json.llm")
+        print(f"⚠️ Local JSON repair failed ({e}), asking Gemini...")
+
     cleaned_json = bad_json.strip()
     if cleaned_json.startswith("```json") and cleaned_json.endswith("```"):
         cleaned_json = cleaned_json[7:-3].strip()
@@ -427,7 +482,7 @@ def fix_broken_json(bad_json: str) -> dict:
         response_mime_type="application/json",
         temperature=0.0,
     )
-    repair_response = _client.models.generate_content(
+    repair_response = get_genai_client().models.generate_content(
         model=MODEL_ID,
         contents=repair_prompt,
         config=repair_config,
@@ -444,60 +499,117 @@ def fix_broken_json(bad_json: str) -> dict:
 # ===========================
 # Day plan optimizer (hotel ➜ spots using local matrix)
 # ===========================
-def optimize_day_plan(step2_data: Dict, step3_data: Dict) -> Dict:
-    start_time = time.time()
-
-    hotel = step2_data["hotel_location"]
-    spots = step3_data["spots_distance_features"]
-    distance_matrix = step3_data["distance_matrix"]
-    max_daily_travel_min = step3_data["travel_constraints"]["max_daily_travel_min"]
+def _greedy_day_split(spots: SpotTable, time_matrix, max_daily_travel_min) -> List[List[int]]:
+    """Original nearest-next split: fill a day until its travel budget runs out."""
+    remaining = np.argsort(spots.hotel_km, kind="stable").tolist()
+    days: List[List[int]] = []
 
-    spots.sort(key=lambda x: x["distance_from_hotel_km"])
-
-    days_output: Dict[str, List[Dict]] = {}
-    current_day = 1
-    remaining_spots = spots[:]
-    precomputed = {loc: distance_matrix.get(loc, {}) for loc in distance_matrix}
-
-    while remaining_spots:
-        day_key = f"Day {current_day}"
-        days_output[day_key] = []
+    while remaining:
+        day: List[int] = []
         travel_used = 0
-        current_loc = "hotel"
+        current = None
 
-        while remaining_spots:
-            if current_loc == "hotel":
-                next_spot = remaining_spots[0]
-                travel_time = next_spot["travel_time_min"]
+        while remaining:
+            if current is None:
+                next_spot = remaining[0]
+                travel_time = spots.hotel_min[next_spot]
             else:
-                lookup = precomputed.get(current_loc, {})
-                next_spot = min(
-                    remaining_spots,
-                    key=lambda s: lookup.get(s["name"], {}).get("time_min", 999999),
-                )
-                travel_time = lookup.get(next_spot["name"], {}).get("time_min", 0)
-
-            if travel_used + travel_time > max_daily_travel_min:
+                row = time_matrix[current, remaining]
+                pos = int(np.argmin(row))
+                next_spot = remaining[pos]
+                travel_time = row[pos]
+
+            # A spot too far to fit any day still gets a day of its own.
+            if day and travel_used + travel_time > max_daily_travel_min:
                 break
 
             travel_used += travel_time
-            days_output[day_key].append(
-                {"name": next_spot["name"], "lat": next_spot["lat"], "lng": next_spot["lng"]}
-            )
-            current_loc = next_spot["name"]
-            remaining_spots.remove(next_spot)
+            day.append(next_spot)
+            current = next_spot
+            remaining.remove(next_spot)
+
+        days.append(day)
+
+    return days
+
+
+def optimize_day_plan(step2_data: Dict, step3_data: Dict) -> Dict:
+    """Split the spots into days: geographic clusters routed per day (or the legacy greedy split).
+
+    Returns {"days": [[spot index, ...], ...], "spots": SpotTable, "hotel_location": ...};
+    day_plan_to_llm_json turns it into the formatter's prompt payload.
+    """
+    start_time = time.time()
+
+    hotel = step2_data["hotel_location"]
+    spots: SpotTable = step3_data["spots"]
+    time_matrix = step3_data["time_min"]
 
-        current_day += 1
+    if DAY_PLANNER_MODE == "greedy":
+        days = _greedy_day_split(spots, time_matrix, step3_data["travel_constraints"]["max_daily_travel_min"])
+    else:
+        days = plan_days(spots, time_matrix, step2_data.get("duration_days"))
 
-    days_output["hotel_location"] = hotel
-    print(f"⏱ optimize_day_plan done in {time.time() - start_time:.2f} sec")
-    return days_output
+    print(f"⏱ optimize_day_plan ({DAY_PLANNER_MODE}) done in {time.time() - start_time:.2f} sec")
+    return {"days": days, "spots": spots, "hotel_location": hotel}
 
 
 # ===========================
 # STEP 3 → 4 – LLM itinerary formatter
 # ===========================
-def format_itinerary_with_llm(itinerary_data, user_query):
+class ItineraryActivity(BaseModel):
+    spot_name: str
+    lat: float
+    long: float
+    description: str
+    estimated_time_spent: str
+
+
+class ItineraryDay(BaseModel):
+    day: str
+    activities: List[ItineraryActivity]
+
+
+class ItineraryHotel(BaseModel):
+    name: str
+    lat: float
+    lng: float
+    rating: Optional[float] = None
+    types: List[str] = []
+    open_now: Optional[bool] = None
+
+
+class ItineraryPlan(BaseModel):
+    date: str
+    duration_days: int
+    itinerary_name: str
+    hotel: ItineraryHotel
+    itinerary: List[ItineraryDay]
+
+
+_ITINERARY_PLANS_ADAPTER = TypeAdapter(List[ItineraryPlan])
+_ITINERARY_PLAN_ADAPTER = TypeAdapter(ItineraryPlan)
+
+FORMATTER_NUM_PLANS = 3
+FORMATTER_PARALLEL_PLANS = os.getenv("FORMATTER_PARALLEL_PLANS", "true").lower() != "false"
+PLAN_THEMES = ["classic highlights", "relaxed and scenic", "local culture and food"]
+_plan_executor = ThreadPoolExecutor(max_workers=FORMATTER_NUM_PLANS * 2, thread_name_prefix="plan-formatter")
+
+
+def _itinerary_days_to_dict(plan: Dict) -> Dict:
+    """Schema output lists days as [{"day": "Day 1", "activities": [...]}]; the pipeline expects {"Day 1": [...]}."""
+    days = plan.get("itinerary") if isinstance(plan, dict) else None
+    if isinstance(days, list):
+        plan["itinerary"] = {
+            d.get("day") or f"Day {i + 1}": d.get("activities", [])
+            for i, d in enumerate(days)
+            if isinstance(d, dict)
+        }
+    return plan
+
+
+def _format_all_plans_with_llm(itinerary_data, user_query):
+    """Single call producing all three plans (pre-partitioning behaviour)."""
     start_time = time.time()
 
     prompt = f"""
@@ -516,46 +628,16 @@ def format_itinerary_with_llm(itinerary_data, user_query):
     1️⃣ Group nearby spots on the same day to minimize travel.
     2️⃣ Start each day near the hotel and pick user-requested or nearby places.
     3️⃣ Allocate realistic durations (1–2h for small spots, 3–5h for beaches, etc).
-    4️⃣ Each plan must be a **valid JSON object** matching the schema below.
-    5️⃣ Output an array containing 3 such plans — `[plan1, plan2, plan3]`.
-
-    ⚙️ SCHEMA for each plan:
-    {{
-        "date":"YYYY-MM-DD",
-        "duration_days":int,
-        "itinerary_name": "2-3 word catchy itinerary name",
-        "hotel":{{
-            "name": "Uv Bar",
-            "lat": 15.5793064,
-            "lng": 73.7388843,
-            "rating": 3.9,
-            "types": [
-                "bar",
-                "establishment",
-                "night_club",
-                "point_of_interest"
-            ],
-            "open_now": true
-        }},
-        "itinerary":{{
-            "Day 1":[{{
-                "spot_name": "Dream Beach",
-                "lat": 15.0,
-                "long": 73.9,
-                "description": "very crisp description",
-                "estimated_time_spent": "2 hours",
-            }},
-            {{
-                "spot_name": "Goosebumps Virtual Escape",
-                "lat": 15.1,
-                "long": 73.95,
-                "description": "very crisp description",
-                "estimated_time_spent": "1.5 hours",
-            }}],
-            "Day 2":[ ... ],
-            "Day n":[ ... ]
-        }}
-    }}
+    4️⃣ Output an array containing 3 plans — `[plan1, plan2, plan3]` — in the response schema.
+
+    ⚙️ Each plan:
+    - "date": "YYYY-MM-DD"
+    - "duration_days": number of days
+    - "itinerary_name": 2-3 word catchy itinerary name
+    - "hotel": the hotel_location from the JSON (name, lat, lng, rating, types, open_now)
+    - "itinerary": one entry per day, in order: {{"day": "Day 1", "activities": [...]}}
+      where each activity has spot_name, lat, long, a very crisp description and
+      estimated_time_spent (e.g. "2 hours").
 
     📏 RULES:
     - If the user mentions a number of days, plan **exactly that many days** (Day 1 … Day N).
@@ -565,11 +647,9 @@ def format_itinerary_with_llm(itinerary_data, user_query):
     - Each plan should have **unique spots**, no overlap between plans.
     - Use at least two of the given places whenever possible. For the remaining spots, you may use your internal knowledge with accurate latitude/longitude.
     - The total `estimated_time_spent` per day must not exceed 9 hours.
-    - Output **pure JSON only**, no explanations or comments.
 
     User request: {user_query}
-    Optimized spots JSON: {json.dumps(itinerary_data, separators=(',', ':'))}
-    Now think carefully and output only the final JSON — no explanations.
+    Optimized spots JSON: {json.dumps(day_plan_to_llm_json(itinerary_data), separators=(',', ':'))}
     """
 
     config = types.GenerateContentConfig(
@@ -577,17 +657,60 @@ def format_itinerary_with_llm(itinerary_data, user_query):
         top_p=0.8,
         max_output_tokens=24000,
         response_mime_type="application/json",
+        response_schema=List[ItineraryPlan],
     )
 
-    response = _client.models.generate_content(
+    response = get_genai_client().models.generate_content(
         model=MODEL_ID,
         contents=prompt,
         config=config,
     )
 
-    refined_output = response.text.strip()
+    refined_output = (response.text or "").strip()
     print(f"⏱ format_itinerary_with_llm done in {time.time() - start_time:.2f} sec")
 
+    return _parse_itinerary_output(refined_output, _ITINERARY_PLANS_ADAPTER)
+
+
+def _validate_fallback_plans(data, raw_text):
+    """Plans from fallback-parsed / repaired output that pass the ItineraryPlan schema.
+
+    Each plan is validated on its own; invalid ones are counted and dropped, so a
+    salvaged structure with half-written activities never reaches the pipeline.
+    """
+    candidates = data if isinstance(data, list) else [data]
+    plans = []
+    for plan in candidates:
+        if isinstance(plan, dict) and isinstance(plan.get("itinerary"), dict):
+            # Older {"Day 1": [...]} shape -> the schema's list of days.
+            plan = dict(plan, itinerary=[{"day": day, "activities": acts} for day, acts in plan["itinerary"].items()])
+        try:
+            validated = _ITINERARY_PLAN_ADAPTER.validate_python(plan)
+        except ValueError as e:
+            incr("formatter.fallback.invalid_plan")
+            print(f"⚠️ Dropping plan that fails the schema: {e}")
+            continue
+        plans.append(_itinerary_days_to_dict(validated.model_dump()))
+
+    if not plans:
+        incr("formatter.fallback.failed")
+        return [{"error": "No valid plan in formatter output", "raw_text": raw_text}]
+    incr("formatter.fallback.valid_plans", len(plans))
+    return plans
+
+
+def _parse_itinerary_output(refined_output, adapter):
+    """Validate formatter output against `adapter`, falling back to tolerant parsing / repair."""
+    # Schema-constrained output should validate directly; everything below is a counted fallback.
+    try:
+        validated = adapter.validate_json(refined_output)
+        plans = validated if isinstance(validated, list) else [validated]
+        incr("formatter.schema_ok")
+        return [_itinerary_days_to_dict(plan.model_dump()) for plan in plans]
+    except ValueError as e:
+        incr("formatter.fallback.schema_invalid")
+        print(f"⚠️ Schema validation failed, using fallback parsing: {e}")
+
     # Clean & parse JSON safely
     def clean_json_output(text):
         if text.startswith("```json") and text.endswith("```"):
@@ -599,13 +722,9 @@ def format_itinerary_with_llm(itinerary_data, user_query):
     try:
         cleaned_output = clean_json_output(refined_output)
         data = json.loads(cleaned_output)
+        incr("formatter.fallback.plain_parse")
 
-        if isinstance(data, dict):
-            return [data]
-        elif isinstance(data, list):
-            return data
-        else:
-            return [{"error": "Unexpected format", "raw": data}]
+        return _validate_fallback_plans(data, cleaned_output)
 
 
     except json.JSONDecodeError:
@@ -621,7 +740,9 @@ def format_itinerary_with_llm(itinerary_data, user_query):
 
                 print("🔍 Braces balanced — retrying JSON parse without auto-fix...")
 
-                return [json.loads(cleaned_output)]
+                data = json.loads(cleaned_output)
+                incr("formatter.fallback.balanced_retry")
+                return _validate_fallback_plans(data, cleaned_output)
 
             except:
 
@@ -634,58 +755,202 @@ def format_itinerary_with_llm(itinerary_data, user_query):
         # ----------------------------------------------------
 
         print("🛠 Running JSON auto-fix...")
+        incr("formatter.fallback.fix_broken_json")
 
         fixed = fix_broken_json(cleaned_output)
 
-        if isinstance(fixed, dict) and "error" not in fixed:
+        if isinstance(fixed, dict) and "error" in fixed:
 
-            return [fixed]
+            incr("formatter.fallback.failed")
+            return [{"error": "Invalid JSON even after fix", "raw_text": cleaned_output}]
 
-        elif isinstance(fixed, list):
+        return _validate_fallback_plans(fixed, cleaned_output)
 
-            return fixed
 
-        else:
+# ---------------------------
+# Parallel per-plan generation
+# ---------------------------
+# The optimizer output is dealt into disjoint spot pools, one per plan, and each
+# pool gets its own smaller LLM call. The calls run concurrently and are merged
+# back into the same [plan1, plan2, plan3] list.
+def partition_spots_for_plans(itinerary_data: Dict, num_plans: int = FORMATTER_NUM_PLANS) -> List[Dict]:
+    """Split an optimize_day_plan result into `num_plans` disjoint day plans.
 
-            return [{"error": "Invalid JSON even after fix", "raw_text": cleaned_output}]
+    Spot indices are dealt round-robin in the optimizer's order, so every pool keeps
+    the day structure and a similar near/far mix around the hotel.
+    """
+    partitions = [
+        {"days": [[] for _ in itinerary_data["days"]], "spots": itinerary_data["spots"],
+         "hotel_location": itinerary_data["hotel_location"]}
+        for _ in range(num_plans)
+    ]
+    dealt = 0
+    for day_index, day in enumerate(itinerary_data["days"]):
+        for spot_index in day:
+            partitions[dealt % num_plans]["days"][day_index].append(spot_index)
+            dealt += 1
+    return partitions
 
 
-# ===========================
-# STEP 4/5 – Weather + local path optimization on LLM output
-# ===========================
-async def fetch_with_retry(session, url, params, retries=2):
-    for attempt in range(retries + 1):
+def _partition_spot_names(partition: Dict) -> set:
+    return {partition["spots"].names[i] for day in partition["days"] for i in day}
+
+
+def format_plan_with_llm(partition: Dict, user_query: str, plan_index: int, excluded_spots: List[str]) -> List[Dict]:
+    """Generate one plan from its own spot pool. Returns a list (normally of one plan)."""
+    start_time = time.time()
+    theme = PLAN_THEMES[plan_index % len(PLAN_THEMES)]
+
+    prompt = f"""
+    You are a professional travel planner.
+
+    TASK: Create **one trip plan** for the user's query below, with a "{theme}" flavour.
+
+    IMPORTANT:
+    - Use the spots given in the JSON below as the primary pool.
+    - You MAY add a few extra nearby spots if needed, but try to reuse given spots.
+    - Do NOT use any of these spots, they belong to other plans: {json.dumps(excluded_spots, ensure_ascii=False)}
+    - The order of spots within each day in the JSON is already optimized for distance.
+      Try to follow that order as much as possible.
+
+    Follow these steps strictly:
+    1️⃣ Group nearby spots on the same day to minimize travel.
+    2️⃣ Start each day near the hotel and pick user-requested or nearby places.
+    3️⃣ Allocate realistic durations (1–2h for small spots, 3–5h for beaches, etc).
+
+    ⚙️ The plan:
+    - "date": "YYYY-MM-DD"
+    - "duration_days": number of days
+    - "itinerary_name": 2-3 word catchy itinerary name
+    - "hotel": the hotel_location from the JSON (name, lat, lng, rating, types, open_now)
+    - "itinerary": one entry per day, in order: {{"day": "Day 1", "activities": [...]}}
+      where each activity has spot_name, lat, long, a very crisp description and
+      estimated_time_spent (e.g. "2 hours").
+
+    📏 RULES:
+    - If the user mentions a number of days, plan **exactly that many days** (Day 1 … Day N).
+    - If not mentioned, default to **3 days**.
+    - Each day must have **at least 3 activities** (morning, afternoon, evening) when possible.
+    - Each description should be **short (7–8 words max)**.
+    - Use at least two of the given places whenever possible. For the remaining spots, you may use your internal knowledge with accurate latitude/longitude.
+    - The total `estimated_time_spent` per day must not exceed 9 hours.
+
+    User request: {user_query}
+    Optimized spots JSON: {json.dumps(day_plan_to_llm_json(partition), separators=(',', ':'))}
+    """
+
+    config = types.GenerateContentConfig(
+        temperature=0.6,
+        top_p=0.8,
+        max_output_tokens=8000,
+        response_mime_type="application/json",
+        response_schema=ItineraryPlan,
+    )
+
+    response = get_genai_client().models.generate_content(
+        model=MODEL_ID,
+        contents=prompt,
+        config=config,
+    )
+
+    refined_output = (response.text or "").strip()
+    print(f"⏱ plan {plan_index + 1} formatted in {time.time() - start_time:.2f} sec")
+    return _parse_itinerary_output(refined_output, _ITINERARY_PLAN_ADAPTER)
+
+
+def _is_valid_plan(plan) -> bool:
+    """A formatted plan with at least one day and no empty day."""
+    if not isinstance(plan, dict) or "error" in plan:
+        return False
+    days = plan.get("itinerary") or {}
+    return bool(days) and all(days.values())
+
+
+def _dedup_plan(plan: Dict, seen_spots: set) -> Dict:
+    """Drop spots already used by an earlier plan (or day), in place, and record this plan's spots."""
+    for day, activities in (plan.get("itinerary") or {}).items():
+        kept = []
+        for act in activities:
+            key = str(act.get("spot_name", "")).strip().lower()
+            if key and key in seen_spots:
+                incr("formatter.cross_plan_duplicates")
+                continue
+            kept.append(act)
+        seen_spots.update(str(a.get("spot_name", "")).strip().lower() for a in kept)
+        plan["itinerary"][day] = kept
+    return plan
+
+
+def _merge_plans(results: List[List[Dict]]) -> List[Dict]:
+    """Flatten per-plan results in plan order, dropping failed plans."""
+    return [plan for plans in results for plan in plans if _is_valid_plan(plan)]
+
+
+def format_itinerary_with_llm(itinerary_data, user_query, on_plan_ready=None):
+    """Three itinerary plans for `user_query`, generated concurrently from disjoint spot pools.
+
+    `on_plan_ready(plan_index, plan)` is called for each plan in plan order, as soon
+    as it and every earlier plan have finished, so callers can surface the first
+    plan before the slower ones are done.
+    """
+    if not FORMATTER_PARALLEL_PLANS:
+        return _format_all_plans_with_llm(itinerary_data, user_query)
+
+    start_time = time.time()
+    partitions = partition_spots_for_plans(itinerary_data)
+    pool_names = [_partition_spot_names(p) for p in partitions]
+
+    futures = {}
+    for i, partition in enumerate(partitions):
+        excluded = sorted(set().union(*[names for j, names in enumerate(pool_names) if j != i]))
+        futures[_plan_executor.submit(format_plan_with_llm, partition, user_query, i, excluded)] = i
+
+    # A spot shared by two plans stays in the lower-index one. Plans are resolved
+    # in index order once every earlier plan is done, so the outcome does not
+    # depend on LLM latency and each `plan_ready` payload is exactly the plan that
+    # ends up in the result.
+    results = [[] for _ in partitions]
+    finished = [False] * len(partitions)
+    seen_spots = set()
+    next_plan = 0
+    for future in as_completed(futures):
+        i = futures[future]
+        finished[i] = True
         try:
-            async with session.get(
-                url, params=params, timeout=ClientTimeout(total=10)
-            ) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-        except Exception:
-            pass
-        await asyncio.sleep(1 * (2 ** attempt))
-    return {}
-
-
-async def fetch_weather(session, lat, lon):
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {"lat": lat, "lon": lon, "appid": OPENWEATHER_API_KEY, "units": "metric"}
-
-    data = await fetch_with_retry(session, url, params)
-    if not data or "weather" not in data:
-        return "unknown"
-
-    cond = data["weather"][0]["main"].lower()
-    if "rain" in cond:
-        return "rainy"
-    elif "cloud" in cond:
-        return "cloudy"
-    elif "clear" in cond:
-        return "clear"
-    else:
-        return cond
+            results[i] = future.result()
+        except Exception as e:
+            incr("formatter.plan_failed")
+            print(f"❌ Plan {i + 1} generation failed: {e}")
+
+        while next_plan < len(partitions) and finished[next_plan]:
+            for plan in results[next_plan]:
+                if not _is_valid_plan(plan):
+                    continue
+                spots_with_plan = set(seen_spots)
+                _dedup_plan(plan, spots_with_plan)
+                if not _is_valid_plan(plan):
+                    incr("formatter.plan_emptied_by_dedup")
+                    print(f"⚠️ Plan {next_plan + 1} lost a whole day to spots used by earlier plans, dropping it")
+                    continue
+                seen_spots = spots_with_plan
+                if on_plan_ready:
+                    on_plan_ready(next_plan, plan)
+            next_plan += 1
+
+    merged = _merge_plans(results)
+    print(f"⏱ format_itinerary_with_llm ({len(merged)} plans in parallel) done in {time.time() - start_time:.2f} sec")
+
+    if not merged:
+        incr("formatter.parallel_fallback")
+        print("⚠️ No plan survived parallel generation, falling back to a single call")
+        return _format_all_plans_with_llm(itinerary_data, user_query)
+
+    return merged
 
 
+# ===========================
+# STEP 4/5 – Local path optimization + weather on LLM output
+# ===========================
 def _get_lat_lon_from_activity(act: Dict) -> Tuple[Optional[float], Optional[float]]:
     lat = act.get("lat")
     lon = act.get("long", act.get("lng"))
@@ -698,33 +963,32 @@ def _get_lat_lon_from_activity(act: Dict) -> Tuple[Optional[float], Optional[flo
 
 
 def tsp_order_day(hotel: Dict, activities: List[Dict]) -> List[Dict]:
+    """Shortest hotel ➜ activities ➜ hotel loop found within the route budget; activities without coordinates go last."""
 
     if not activities:
         return []
 
-    current_lat = hotel.get("lat") or 0.0
-    current_lng = hotel.get("lng") or hotel.get("long") or 0.0
-
-    unvisited = activities[:]
-    ordered: List[Dict] = []
+    located, unlocated = [], []
+    for act in activities:
+        lat, lon = _get_lat_lon_from_activity(act)
+        (unlocated if lat is None or lon is None else located).append((act, lat, lon))
 
-    while unvisited:
-        def dist(a):
-            lat, lon = _get_lat_lon_from_activity(a)
-            if lat is None or lon is None:
-                return float("inf")
-            return haversine_km(current_lat, current_lng, lat, lon)
+    if not located:
+        return [act for act, _, _ in unlocated]
 
-        next_act = min(unvisited, key=dist)
-        ordered.append(next_act)
+    # Node 0 is the hotel, node i + 1 is located[i]; the given order is the baseline.
+    hotel_point = (hotel.get("lat") or 0.0, hotel.get("lng") or hotel.get("long") or 0.0)
+    points = [hotel_point] + [(lat, lon) for _, lat, lon in located]
+    tour, lengths = improve_route(pairwise_distance_km(points), initial=range(len(points)))
 
-        lat, lon = _get_lat_lon_from_activity(next_act)
-        if lat is not None and lon is not None:
-            current_lat, current_lng = lat, lon
+    incr("routing.days")
+    incr("routing.km_saved", round(lengths["initial"] - lengths["final"], 3))
+    return [located[node - 1][0] for node in tour[1:]] + [act for act, _, _ in unlocated]
 
-        unvisited.remove(next_act)
 
-    return ordered
+def order_days(hotel: Dict, days: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """tsp_order_day for every day; CPU-bound, so async callers run it in a thread."""
+    return {day_name: tsp_order_day(hotel, activities) for day_name, activities in days.items()}
 
 
 async def process_single_trip(step3: Dict) -> Dict:
@@ -735,40 +999,10 @@ async def process_single_trip(step3: Dict) -> Dict:
     days: Dict[str, List[Dict]] = step3.get("itinerary", {})
 
 
-    optimized_days: Dict[str, List[Dict]] = {}
-    for day_name, activities in days.items():
-        optimized_days[day_name] = tsp_order_day(hotel, activities)
+    optimized_days = await asyncio.to_thread(order_days, hotel, days)
 
     start_date = date.fromisoformat(step3.get("date", date.today().isoformat()))
 
-
-    async with aiohttp.ClientSession() as session:
-        async with asyncio.TaskGroup() as tg:
-            weather_tasks = []
-            for _, activities in optimized_days.items():
-                for act in activities:
-                    lat, lon = _get_lat_lon_from_activity(act)
-                    if lat is None or lon is None:
-                        # push dummy task with constant result
-                        async def dummy():
-                            return "unknown"
-                        weather_tasks.append(tg.create_task(dummy()))
-                    else:
-                        weather_tasks.append(
-                            tg.create_task(fetch_weather(session, lat, lon))
-                        )
-
-        weathers = [t.result() for t in weather_tasks]
-
-
-    wi = 0
-    for _, acts in optimized_days.items():
-        for a in acts:
-            if wi < len(weathers):
-                a["weather"] = weathers[wi]
-            wi += 1
-
-
     routes = []
     for _, activities in optimized_days.items():
         routes.append({"optimized_order": activities, "polyline": None})
@@ -788,23 +1022,68 @@ async def process_single_trip(step3: Dict) -> Dict:
     }
 
 
+def _trip_activities(trip: Dict) -> List[Dict]:
+    return [act for acts in trip["itinerary"].values() for act in acts]
+
+
+async def process_trips(trips: List[Dict], process_trip, deadline_seconds=None) -> List[Dict]:
+    """Order and weather-annotate every plan concurrently under one pooled session.
+
+    Plans that raise, or (with a deadline in seconds, 0 = none) are still fetching
+    weather when it expires, are dropped; if no plan finished, every plan that was
+    ordered comes back with "unknown" weather where it had not arrived yet.
+    """
+    deadline_seconds = PIPELINE_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    ordered: List[Optional[Dict]] = [None] * len(trips)
+
+    async with client_session(limit=PIPELINE_CONNECTION_LIMIT) as session:
+        # The pooled session on the runtime loop ignores `limit`, so the cap is also
+        # enforced here, across the weather requests of every plan.
+        connections = asyncio.Semaphore(PIPELINE_CONNECTION_LIMIT)
+
+        async def one(i, trip):
+            ordered[i] = await process_trip(trip)
+            await annotate_weather(_trip_activities(ordered[i]), session, connections)
+            return ordered[i]
+
+        tasks = [asyncio.create_task(one(i, trip)) for i, trip in enumerate(trips)]
+        done, pending = await asyncio.wait(tasks, timeout=deadline_seconds or None)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    failed = [task for task in done if task.exception() is not None]
+    for task in failed:
+        print(f"⚠️ Plan enrichment failed: {task.exception()!r}")
+    if failed:
+        incr("itinerary_pipeline.failed_plans", len(failed))
+    if pending:
+        incr("itinerary_pipeline.deadline_missed")
+        incr("itinerary_pipeline.dropped_plans", len(pending))
+        print(f" {len(pending)} of {len(trips)} plans missed the {deadline_seconds}s deadline")
+
+    finished = [task.result() for task in tasks if task in done and task.exception() is None]
+    if finished:
+        return finished
+    partial = [trip for trip in ordered if trip is not None]
+    for trip in partial:
+        for act in _trip_activities(trip):
+            act.setdefault("weather", "unknown")
+    return partial
+
+
 # -------------------------
 # PUBLIC ENTRY – full pipeline post-LLM
 # -------------------------
-async def run_itinerary_pipeline(step3_data):
+async def run_itinerary_pipeline(step3_data, deadline_seconds=None):
 
     t0 = time.time()
 
-    async def runner():
-        if isinstance(step3_data, list):
-            results = []
-            for trip in step3_data:
-                results.append(await process_single_trip(trip))
-            return results
-        else:
-            return await process_single_trip(step3_data)
-
-    final_output = await runner()
+    # Plans run side by side (weather shared per geohash cell), so this takes as
+    # long as the slowest plan rather than the sum.
+    trips = step3_data if isinstance(step3_data, list) else [step3_data]
+    results = await process_trips(trips, process_single_trip, deadline_seconds)
+    final_output = results if isinstance(step3_data, list) else (results[0] if results else {})
 
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(final_output, f, indent=2, ensure_ascii=False)
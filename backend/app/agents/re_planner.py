@@ -4,7 +4,7 @@ from dotenv import load_dotenv
 import httpx
 from typing import Dict, List, Tuple
 import os
-import math
+import numpy as np
 import json
 import asyncio
 from datetime import date, timedelta
@@ -21,11 +21,24 @@ from google.genai import types
 from google.oauth2 import service_account
 import asyncio
 import aiohttp
-import random
 import json
 
+from app.agents.llm_init import get_genai_client
+from app.agents.llm_cache import cached_llm_json
+from app.utils.json_repair import repair_json
+from app.utils.metrics import incr
+from app.external.google_maps.places_cache import cached_places_search, cached_place_details
+from app.external.google_maps.distance_matrix import build_distance_matrix
+from app.utils.async_runtime import client_session
+from app.agents.spot_table import SpotTable, day_plan_to_llm_json
+# Day planning, route ordering and hotel anchoring are shared with the planner.
+from app.agents.planner import optimize_day_plan, order_days, select_central_hotel_location, snap_to_lodging, filter_spots_by_radius, destination_centre, process_trips
+
 
 MIN_RATING = 3.5
+PLACES_CONCURRENCY = int(os.getenv("PLACES_CONCURRENCY", "8"))
+# Driving times are treated as symmetric for spot-to-spot planning (halves the matrix).
+DISTANCE_MATRIX_SYMMETRIC = os.getenv("DISTANCE_MATRIX_SYMMETRIC", "true").lower() != "false"
 
 
 # -------------------------
@@ -37,7 +50,6 @@ MAX_DAILY_TRAVEL_MIN = 480
 
 load_dotenv()
 
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 OUTPUT_FILE = "fin_planner/fast_output.json"
 SERVICE_ACCOUNT_PATH = os.getenv("SERVICE_ACCOUNT_PATH")
 VERTEX_PROJECT = os.getenv("VERTEX_PROJECT")
@@ -45,7 +57,6 @@ VERTEX_LOCATION = os.getenv("VERTEX_LOCATION")
 MODEL_ID = os.getenv("MODEL_ID_PLANNER")
 SCOPES = [os.getenv("SCOPES")] if os.getenv("SCOPES") else ["https://www.googleapis.com/auth/cloud-platform"]
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
 VERTEX_PROJECT = os.getenv("VERTEX_PROJECT")
 VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
@@ -90,18 +101,7 @@ def get_structured_trip_details(user_prompt: str) -> Optional[TripDetails]:
         return None
 
     try:
-        print(f" Loading credentials from: {SERVICE_ACCOUNT_PATH}")
-        credentials = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_PATH, scopes=SCOPES
-        )
-
-        print(f"Initializing Vertex AI client for project: {VERTEX_PROJECT}")
-        client = genai.Client(
-            vertexai=True,
-            project=VERTEX_PROJECT,
-            location=VERTEX_LOCATION,
-            credentials=credentials
-        )
+        client = get_genai_client()
 
         system_instruction = (
             "You are an expert travel planner assistant. Convert the user's text into structured JSON only. "
@@ -145,23 +145,28 @@ def get_structured_trip_details(user_prompt: str) -> Optional[TripDetails]:
             "}"
         )
 
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=user_prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_schema=TripDetails,
-                response_mime_type="application/json",
-            ),
-        )
-
-        parsed_data = json.loads(response.text)
+        def extract():
+            response = client.models.generate_content(
+                model=MODEL_ID,
+                contents=user_prompt,
+                config=types.GenerateContentConfig(
+                    system_instruction=system_instruction,
+                    response_schema=TripDetails,
+                    response_mime_type="application/json",
+                ),
+            )
+            try:
+                return json.loads(response.text)
+            except json.JSONDecodeError:
+                print(f"Raw response: {response.text}")
+                raise
+
+        parsed_data = cached_llm_json(MODEL_ID, system_instruction, user_prompt, extract)
 
         return TripDetails.model_validate(parsed_data)
 
     except json.JSONDecodeError as e:
         print(f"JSON parsing error: {e}")
-        print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
         return None
     except Exception as e:
         print(f"Vertex AI API Error: {e}")
@@ -197,10 +202,18 @@ async def fetch_json(session, url, params):
 
 
 async def places_text_search(session, query, location):
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    params = {"query": f"{query} in {location}", "key": GOOGLE_MAPS_API_KEY}
-    data = await fetch_json(session, url, params)
-    return data.get("results", [])
+    """Text-search hits for `query` in `location` as trimmed spot records (cached)."""
+
+    async def fetch():
+        url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+        params = {"query": f"{query} in {location}", "key": GOOGLE_MAPS_API_KEY}
+        data = await fetch_json(session, url, params)
+        if data.get("status") not in ("OK", "ZERO_RESULTS"):
+            print(f" Places search '{query}' returned {data.get('status')}")
+            return None
+        return [fetch_spot_data(place) for place in data.get("results", [])]
+
+    return await cached_places_search(query, location, "textsearch", fetch)
 
 
 async def place_details(session, place_id):
@@ -226,10 +239,46 @@ def fetch_spot_data(place):
     }
 
 
-def select_central_hotel_location(spots):
-    if not spots:
-        return {"lat": None, "lng": None}
-    return random.choice(spots)
+# Text search already returns name, geometry, rating, types and open_now; details
+# are only needed when a record is missing one of these.
+REQUIRED_SPOT_FIELDS = ("id", "name", "lat", "lng")
+
+
+def _needs_details(spot):
+    return any(spot.get(field) is None for field in REQUIRED_SPOT_FIELDS)
+
+
+async def resolve_spots(session, semaphore, spots):
+    """Dedupe text-search records by place_id and fill missing fields from Place Details.
+
+    Keeps first-seen order. Detail lookups are bounded by `semaphore` and go
+    through the per-place details cache; records that still lack coordinates are dropped.
+    """
+    unique = {}
+    for spot in spots:
+        if spot.get("id") and spot["id"] not in unique:
+            unique[spot["id"]] = spot
+
+    incomplete = [spot for spot in unique.values() if _needs_details(spot)]
+    incr("places.details.deduped", len(spots) - len(unique))
+    incr("places.details.skipped", len(unique) - len(incomplete))
+
+    async def fill(spot):
+        async def fetch():
+            async with semaphore:
+                details = await place_details(session, spot["id"])
+            return fetch_spot_data(details) if details else None
+
+        details = await cached_place_details(spot["id"], fetch)
+        if details:
+            spot.update({k: v for k, v in details.items() if v is not None})
+
+    await asyncio.gather(*[fill(spot) for spot in incomplete])
+
+    return [
+        spot for spot in unique.values()
+        if spot.get("lat") is not None and spot.get("lng") is not None
+    ]
 
 
 async def run_step2(input_data):
@@ -245,55 +294,32 @@ async def run_step2(input_data):
                          f"{kw} activities" for kw in keywords.values() if kw
                      ]
 
-    all_spots = []
-    async with aiohttp.ClientSession() as session:
+    centre_task = asyncio.create_task(asyncio.to_thread(destination_centre, destination))
 
-        search_tasks = [places_text_search(session, q, destination) for q in search_queries]
-        search_results = await asyncio.gather(*search_tasks)
-        search_results = [r for results in search_results for r in results]
+    async with client_session() as session:
+        semaphore = asyncio.Semaphore(PLACES_CONCURRENCY)
 
-        detail_tasks = [
-            place_details(session, r["place_id"])
-            for r in search_results if r.get("rating", 0) >= MIN_RATING
-        ]
-        details_list = await asyncio.gather(*detail_tasks)
+        async def bounded_search(query):
+            async with semaphore:
+                return await places_text_search(session, query, destination)
 
-    for d in details_list:
-        if d and d.get("geometry", {}).get("location"):
-            all_spots.append(fetch_spot_data(d))
+        search_results = await asyncio.gather(*[bounded_search(q) for q in search_queries])
+        search_results = [r for results in search_results for r in results]
 
-    unique_spots = {spot["id"]: spot for spot in all_spots}.values()
-    final_spots = list(unique_spots)[:max_spots]
+        qualified = [r for r in search_results if (r.get("rating") or 0) >= MIN_RATING]
+        qualified = filter_spots_by_radius(qualified, input_data.get("search_radius_km"), await centre_task)
+        final_spots = (await resolve_spots(session, semaphore, qualified))[:max_spots]
 
     return {
-        "spots": final_spots,
-        "hotel_location": select_central_hotel_location(final_spots)
+        "spots": SpotTable.from_records(final_spots),
+        "hotel_location": await snap_to_lodging(select_central_hotel_location(final_spots), destination),
+        "duration_days": input_data.get("duration_days")
     }
 
 
 # -------------------------
 # HELPER FUNCTIONS
 # -------------------------
-async def build_distance_matrix_async(
-        origins: List[Tuple[float, float]], destinations: List[Tuple[float, float]]
-) -> Dict:
-
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-    origin_str = "|".join([f"{lat},{lng}" for lat, lng in origins])
-    dest_str = "|".join([f"{lat},{lng}" for lat, lng in destinations])
-    params = {
-        "origins": origin_str,
-        "destinations": dest_str,
-        "key": GOOGLE_MAPS_API_KEY,
-        "units": "metric",
-    }
-
-    async with httpx.AsyncClient(timeout=20) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-
-
 def estimate_travel_cost(distance_km: float) -> int:
     """Estimate travel cost (₹) based on distance."""
     return int(distance_km * PER_KM_COST)
@@ -307,128 +333,73 @@ async def process_spots(step2_data: Dict) -> Dict:
     start_total = time.time()
 
     hotel = step2_data["hotel_location"]
-    spots = step2_data["spots"]
-
-    origins = [(hotel["lat"], hotel["lng"])]
-    destinations = [(s["lat"], s["lng"]) for s in spots]
+    spots: SpotTable = step2_data["spots"]
 
     # -------------------------
-    # STEP 3.1 — HOTEL ➜ SPOTS
+    # STEP 3.1 — HOTEL + SPOTS MATRIX
     # -------------------------
-    print("\n STEP 3.1: Calling Distance Matrix API for Hotel ➜ Spots...")
-    start_hotel_to_spots = time.time()
-
-    dm_response = await build_distance_matrix_async(origins, destinations)
-
-    hotel_to_spots_time = round(time.time() - start_hotel_to_spots, 2)
-
-    results = []
-    budget_used = 0
+    # One tiled matrix over [hotel] + spots: row 0 is hotel ➜ spots, the rest spot ➜ spot.
+    print("\n STEP 3.1: Building Distance Matrix for Hotel + Spots (tiled)...")
+    start_matrix = time.time()
 
-    for i, row in enumerate(dm_response["rows"][0]["elements"]):
-        spot = spots[i]
-        if row["status"] != "OK":
-            continue
+    points = [(hotel["lat"], hotel["lng"])] + spots.coords().tolist()
+    matrix = await build_distance_matrix(points, symmetric=DISTANCE_MATRIX_SYMMETRIC)
+    distance_km = np.array(matrix["distance_km"], dtype=np.float64)  # None -> NaN
+    time_min = np.array(matrix["time_min"], dtype=np.float64)
 
-        dist_km = round(row["distance"]["value"] / 1000, 2)
-        time_min = round(row["duration"]["value"] / 60, 1)
-
-        if dist_km > MAX_TRAVEL_DISTANCE_PER_SPOT:
-            continue
-
-        travel_cost = estimate_travel_cost(dist_km)
-        budget_used += travel_cost
-
-        results.append({
-            "name": spot["name"],
-            "distance_from_hotel_km": dist_km,
-            "travel_time_min": time_min,
-            "travel_cost": travel_cost,
-            "entry_fee": spot.get("entry_fee", 0),
-            "lat": spot["lat"],
-            "lng": spot["lng"]
-        })
-
-    print(f"  Hotel ➜ Spots completed in {hotel_to_spots_time}s")
+    matrix_time = round(time.time() - start_matrix, 2)
 
     # -------------------------
-    # STEP 3.2 — SPOT ➜ SPOT (PARALLEL)
+    # STEP 3.2 — FILTER + INDEXED MATRICES
     # -------------------------
-    print("\n🌍 STEP 3.2: Calling Distance Matrix API for Spot ➜ Spot (parallel)...")
-    start_spot_to_spot = time.time()
-
-    async def spot_to_spot_matrix(s1):
-        o = [(s1["lat"], s1["lng"])]
-        d = [(s2["lat"], s2["lng"]) for s2 in spots if s2["name"] != s1["name"]]
-        try:
-            dm_pair = await build_distance_matrix_async(o, d)
-            matrix = {}
-            j = 0
-            for s2 in spots:
-                if s2["name"] == s1["name"]:
-                    continue
-                el = dm_pair["rows"][0]["elements"][j]
-                j += 1
-                if el["status"] != "OK":
-                    continue
-                matrix[s2["name"]] = {
-                    "distance_km": round(el["distance"]["value"] / 1000, 1),
-                    "time_min": round(el["duration"]["value"] / 60, 1)
-                }
-            return s1["name"], matrix
-        except Exception as e:
-            print(f"  Error for {s1['name']}: {e}")
-            return s1["name"], {}
-
-    pair_tasks = [spot_to_spot_matrix(s) for s in spots]
-    pair_results = await asyncio.gather(*pair_tasks)
-    pair_matrix = dict(pair_results)
-
-    spot_to_spot_time = round(time.time() - start_spot_to_spot, 2)
+    spots.hotel_km, spots.hotel_min = distance_km[0, 1:], time_min[0, 1:]
+    reachable = np.flatnonzero(~np.isnan(spots.hotel_km) & (spots.hotel_km <= MAX_TRAVEL_DISTANCE_PER_SPOT))
+    spots = spots.subset(reachable)
+    budget_used = sum(estimate_travel_cost(d) for d in spots.hotel_km.tolist())
+
+    # Unreachable pairs are never picked by the optimizer.
+    rows = reachable + 1
+    spot_distance = np.nan_to_num(np.round(distance_km[np.ix_(rows, rows)], 1), nan=np.inf).astype(np.float32)
+    spot_time = np.nan_to_num(time_min[np.ix_(rows, rows)], nan=np.inf).astype(np.float32)
+
     total_time = round(time.time() - start_total, 2)
 
-    print(f"  Spot ➜ Spot completed in {spot_to_spot_time}s")
+    print(f"  Distance matrix ({len(points)}x{len(points)}) completed in {matrix_time}s")
     print(f"\n️ TOTAL Step 3 processing time: {total_time}s")
 
     # -------------------------
     # FINAL OUTPUT
     # -------------------------
     return {
-        "spots_distance_features": results,
-        "distance_matrix": pair_matrix,
+        "spots": spots,
+        "distance_km": spot_distance,
+        "time_min": spot_time,
         "budget_used_so_far": budget_used,
         "travel_constraints": {
             "max_daily_travel_min": MAX_DAILY_TRAVEL_MIN
         },
         "time_taken": {
-            "hotel_to_spots_sec": hotel_to_spots_time,
-            "spot_to_spot_sec": spot_to_spot_time,
+            "distance_matrix_sec": matrix_time,
             "total_step3_sec": total_time
         }
     }
 
 
-# ===========================
-# 🔧 CONFIG
-# ===========================
-
-_credentials = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_PATH, scopes=SCOPES
-)
-_client = genai.Client(
-    vertexai=True,
-    project=VERTEX_PROJECT,
-    location=VERTEX_LOCATION,
-    credentials=_credentials
-)
-
-
 # ===========================
 #  Helper — JSON Auto Fixer
 # ===========================
 def fix_broken_json(bad_json: str) -> dict:
     print(" Attempting to auto-fix malformed JSON...")
 
+    try:
+        fixed = repair_json(bad_json, required_keys=("hotel", "itinerary"))
+        incr("fix_broken_json.local")
+        print(" JSON repaired locally")
+        return fixed
+    except ValueError as e:
+        incr("fix_broken_json.llm")
+        print(f"  Local JSON repair failed ({e}), asking Gemini...")
+
     # First try to clean markdown blocks if present
     cleaned_json = bad_json.strip()
     if cleaned_json.startswith('```json') and cleaned_json.endswith('```'):
@@ -455,7 +426,7 @@ def fix_broken_json(bad_json: str) -> dict:
         response_mime_type="application/json",
         temperature=0.0,
     )
-    repair_response = _client.models.generate_content(
+    repair_response = get_genai_client().models.generate_content(
         model=MODEL_ID,
         contents=repair_prompt,
         config=repair_config,
@@ -469,60 +440,6 @@ def fix_broken_json(bad_json: str) -> dict:
         return {"error": "Invalid JSON even after fix", "raw_text": fixed_text}
 
 
-# ===========================
-#  Optimize Day Plan
-# ===========================
-def optimize_day_plan(step2_data, step3_data):
-    start_time = time.time()
-
-    hotel = step2_data["hotel_location"]
-    spots = step3_data["spots_distance_features"]
-    distance_matrix = step3_data["distance_matrix"]
-    max_daily_travel_min = step3_data["travel_constraints"]["max_daily_travel_min"]
-
-    spots.sort(key=lambda x: x["distance_from_hotel_km"])
-    days_output = {}
-    current_day = 1
-    remaining_spots = spots[:]
-    precomputed = {loc: distance_matrix.get(loc, {}) for loc in distance_matrix}
-
-    while remaining_spots:
-        day_key = f"Day {current_day}"
-        days_output[day_key] = []
-        travel_used = 0
-        current_loc = "hotel"
-
-        while remaining_spots:
-            if current_loc == "hotel":
-                next_spot = remaining_spots[0]
-                travel_time = next_spot["travel_time_min"]
-            else:
-                lookup = precomputed.get(current_loc, {})
-                next_spot = min(
-                    remaining_spots,
-                    key=lambda s: lookup.get(s["name"], {}).get("time_min", 999999)
-                )
-                travel_time = lookup.get(next_spot["name"], {}).get("time_min", 0)
-
-            if travel_used + travel_time > max_daily_travel_min:
-                break
-
-            travel_used += travel_time
-            days_output[day_key].append({
-                "name": next_spot["name"],
-                "lat": next_spot["lat"],
-                "lng": next_spot["lng"]
-            })
-            current_loc = next_spot["name"]
-            remaining_spots.remove(next_spot)
-
-        current_day += 1
-
-    days_output["hotel_location"] = hotel
-    print(f"⏱ optimize_day_plan done in {time.time() - start_time:.2f} sec")
-    return days_output
-
-
 def format_itinerary_with_llm(itinerary_data, user_query, plan):
     start_time = time.time()
 
@@ -633,7 +550,7 @@ def format_itinerary_with_llm(itinerary_data, user_query, plan):
         - Output **pure JSON only**, no explanations or comments.
 
         User request: {user_query}
-        Spots JSON: {json.dumps(itinerary_data, separators=(',', ':'))}
+        Spots JSON: {json.dumps(day_plan_to_llm_json(itinerary_data), separators=(',', ':'))}
         Now think carefully and output only the final JSON — no explanations.
         """
 
@@ -644,7 +561,7 @@ def format_itinerary_with_llm(itinerary_data, user_query, plan):
         response_mime_type="application/json",
     )
 
-    response = _client.models.generate_content(
+    response = get_genai_client().models.generate_content(
         model=MODEL_ID,
         contents=prompt,
         config=config,
@@ -685,84 +602,22 @@ def format_itinerary_with_llm(itinerary_data, user_query, plan):
             return [{"error": "Invalid JSON even after fix", "raw_text": cleaned_output}]
 
 
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    return 2 * R * math.asin(math.sqrt(a))
-
-
-async def fetch_with_retry(session, url, params, retries=2):
-    for attempt in range(retries + 1):
-        try:
-            async with session.get(url, params=params, timeout=ClientTimeout(total=10)) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-        except Exception as e:
-            print(f" Fetch attempt {attempt + 1} failed: {e}")
-        await asyncio.sleep(1 * (2 ** attempt))
-    return {}
-
-
-async def fetch_weather(session, lat, lon):
-    try:
-        lat = float(lat)
-        lon = float(lon)
-    except (TypeError, ValueError):
-        return "unknown"
-
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {"lat": lat, "lon": lon, "appid": OPENWEATHER_API_KEY, "units": "metric"}
-
-    data = await fetch_with_retry(session, url, params)
-    if not data or "weather" not in data:
-        return "unknown"
-
-    cond = data["weather"][0]["main"].lower()
-    if "rain" in cond:
-        return "rainy"
-    elif "cloud" in cond:
-        return "cloudy"
-    elif "clear" in cond:
-        return "clear"
-    else:
-        return cond
-
-
 # -------------------------
 # CORE ASYNC PROCESSOR
 # -------------------------
 async def process_single_trip(trip):
-    """Process one trip dict and enrich with weather info."""
+    """Order one trip dict's days; weather is added by process_trips."""
     hotel = trip.get("hotel", {})
     hotel["lng"] = hotel.get("lng") or hotel.get("long") or 0
 
     itinerary_name = trip.get("itinerary_name", "Unnamed Itinerary")
-    days = trip.get("itinerary", {})
+    days = await asyncio.to_thread(order_days, hotel, trip.get("itinerary", {}))
 
     try:
         start_date = date.fromisoformat(trip.get("date", date.today().isoformat()))
     except Exception:
         start_date = date.today()
 
-    async with ClientSession() as session:
-        async with asyncio.TaskGroup() as tg:
-            weather_tasks = [
-                tg.create_task(fetch_weather(session, act.get("lat"), act.get("long")))
-                for _, activities in days.items()
-                for act in activities
-            ]
-        weathers = [t.result() for t in weather_tasks]
-
-    wi = 0
-    for _, acts in days.items():
-        for a in acts:
-            a["weather"] = weathers[wi] if wi < len(weathers) else "unknown"
-            wi += 1
-
     return {
         "trip_details": {
             "trip_name": f"Trip to {hotel.get('name', 'Destination')}",
@@ -781,14 +636,12 @@ async def process_single_trip(trip):
 # -------------------------
 # PIPELINE ENTRY POINT
 # -------------------------
-async def run_itinerary_pipeline(step3_data):
+async def run_itinerary_pipeline(step3_data, deadline_seconds=None):
     t0 = time.time()
 
-    if isinstance(step3_data, list):
-        results = [await process_single_trip(trip) for trip in step3_data]
-        final_output = results
-    else:
-        final_output = await process_single_trip(step3_data)
+    trips = step3_data if isinstance(step3_data, list) else [step3_data]
+    results = await process_trips(trips, process_single_trip, deadline_seconds)
+    final_output = results if isinstance(step3_data, list) else (results[0] if results else {})
 
     print(f"  Done! Took {time.time() - t0:.2f}s")
     return final_output
@@ -0,0 +1,84 @@
+from langchain_core.messages import HumanMessage, SystemMessage
+from app.agents.context_builder import build_conversation_context
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from datetime import datetime
+from app.agents.llm_init import get_llm, DEFAULT_MODEL
+from app.agents.llm_cache import cached_llm_json
+
+# Asked when the model flags missing details but leaves clarify_question empty.
+DEFAULT_CLARIFY_QUESTION = (
+    "Could you share a few more details, like where you're going, from where, "
+    "when, and for how many people? 🧳"
+)
+
+
+class RouteAndSlots(BaseModel):
+    next: Literal[
+        "Iterationagent", "FlightBookingagent", "GeneralChatagent", "BusBookingAgent", "AccomodationAgent", "END"
+    ] = Field(description="Worker agent to route to next, or END.")
+    reasoning: str = Field(description="Short reason for the routing decision.")
+    scenario: Optional[str] = Field(default=None, description="One of trip, flight, hotel, bus, chat.")
+    origin_city: Optional[str] = None
+    destination_city: Optional[str] = None
+    departure_date: Optional[str] = Field(default=None, description="YYYY-MM-DD")
+    adults: Optional[int] = None
+    number_of_days: Optional[int] = None
+    clarify_question_status: bool = Field(default=False, description="True if a question must be asked before any agent can run.")
+    clarify_question: Optional[str] = None
+    rewritten_query: Optional[str] = Field(default=None, description="The current query rewritten with every collected detail.")
+
+
+def _build_route_extract_prompt(conversation_messages_list, current_time):
+    return f"""
+        You are the router and intent analyzer of a travel assistant. In ONE answer you must
+        pick the next worker agent AND extract the booking details it needs.
+
+        WORKERS:
+        - Iterationagent: create a trip plan / itinerary / trip suggestion.
+        - FlightBookingagent: find or book flights between two cities.
+        - BusBookingAgent: find or book bus routes between two cities.
+        - AccomodationAgent: find or book hotels, resorts, hostels or other stays.
+        - GeneralChatagent: greetings, thanks, small talk, summaries, anything that is not planning or booking.
+        - END: nothing left to do.
+
+        RULES:
+        1. Extract entities from the CURRENT user query. Use chat history ONLY if the current query
+           continues the most recent human intent; ignore assistant messages and intents older than 6 messages.
+        2. If the user wants to plan a trip, route to Iterationagent before suggesting any bookings.
+        3. If the user explicitly asks to book a flight / hotel / bus, route straight to that agent.
+        4. Mandatory fields:
+             trip   -> destination_city, number_of_days, departure_date
+             flight -> origin_city, destination_city, departure_date, adults
+             hotel  -> destination_city, number_of_days, adults, departure_date (check-in)
+             bus    -> origin_city, destination_city
+        5. If a mandatory field is missing or a date is in the past, set clarify_question_status to true
+           and put ONE short, slightly funny question (max 10 words, emojis, markdown) in clarify_question.
+           If everything is present, never ask a question.
+        6. If the user asks to create a trip plan, start planning immediately; do not ask for confirmation.
+        7. Always fill rewritten_query with the complete request including every collected detail.
+        8. Missing fields must be null.
+
+        Chat history:
+        {conversation_messages_list}
+
+        Current date:
+        {current_time}
+"""
+
+
+def _route_and_extract(state):
+    conversation_messages_list = build_conversation_context(state["conversation_id"], "route_extract", state.get("conversation_history"))
+    user_query = state["user_query"]
+
+    system_prompt = _build_route_extract_prompt(conversation_messages_list, datetime.now())
+
+    def extract():
+        result = get_llm().with_structured_output(RouteAndSlots).invoke([
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"The user query: {user_query}")
+        ])
+        return result.model_dump()
+
+    cache_prompt = _build_route_extract_prompt(conversation_messages_list, "")
+    return RouteAndSlots.model_validate(cached_llm_json(DEFAULT_MODEL, cache_prompt, user_query, extract))
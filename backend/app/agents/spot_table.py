@@ -0,0 +1,97 @@
+import numpy as np
+
+
+# -------------------------
+# Compact spot representation for planner steps 2–4
+# -------------------------
+class SpotTable:
+    """Column-oriented spot records addressed by position.
+
+    The same positions index the dense travel matrices built in step 3, so
+    lookups are array indexing and two places sharing a name never collide.
+    Records are only materialized as dicts at the LLM / API boundary.
+    """
+
+    __slots__ = ("ids", "names", "lat", "lng", "rating", "types", "open_now", "entry_fee", "hotel_km", "hotel_min")
+
+    def __init__(self, ids, names, lat, lng, rating, types, open_now, entry_fee, hotel_km=None, hotel_min=None):
+        n = len(ids)
+        self.ids = list(ids)
+        self.names = list(names)
+        self.lat = np.asarray(lat, dtype=np.float64).reshape(n)
+        self.lng = np.asarray(lng, dtype=np.float64).reshape(n)
+        self.rating = np.asarray(rating, dtype=np.float32).reshape(n)  # NaN = unrated
+        self.types = list(types)
+        self.open_now = list(open_now)
+        self.entry_fee = np.asarray(entry_fee, dtype=np.float32).reshape(n)
+        # Hotel legs stay float64: travel cost truncates distance_km * PER_KM_COST.
+        self.hotel_km = np.full(n, np.nan) if hotel_km is None else np.asarray(hotel_km, dtype=np.float64)
+        self.hotel_min = np.full(n, np.nan) if hotel_min is None else np.asarray(hotel_min, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(
+            ids=[r.get("id") for r in records],
+            names=[r.get("name") for r in records],
+            lat=[r["lat"] for r in records],
+            lng=[r["lng"] for r in records],
+            rating=[np.nan if r.get("rating") is None else r["rating"] for r in records],
+            types=[r.get("types", []) for r in records],
+            open_now=[r.get("open_now") for r in records],
+            entry_fee=[r.get("entry_fee", 0) or 0 for r in records],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def subset(self, indices):
+        """New table with rows `indices` (in that order)."""
+        idx = np.asarray(indices, dtype=np.intp)
+        pick = lambda values: [values[i] for i in idx]
+        return SpotTable(
+            ids=pick(self.ids),
+            names=pick(self.names),
+            lat=self.lat[idx],
+            lng=self.lng[idx],
+            rating=self.rating[idx],
+            types=pick(self.types),
+            open_now=pick(self.open_now),
+            entry_fee=self.entry_fee[idx],
+            hotel_km=self.hotel_km[idx],
+            hotel_min=self.hotel_min[idx],
+        )
+
+    def coords(self):
+        return np.column_stack((self.lat, self.lng))
+
+    def record(self, i):
+        """Step-2 style dict for row `i`."""
+        rating = float(self.rating[i])
+        return {
+            "id": self.ids[i],
+            "name": self.names[i],
+            "lat": float(self.lat[i]),
+            "lng": float(self.lng[i]),
+            "rating": None if np.isnan(rating) else round(rating, 1),
+            "types": self.types[i],
+            "open_now": self.open_now[i],
+        }
+
+    def to_records(self):
+        return [self.record(i) for i in range(len(self))]
+
+    def llm_record(self, i):
+        """Minimal {"name", "lat", "lng"} view sent to the formatter LLM."""
+        return {"name": self.names[i], "lat": float(self.lat[i]), "lng": float(self.lng[i])}
+
+
+def day_plan_to_llm_json(day_plan):
+    """Serialize an optimize_day_plan result to the {"Day N": [...], "hotel_location": ...} prompt shape."""
+    spots = day_plan["spots"]
+    payload = {
+        f"Day {n}": [spots.llm_record(i) for i in day]
+        for n, day in enumerate(day_plan["days"], start=1)
+        if day
+    }
+    payload["hotel_location"] = day_plan["hotel_location"]
+    return payload
@@ -14,21 +14,28 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from app.external.amadeus.flight.flight_details import get_iata_code_for_city, get_amadeus_token
 
 from langgraph.types import Command
+from langgraph.config import get_stream_writer
 from pydantic import BaseModel, Field
 import os
 from dotenv import load_dotenv
 import json
 from app.external.google_maps.bus import get_bus_routes_json
 from app.external.google_maps.accomdation import find_best_nearby_hotels
+from app.external.openweather.weather import prefetch_weather
 import requests
+import asyncio
 from datetime import datetime
+from app.utils.async_runtime import run_sync
 # ------------------------------------------
 
 
 from app.agents.llm_init import get_llm
-from app.database.chat_storage import get_conversation_messages
+from app.agents.context_builder import build_conversation_context
 from app.agents.initial_agent_executor import _initial_agent
 from app.agents.general_chat_agent_executor import general_chat_agent
+from app.agents.intent_router import classify_intent, FAST_ROUTER_MODE, FAST_ROUTER_THRESHOLD
+from app.agents.route_extract_executor import _route_and_extract, DEFAULT_CLARIFY_QUESTION
+from app.utils.metrics import incr
 
 load_dotenv()
 
@@ -42,6 +49,9 @@ TOKEN_URL = 'https://test.api.amadeus.com/v1/security/oauth2/token'
 FLIGHT_SEARCH_URL = 'https://test.api.amadeus.com/v2/shopping/flight-offers'
 LOCATION_SEARCH_URL = 'https://test.api.amadeus.com/v1/reference-data/locations'
 
+# Use the single-call RouteExtractAgent instead of Supervisor -> initialAgent -> Supervisor.
+COMBINED_ROUTER = os.getenv("COMBINED_ROUTER", "false").lower() == "true"
+
 
 
 class DayItinerarySchema(BaseModel):
@@ -102,6 +112,7 @@ class State(TypedDict):
     acomdation:Dict[str,Any]
 
     conversation_context: Dict[str, Any]
+    conversation_history: Dict[str, Any]
 
     origin_city : str
     destination_city : str
@@ -121,7 +132,28 @@ def Supervisor(state: State) -> Command[Literal["initialAgent","Iterationagent",
     print(" - " * 50)
 
     messages = state["messages"]
-    conversation_messages_list = get_conversation_messages(state["conversation_id"])
+    initial_agent_done = state.get("initial_agent_done")
+
+    local_route = None
+    if FAST_ROUTER_MODE != "off":
+        local_route = classify_intent(state["user_query"], initial_agent_done, state.get("scenario"))
+        print(f" - - > Fast router: {local_route}")
+
+    if FAST_ROUTER_MODE == "on" and local_route["confidence"] >= FAST_ROUTER_THRESHOLD:
+        incr("router.fast_path")
+        goto = local_route["next"]
+        log = {
+            "supervisor": {
+                "selected_agent": goto,
+                "reasoning": local_route["reasoning"],
+                "router": "rules"
+            }
+        }
+        messages.append(AIMessage(content=json.dumps(log)))
+        return Command(goto=goto, update={"messages": messages})
+
+    incr("router.llm")
+    conversation_messages_list = build_conversation_context(state["conversation_id"], "supervisor", state.get("conversation_history"))
     #"initialAgent": 'This agent should be called only if the user query is about trip plan/ flight/ hotel Accomodation/ bus related. This agent will collect all the necessary inputs for the further booking agents requires. ',
 
     member_dict = {
@@ -138,8 +170,6 @@ def Supervisor(state: State) -> Command[Literal["initialAgent","Iterationagent",
         worker_info.join(f"worker:{member}\nDescription:{description}")
     worker_info.join("worker:END \n Description:If the user query is complete or requires no further action from the agents.")
 
-    initial_agent_done = state.get("initial_agent_done")
-
     prompt  = f"""
             You are a supervisor Agent orchestrating a travel planning workflow agent. 
             Based on the user's last message or overall goal, decide which agent needs to be invoked next. 
@@ -155,7 +185,7 @@ def Supervisor(state: State) -> Command[Literal["initialAgent","Iterationagent",
                 the status is Initial agent execution status: {initial_agent_done},
             
             if this agent executed successfully then move to other agent. 
-            the last 4 conversation between the user and ai is : {conversation_messages_list[:5]}
+            the last 4 conversation between the user and ai is : {conversation_messages_list}
             what is the next logical step?
 """
 
@@ -184,6 +214,12 @@ def Supervisor(state: State) -> Command[Literal["initialAgent","Iterationagent",
     print(f" - - > Supervisor LLM goto: {goto}")
     print(f" - - > Supervisor LLM Reasoning: {reasoning}")
 
+    if FAST_ROUTER_MODE == "shadow" and local_route is not None:
+        agreed = local_route["next"] == goto
+        incr("router.shadow.agree" if agreed else "router.shadow.disagree")
+        print(f" - - > Fast router shadow: rules={local_route['next']} "
+              f"({local_route['confidence']:.2f}) llm={goto} agree={agreed}")
+
     log = {
         "supervisor": {
             "selected_agent": goto,
@@ -243,127 +279,214 @@ def initialagent(state:State) -> Command[Literal["Supervisor"]]:
 
 
 
-def Iterationagent(state: State) -> Command[Literal["Supervisor"]]:
-
-    print(" * " * 50)
-    print("\n Im inside iteration agent\n")
-    print(" * " * 50)
+def RouteExtractAgent(state: State) -> Command[Literal["Iterationagent", "FlightBookingagent", "GeneralChatagent", "BusBookingAgent", "AccomodationAgent", "END"]]:
+    """Supervisor + initial agent in one hop: a single structured call returns the route and the slots."""
+    print(" - " * 50)
+    print("\n Im inside route + extract agent\n")
+    print(" - " * 50)
 
     messages = state["messages"]
     user_query = state["user_query"]
+
+    if FAST_ROUTER_MODE == "on":
+        local_route = classify_intent(user_query)
+        if local_route["next"] == "GeneralChatagent" and local_route["confidence"] >= FAST_ROUTER_THRESHOLD:
+            incr("router.fast_path")
+            log = {"route_extract": {"selected_agent": "GeneralChatagent", "reasoning": local_route["reasoning"], "router": "rules"}}
+            messages.append(AIMessage(content=json.dumps(log)))
+            return Command(goto="GeneralChatagent", update={"messages": messages})
+
+    incr("router.llm")
     try:
-        import json
-        from colorama import Fore, Style
-        import asyncio
-        from datetime import datetime
-        import json
-
-        print(f"user query is : {user_query}\n\n")
-
-        def log_time(step_name, start_time, end_time):
-            duration = (end_time - start_time).total_seconds()
-            print(f"{Fore.MAGENTA}{step_name} took {duration:.2f} seconds{Style.RESET_ALL}\n")
-            return duration
-
-        overall_start = datetime.now()
-        print(f"{Fore.YELLOW} Process started at: {overall_start.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}\n")
-
-        print(f"{Fore.CYAN}{'-' * 50}\n STEP 1: Understanding User Intent\n{'-' * 50}{Style.RESET_ALL}")
-        start_step1 = datetime.now()
-        trip1 = get_structured_trip_details(user_query)
-
-        end_step1 = datetime.now()
-        print("\nStructured Intent Response:\n")
-        print(trip1.model_dump_json(indent=2))
-        step1_time = log_time("STEP 1 (Understanding User Intent)", start_step1, end_step1)
-
-        print(
-            f"\n{Fore.CYAN}{'-' * 50}\n STEP 2: Destination + Spots Search + Hotel Search\n{'-' * 50}{Style.RESET_ALL}")
-        start_step2 = datetime.now()
-        step2 = asyncio.run(run_step2(trip1.model_dump()))
-        end_step2 = datetime.now()
-        print(json.dumps(step2, indent=2))
-        step2_time = log_time("STEP 2 (Destination + Spots + Hotels)", start_step2, end_step2)
-
-        print(f"\n{Fore.GREEN}{'-' * 50}\n STEP 3: Distance + Cost Estimation\n{'-' * 50}{Style.RESET_ALL}")
-        start_step3 = datetime.now()
-        step3 = asyncio.run(process_spots(step2))
-        end_step3 = datetime.now()
-        print(json.dumps(step3, indent=2))
-        step3_time = log_time("STEP 3 (Distance + Cost Estimation)", start_step3, end_step3)
-
-        print(f"\n{Fore.YELLOW}{'-' * 50}\n Bridge: Step 3 → Step 4 Conversion\n{'-' * 50}{Style.RESET_ALL}")
-        start_step4 = datetime.now()
-        python_output = optimize_day_plan(step2, step3)
-        final_itinerary = format_itinerary_with_llm(python_output, user_query)
-        end_step4 = datetime.now()
-        print("\nLLM Formatted Itinerary:\n")
-        print(json.dumps(final_itinerary, indent=2))
-        step4_time = log_time("STEP 3 to 4 (Itinerary Optimization + LLM Formatting)", start_step4, end_step4)
-
-        print(
-            f"\n{Fore.MAGENTA}{'=' * 50}\n STEP 4 & 5 & STEP 6: Weather ✓ Final Itinerary ✓ Enhancements ✓\n{'=' * 50}{Style.RESET_ALL}"
-        )
-        start_step5 = datetime.now()
-        result = asyncio.run(run_itinerary_pipeline(final_itinerary))
-
-        end_step5 = datetime.now()
-        print("\n FINAL RESULT:\n")
-        print(json.dumps(result, indent=2))
-        step5_time = log_time("STEP 5–6 (Weather + Final Enhancements)", start_step5, end_step5)
-
-        overall_end = datetime.now()
-        overall_duration = (overall_end - overall_start).total_seconds()
-
-        print(f"{Fore.GREEN} DONE! Your trip plan has been successfully generated 🥳✨{Style.RESET_ALL}")
-        print(f"{Fore.CYAN} Process finished at: {overall_end.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}")
-        print(f"{Fore.BLUE}TOTAL EXECUTION TIME: {overall_duration:.2f} seconds{Style.RESET_ALL}")
-
-        # Summary of all step durations
-        print(f"\n{Fore.WHITE}{'=' * 50}")
-        print(f"Execution Time Summary:")
-        print(f"  Step 1: {step1_time:.2f}s")
-        print(f"  Step 2: {step2_time:.2f}s")
-        print(f"  Step 3: {step3_time:.2f}s")
-        print(f"  Step 3-4 convertor: {step4_time:.2f}s")
-        print(f"  Step 4-5–6: {step5_time:.2f}s")
-        print(f"{'-' * 50}")
-        print(f" Total Time: {overall_duration:.2f}s")
-        print(f"{'=' * 50}{Style.RESET_ALL}")
+        result = _route_and_extract(state)
+    except Exception as e:
+        print(f"Route + extract LLM Error: {e}")
+        return Command(goto="END",
+                       update={"messages": messages + [AIMessage(content=f"Supervisor failed to route: {e}")]})
 
-        log = {
-            "Iterationagent": {
-                "message": "Successfully generated three structured plans.",
-                "status": "success",
+    print(f" - - > Route + extract goto: {result.next}")
+    print(f" - - > Route + extract reasoning: {result.reasoning}")
 
-            }
+    # Missing slots always end the turn with a question, even if the model left it blank.
+    clarify_question = result.clarify_question
+    if result.clarify_question_status and not (clarify_question or "").strip():
+        incr("router.default_clarify_question")
+        clarify_question = DEFAULT_CLARIFY_QUESTION
+
+    log = {
+        "route_extract": {
+            "selected_agent": result.next,
+            "reasoning": result.reasoning,
+            "scenario": result.scenario
         }
-        print('*'*50)
-        print(f"plans as of now generated{result}")
-        print('*' * 50)
-        messages.append(AIMessage(content=json.dumps(log)))
+    }
+    messages.append(AIMessage(content=json.dumps(log)))
+
+    update = {
+        "messages": messages,
+        "origin_city": result.origin_city,
+        "destination_city": result.destination_city,
+        "departure_date": result.departure_date,
+        "adults": result.adults,
+        "number_of_days": result.number_of_days,
+        "scenario": result.scenario,
+        "clarify_question_status": result.clarify_question_status,
+        "clarify_question": clarify_question,
+        "initial_agent_done": not result.clarify_question_status,
+        "user_query": result.rewritten_query or user_query
+    }
+
+    if result.clarify_question_status:
+        return Command(goto="END", update=update)
+
+    return Command(goto=result.next, update=update)
+
+
+
+async def plan_itinerary(user_query, stream_writer=None):
+    """Steps 1-6 of the itinerary pipeline as one coroutine; returns the enriched plans.
+
+    Blocking LLM calls run in worker threads, so every HTTP step shares the loop
+    (and, on the async runtime, its pooled connections). `stream_writer` receives
+    the `plan_ready` events.
+    """
+    from colorama import Fore, Style
+
+    print(f"user query is : {user_query}\n\n")
+
+    def log_time(step_name, start_time, end_time):
+        duration = (end_time - start_time).total_seconds()
+        print(f"{Fore.MAGENTA}{step_name} took {duration:.2f} seconds{Style.RESET_ALL}\n")
+        return duration
+
+    overall_start = datetime.now()
+    print(f"{Fore.YELLOW} Process started at: {overall_start.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}\n")
+
+    print(f"{Fore.CYAN}{'-' * 50}\n STEP 1: Understanding User Intent\n{'-' * 50}{Style.RESET_ALL}")
+    start_step1 = datetime.now()
+    trip1 = await asyncio.to_thread(get_structured_trip_details, user_query)
+
+    end_step1 = datetime.now()
+    print("\nStructured Intent Response:\n")
+    print(trip1.model_dump_json(indent=2))
+    step1_time = log_time("STEP 1 (Understanding User Intent)", start_step1, end_step1)
+
+    print(
+        f"\n{Fore.CYAN}{'-' * 50}\n STEP 2: Destination + Spots Search + Hotel Search\n{'-' * 50}{Style.RESET_ALL}")
+    start_step2 = datetime.now()
+    step2 = await run_step2(trip1.model_dump())
+    end_step2 = datetime.now()
+    print(json.dumps(step2, indent=2) if "error" in step2 else
+          f"{len(step2['spots'])} spots found, hotel anchor: {step2['hotel_location'].get('name')}")
+    step2_time = log_time("STEP 2 (Destination + Spots + Hotels)", start_step2, end_step2)
+
+    print(f"\n{Fore.GREEN}{'-' * 50}\n STEP 3: Distance + Cost Estimation\n{'-' * 50}{Style.RESET_ALL}")
+    start_step3 = datetime.now()
+    step3 = await process_spots(step2)
+    end_step3 = datetime.now()
+    print(json.dumps(step3, indent=2) if "error" in step3 else
+          f"{len(step3['spots'])} reachable spots, travel budget used: {step3['budget_used_so_far']}")
+    step3_time = log_time("STEP 3 (Distance + Cost Estimation)", start_step3, end_step3)
+
+    print(f"\n{Fore.YELLOW}{'-' * 50}\n Bridge: Step 3 → Step 4 Conversion\n{'-' * 50}{Style.RESET_ALL}")
+    start_step4 = datetime.now()
+    # CPU-bound (clustering + routing): keep it off the shared runtime loop.
+    python_output = await asyncio.to_thread(optimize_day_plan, step2, step3)
+    # Weather for the candidate spots is fetched while the formatter LLM runs;
+    # the enrichment step then only looks up spots the LLM added itself.
+    spots = python_output["spots"]
+    weather_prefetch = prefetch_weather([(spots.lat[i], spots.lng[i]) for day in python_output["days"] for i in day])
+    on_plan_ready = None
+    if stream_writer is not None:
+        on_plan_ready = lambda index, plan: stream_writer({"event": "plan_ready", "plan_index": index, "plan": plan})
+    final_itinerary = await asyncio.to_thread(format_itinerary_with_llm, python_output, user_query, on_plan_ready)
+    end_step4 = datetime.now()
+    print(f"Weather prefetch {'finished' if weather_prefetch.done() else 'still running'} when formatting ended")
+    print("\nLLM Formatted Itinerary:\n")
+    print(json.dumps(final_itinerary, indent=2))
+    step4_time = log_time("STEP 3 to 4 (Itinerary Optimization + LLM Formatting)", start_step4, end_step4)
+
+    print(
+        f"\n{Fore.MAGENTA}{'=' * 50}\n STEP 4 & 5 & STEP 6: Weather ✓ Final Itinerary ✓ Enhancements ✓\n{'=' * 50}{Style.RESET_ALL}"
+    )
+    start_step5 = datetime.now()
+    result = await run_itinerary_pipeline(final_itinerary)
+
+    end_step5 = datetime.now()
+    print("\n FINAL RESULT:\n")
+    print(json.dumps(result, indent=2))
+    step5_time = log_time("STEP 5–6 (Weather + Final Enhancements)", start_step5, end_step5)
+
+    overall_end = datetime.now()
+    overall_duration = (overall_end - overall_start).total_seconds()
+
+    print(f"{Fore.GREEN} DONE! Your trip plan has been successfully generated 🥳✨{Style.RESET_ALL}")
+    print(f"{Fore.CYAN} Process finished at: {overall_end.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}TOTAL EXECUTION TIME: {overall_duration:.2f} seconds{Style.RESET_ALL}")
+
+    # Summary of all step durations
+    print(f"\n{Fore.WHITE}{'=' * 50}")
+    print(f"Execution Time Summary:")
+    print(f"  Step 1: {step1_time:.2f}s")
+    print(f"  Step 2: {step2_time:.2f}s")
+    print(f"  Step 3: {step3_time:.2f}s")
+    print(f"  Step 3-4 convertor: {step4_time:.2f}s")
+    print(f"  Step 4-5–6: {step5_time:.2f}s")
+    print(f"{'-' * 50}")
+    print(f" Total Time: {overall_duration:.2f}s")
+    print(f"{'=' * 50}{Style.RESET_ALL}")
+    return result
+
+
+def _iteration_result(messages, user_query, result):
+    log = {
+        "Iterationagent": {
+            "message": "Successfully generated three structured plans.",
+            "status": "success",
 
-        final_values = {
-            "user_query": user_query,
-            "all_itinearies" :[plan.get("itinerary", {}) for plan in result]
         }
+    }
+    print('*'*50)
+    print(f"plans as of now generated{result}")
+    print('*' * 50)
+    messages.append(AIMessage(content=json.dumps(log)))
+
+    final_values = {
+        "user_query": user_query,
+        "all_itinearies" :[plan.get("itinerary", {}) for plan in result]
+    }
 
 
-        return Command(goto="END", update={"messages": messages, "itinerary_plans": result, "conversation_context":final_values})
+    return Command(goto="END", update={"messages": messages, "itinerary_plans": result, "conversation_context":final_values})
 
-    except Exception as e:
-        print(f"Iteration Agent LLM Error: {e}")
-        log = {
-            "Iterationagent": {
-                "message": f"Plan generation failed due to an LLM error: {e}",
-                "status": "failure"
-            }
+
+def _iteration_error(messages, e):
+    print(f"Iteration Agent LLM Error: {e}")
+    log = {
+        "Iterationagent": {
+            "message": f"Plan generation failed due to an LLM error: {e}",
+            "status": "failure"
         }
-        messages.append(AIMessage(content=json.dumps(log)))
-        return Command(goto="END", update={"messages": messages, "execution_status": "Plan generation failed."})
+    }
+    messages.append(AIMessage(content=json.dumps(log)))
+    return Command(goto="END", update={"messages": messages, "execution_status": "Plan generation failed."})
+
 
+def Iterationagent(state: State) -> Command[Literal["Supervisor"]]:
+    """Runs plan_itinerary on the shared async runtime; the graph itself is driven synchronously."""
 
+    print(" * " * 50)
+    print("\n Im inside iteration agent\n")
+    print(" * " * 50)
 
+    messages = state["messages"]
+    user_query = state["user_query"]
+    try:
+        # The writer is bound to this node's context, so it is resolved here, not on the runtime thread.
+        result = run_sync(plan_itinerary(user_query, get_stream_writer()))
+        return _iteration_result(messages, user_query, result)
+    except Exception as e:
+        return _iteration_error(messages, e)
 
 
 def BusBookingAgent(state:State)->Command[Literal["END"]]:
@@ -596,7 +719,12 @@ def GeneralChatagent(state: State) -> Command[Literal["END"]]:
 
 
 
-def compile_graph():
+def compile_graph(combined_router=COMBINED_ROUTER):
+    """Build the agent graph.
+
+    With `combined_router` the entry node is RouteExtractAgent (one LLM call for routing and
+    slot extraction) instead of the Supervisor -> initialAgent -> Supervisor path.
+    """
 
     def end_node(state: State):
         return state
@@ -606,6 +734,8 @@ def compile_graph():
     graph_builder = StateGraph(State)
 
     # Add all nodes
+    if combined_router:
+        graph_builder.add_node("RouteExtractAgent", RouteExtractAgent)
     graph_builder.add_node("initialAgent", initialagent)
     graph_builder.add_node("Supervisor", Supervisor)
     graph_builder.add_node("FlightBookingagent", FlightBookingagent)
@@ -616,7 +746,7 @@ def compile_graph():
     # graph_builder.add_node("END", lambda x: x)
     graph_builder.add_node("END", end_node)
 
-    graph_builder.add_edge(START, "Supervisor")
+    graph_builder.add_edge(START, "RouteExtractAgent" if combined_router else "Supervisor")
     # graph_builder.add_edge("Supervisor", "initialAgent")
     # graph_builder.add_edge("Supervisor", "FlightBookingagent")
     # graph_builder.add_edge("Supervisor", "Iterationagent")
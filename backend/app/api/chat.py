@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify
-from app.services.chat_service import process_chat_message
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.services.chat_service import process_chat_message, stream_chat_message
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -39,4 +40,48 @@ def chat_endpoint():
                 "Get hotel recommendations",
                 "Explore destinations"
             ]
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
+@chat_bp.route("/api/chat/stream", methods=["POST", "OPTIONS"])
+def chat_stream_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'CORS preflight passed'}), 200
+
+    data = request.get_json(silent=True) or {}
+    user_query = data.get("query", "").strip()
+    conversation_id = data.get("conversation_id")
+    run_id = data.get("run_id")
+
+    if not user_query:
+        return jsonify({
+            "response_type": "chat",
+            "message": "Please provide a query."
+        }), 400
+
+    def generate():
+        try:
+            for event, payload in stream_chat_message(user_query, conversation_id, run_id):
+                yield _sse(event, payload)
+        except Exception as e:
+            print(f"Global Stream Error: {e}")
+            yield _sse("error", {
+                "response_type": "error",
+                "message": "Unexpected server error occurred. Please try again.",
+                "follow_up_questions": [
+                    "Plan a trip",
+                    "Find flight options",
+                    "Get hotel recommendations",
+                    "Explore destinations"
+                ]
+            })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
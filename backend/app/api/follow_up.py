@@ -2,7 +2,7 @@ import sys
 
 from flask import Blueprint, request, jsonify
 from app.agents.follow_up_generator import generate_contextual_follow_ups
-from app.database.chat_storage import get_conversation_messages
+from app.agents.context_builder import build_conversation_context
 follow_up_gen = Blueprint('follow_up', __name__)
 
 
@@ -23,7 +23,7 @@ def follow_up_gen_endpoint():
     ai_message = data.get("message") or ""
     conversation_id = data.get("conversation_id")
 
-    conversation_list = get_conversation_messages(conversation_id)
+    conversation_list = build_conversation_context(conversation_id, "follow_up")
 
     try:
 
@@ -113,6 +113,85 @@ def get_conversation_messages(conversation_id, limit=100, skip=0):
     return list_messages
 
 
+def _flatten_runs(runs):
+    list_messages = []
+    for run in runs:
+        for message in run.get("messages", []):
+            list_messages.append({"role": message["role"], "content": message["content"]})
+    return list_messages
+
+
+def get_conversation_context(conversation_id, recent_runs=4):
+    """Rolling summary plus only the last `recent_runs` runs, sliced server-side."""
+    conversation_message_list = get_messages_collection()
+    empty = {"summary": "", "summarized_runs": 0, "run_count": 0, "recent_messages": []}
+
+    if conversation_message_list is None or not conversation_id:
+        return empty
+
+    docs = list(conversation_message_list.aggregate([
+        {"$match": {"conversation_id": conversation_id}},
+        {"$project": {
+            "_id": 0,
+            "context_summary": 1,
+            "context_summary_runs": 1,
+            "run_count": {"$size": {"$ifNull": ["$runs", []]}},
+            "runs": {"$slice": [{"$ifNull": ["$runs", []]}, -recent_runs]},
+        }},
+    ]))
+
+    if not docs:
+        return empty
+
+    doc = docs[0]
+    return {
+        "summary": doc.get("context_summary", ""),
+        "summarized_runs": doc.get("context_summary_runs", 0),
+        "run_count": doc.get("run_count", 0),
+        "recent_messages": _flatten_runs(doc.get("runs", [])),
+    }
+
+
+def get_conversation_runs(conversation_id, start, end):
+    """Messages of runs[start:end] — used to fold older turns into the summary."""
+    conversation_message_list = get_messages_collection()
+    if conversation_message_list is None or end <= start:
+        return []
+
+    conversation = conversation_message_list.find_one(
+        {"conversation_id": conversation_id},
+        {"_id": 0, "runs": {"$slice": [start, end - start]}}
+    )
+    if not conversation:
+        return []
+    return _flatten_runs(conversation.get("runs", []))
+
+
+def update_conversation_summary(conversation_id, summary, summarized_runs):
+    """Store a folded summary unless a newer one (covering more runs) is already stored.
+
+    Returns True if the summary was written.
+    """
+    conversation_message_list = get_messages_collection()
+    if conversation_message_list is None:
+        return False
+
+    # Folds run on a thread pool, so an older, slower fold must not overwrite a newer one.
+    result = conversation_message_list.update_one(
+        {
+            "conversation_id": conversation_id,
+            "context_summary_runs": {"$not": {"$gte": summarized_runs}},
+        },
+        {
+            "$set": {
+                "context_summary": summary,
+                "context_summary_runs": summarized_runs,
+            }
+        }
+    )
+    return result.modified_count > 0
+
+
 # get_conversation_messages("1766861522952-cs7ivkqs")
 
 
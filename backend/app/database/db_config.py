@@ -35,3 +35,20 @@ users_collection = db["users"] if db is not None else None
 
 def get_users_collection():
     return users_collection
+
+
+_cache_collections = {}
+
+def get_cache_collection(name):
+    """TTL-indexed collection for cache tiers; documents expire at `expires_at`."""
+    if db is None:
+        return None
+    collection = _cache_collections.get(name)
+    if collection is None:
+        collection = db[name]
+        try:
+            collection.create_index("expires_at", expireAfterSeconds=0)
+        except Exception as e:
+            print(f" Failed to create TTL index on {name}: {e}")
+        _cache_collections[name] = collection
+    return collection
@@ -3,6 +3,9 @@ import googlemaps
 from googlemaps.exceptions import ApiError
 from dotenv import load_dotenv
 
+from app.external.google_maps.geocode import geocode
+from app.external.google_maps.place_index import index_places, places_within
+from app.utils.metrics import incr
 
 load_dotenv()
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
@@ -22,42 +25,63 @@ except ValueError:
 print("Google Maps Client initialized successfully.")
 
 
-def find_best_nearby_hotels(address: str, radius: int = DEFAULT_SEARCH_RADIUS_METERS, limit: int = 5) -> list:
+def _lodging_record(place):
+    location = place.get("geometry", {}).get("location", {})
+    return {
+        "id": place.get("place_id"),
+        "name": place.get("name"),
+        "lat": location.get("lat"),
+        "lng": location.get("lng"),
+        "rating": place.get("rating"),
+        "types": place.get("types", []),
+    }
+
+
+def _nearby_lodging(lat, lng, radius, limit):
+    """Lodging records within `radius` metres: from the place index when it already
+    holds `limit` of them, else from a Places nearby search (which is indexed)."""
+    indexed = places_within(lat, lng, radius / 1000, kind="lodging")
+    if len(indexed) >= limit:
+        incr("hotels.nearby.index_hit")
+        print(f" Found {len(indexed)} indexed lodging places within {radius}m.")
+        return indexed
+
+    incr("hotels.nearby.search")
+    places_result = gmaps.places_nearby(
+        location=(lat, lng),
+        radius=radius,
+        type='lodging'
+    )
+    records = [_lodging_record(place) for place in places_result.get('results', [])]
+    index_places(records, kind="lodging")
+    print(f" Found {len(records)} lodging places within {radius}m.")
+    return records
 
-    print(f"\n--- Searching for hotels near: '{address}' ---")
 
-    try:
-        geocode_result = gmaps.geocode(address)
-        if not geocode_result:
-            print(f" Could not find coordinates for the address: {address}")
-            return []
+def find_best_nearby_hotels(address: str, radius: int = DEFAULT_SEARCH_RADIUS_METERS, limit: int = 5) -> list:
 
-        location = geocode_result[0]['geometry']['location']
-        lat, lng = location['lat'], location['lng']
-        print(f" Coordinates found at: {lat}, {lng}")
+    print(f"\n--- Searching for hotels near: '{address}' ---")
 
-    except ApiError as e:
-        print(f" API ERROR during geocoding: {e}")
+    coords = geocode(address)
+    if not coords:
+        print(f" Could not find coordinates for the address: {address}")
         return []
 
-    try:
-        places_result = gmaps.places_nearby(
-            location=(lat, lng),
-            radius=radius,
-            type='lodging'
-        )
-
-        place_results = places_result.get('results', [])
-        print(f" Found {len(place_results)} lodging places within {radius}m.")
+    lat, lng = coords
+    print(f" Coordinates found at: {lat}, {lng}")
 
-        if not place_results:
+    try:
+        candidates = _nearby_lodging(lat, lng, radius, limit)
+        if not candidates:
             return []
 
+        # Only the best-rated candidates need a details lookup.
+        candidates = sorted(candidates, key=lambda x: x.get('rating') or 0.0, reverse=True)[:limit]
+
         hotels_list = []
-        for place in place_results:
-            place_id = place['place_id']
+        for place in candidates:
             place_details = gmaps.place(
-                place_id=place_id,
+                place_id=place['id'],
                 fields=['name', 'formatted_address', 'rating', 'website', 'url']
             )
 
@@ -71,9 +95,7 @@ def find_best_nearby_hotels(address: str, radius: int = DEFAULT_SEARCH_RADIUS_ME
                     "Google Maps Link": result.get('url', 'N/A')
                 })
 
-        # 3. Sort by rating and return only top N results
-        sorted_hotels = sorted(hotels_list, key=lambda x: x.get('Rating', 0.0), reverse=True)
-        top_hotels = sorted_hotels[:limit]
+        top_hotels = sorted(hotels_list, key=lambda x: x.get('Rating', 0.0), reverse=True)
 
         print(f" Returning top {len(top_hotels)} hotels.")
         return top_hotels
@@ -85,7 +107,6 @@ def find_best_nearby_hotels(address: str, radius: int = DEFAULT_SEARCH_RADIUS_ME
 
 
 
-
 # --- Example of Agent Interaction ---
 # if __name__ == "__main__":
 #     def accommodation_agent_mock_call(place_address: str, search_radius: int):
@@ -4,22 +4,15 @@ from datetime import datetime
 
 import os
 from dotenv import load_dotenv
+
+from app.external.google_maps.geocode import geocode_many
+
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 GOOGLE_DIRECTIONS_URL = "https://maps.googleapis.com/maps/api/directions/json"
 
 
-def geocode(address):
-    params = {"address": address, "key": GOOGLE_API_KEY}
-    r = requests.get("https://maps.googleapis.com/maps/api/geocode/json", params=params)
-    j = r.json()
-    if j.get("status") == "OK" and j["results"]:
-        loc = j["results"][0]["geometry"]["location"]
-        return (loc["lat"], loc["lng"])
-    return None
-
-
 def secs_to_human(seconds):
     m = seconds // 60
     if m < 60:
@@ -33,8 +26,7 @@ def get_bus_routes_json(origin, destination, departure_time=None):
     if not departure_time:
         departure_time = int(datetime.now().timestamp())
 
-    origin_coords = geocode(origin)
-    dest_coords = geocode(destination)
+    origin_coords, dest_coords = geocode_many([origin, destination])
 
     if not origin_coords or not dest_coords:
         return {"error": "Invalid origin or destination"}
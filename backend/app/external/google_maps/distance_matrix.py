@@ -0,0 +1,166 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from app.utils.async_runtime import httpx_client
+from app.utils.cache import TieredCache
+from app.utils.metrics import incr, observe
+
+load_dotenv()
+
+# -------------------------
+# CONFIG
+# -------------------------
+GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+# Distance Matrix API request limits
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+TILE_SIZE = 10  # 10 x 10 = MAX_ELEMENTS
+
+DISTANCE_MATRIX_CONCURRENCY = int(os.getenv("DISTANCE_MATRIX_CONCURRENCY", "4"))
+DISTANCE_PAIR_CACHE_TTL_SECONDS = int(os.getenv("DISTANCE_PAIR_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Pairs are tiny and looked up by the hundred, so they stay in-process only.
+_pair_cache = TieredCache("distance_pairs", maxsize=50000, ttl_seconds=DISTANCE_PAIR_CACHE_TTL_SECONDS, persistent=False)
+
+
+def _point_key(point):
+    lat, lng = point
+    return f"{round(float(lat), 5)},{round(float(lng), 5)}"
+
+
+def _pair_key(origin, destination, mode):
+    return f"{mode}|{_point_key(origin)}|{_point_key(destination)}"
+
+
+def _tiles(count, size):
+    return [list(range(start, min(start + size, count))) for start in range(0, count, size)]
+
+
+async def _fetch_tile(client, semaphore, origins, destinations, mode):
+    params = {
+        "origins": "|".join(_point_key(p) for p in origins),
+        "destinations": "|".join(_point_key(p) for p in destinations),
+        "mode": mode,
+        "units": "metric",
+        "key": GOOGLE_MAPS_API_KEY,
+    }
+    async with semaphore:
+        incr("distance_matrix.api_call")
+        incr("distance_matrix.elements", len(origins) * len(destinations))
+        response = await client.get(DISTANCE_MATRIX_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+
+    if data.get("status") != "OK":
+        raise RuntimeError(f"Distance Matrix status {data.get('status')}: {data.get('error_message', '')}")
+    return data["rows"]
+
+
+async def build_distance_matrix(origins, destinations=None, symmetric=False, mode="driving", client=None):
+    """Index-based travel matrix between coordinate lists.
+
+    `origins` / `destinations` are lists of (lat, lng); with `destinations=None` the
+    matrix is origins x origins and the diagonal is 0. The problem is tiled into
+    blocks within the API limits, only pairs missing from the pair cache are
+    requested, and tiles run concurrently under DISTANCE_MATRIX_CONCURRENCY.
+    With `symmetric=True` (square matrices only) each unordered pair is fetched once
+    and mirrored.
+
+    Returns {"distance_km": [[...]], "time_min": [[...]]}; unreachable or failed
+    pairs are None.
+    """
+    start = time.perf_counter()
+    square = destinations is None
+    destinations = origins if square else destinations
+    symmetric = symmetric and square
+
+    n_rows, n_cols = len(origins), len(destinations)
+    meters = [[None] * n_cols for _ in range(n_rows)]
+    seconds = [[None] * n_cols for _ in range(n_rows)]
+
+    def needed(i, j):
+        return not (square and (i == j or (symmetric and i > j)))
+
+    # 1. Pair cache
+    missing = set()
+    for i in range(n_rows):
+        for j in range(n_cols):
+            if square and i == j:
+                meters[i][j], seconds[i][j] = 0, 0
+                continue
+            if not needed(i, j):
+                continue
+            cached = _pair_cache.get(_pair_key(origins[i], destinations[j], mode))
+            if cached is None and symmetric:
+                cached = _pair_cache.get(_pair_key(destinations[j], origins[i], mode))
+            if cached is None:
+                missing.add((i, j))
+            else:
+                meters[i][j], seconds[i][j] = cached
+
+    # 2. Tiles covering the missing pairs, trimmed to the rows/cols that still need data
+    tiles = []
+    for row_block in _tiles(n_rows, TILE_SIZE):
+        for col_block in _tiles(n_cols, TILE_SIZE):
+            pairs = [(i, j) for i in row_block for j in col_block if (i, j) in missing]
+            if not pairs:
+                continue
+            rows = sorted({i for i, _ in pairs})
+            cols = sorted({j for _, j in pairs})
+            tiles.append((rows, cols))
+
+    # 3. Fetch tiles concurrently
+    if tiles:
+        semaphore = asyncio.Semaphore(DISTANCE_MATRIX_CONCURRENCY)
+
+        async def fetch_all(client):
+            return await asyncio.gather(
+                *[
+                    _fetch_tile(client, semaphore, [origins[i] for i in rows], [destinations[j] for j in cols], mode)
+                    for rows, cols in tiles
+                ],
+                return_exceptions=True,
+            )
+
+        if client is not None:
+            responses = await fetch_all(client)
+        else:
+            async with httpx_client(timeout=20) as own_client:
+                responses = await fetch_all(own_client)
+
+        for (rows, cols), response in zip(tiles, responses):
+            if isinstance(response, Exception):
+                incr("distance_matrix.tile_error")
+                print(f" Distance Matrix tile {len(rows)}x{len(cols)} failed: {response}")
+                continue
+            for ri, i in enumerate(rows):
+                for ci, j in enumerate(cols):
+                    if not needed(i, j):
+                        continue
+                    element = response[ri]["elements"][ci]
+                    if element.get("status") != "OK":
+                        incr("distance_matrix.element_error")
+                        continue
+                    value = (element["distance"]["value"], element["duration"]["value"])
+                    meters[i][j], seconds[i][j] = value
+                    _pair_cache.set(_pair_key(origins[i], destinations[j], mode), value)
+
+    # 4. Mirror the lower triangle
+    if symmetric:
+        for i in range(n_rows):
+            for j in range(i):
+                meters[i][j], seconds[i][j] = meters[j][i], seconds[j][i]
+
+    incr("distance_matrix.pairs_requested", len(missing))
+    observe("distance_matrix.build", time.perf_counter() - start)
+
+    return {
+        "distance_km": [[None if m is None else round(m / 1000, 2) for m in row] for row in meters],
+        "time_min": [[None if s is None else round(s / 60, 1) for s in row] for row in seconds],
+    }
@@ -0,0 +1,105 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+from app.external.google_maps.place_index import index_places
+from app.utils.cache import TieredCache, make_cache_key, normalize_text, _MISSING
+from app.utils.metrics import incr
+
+load_dotenv()
+
+# -------------------------
+# CONFIG
+# -------------------------
+GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL_SECONDS = int(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+GEOCODE_CACHE_MAXSIZE = int(os.getenv("GEOCODE_CACHE_MAXSIZE", "4096"))
+GEOCODE_TIMEOUT_SECONDS = 10
+
+# Statuses that mean "this address does not resolve"; anything else (quota,
+# network) is transient and never cached.
+_NEGATIVE_STATUSES = ("ZERO_RESULTS", "INVALID_REQUEST")
+
+_geocode_cache = TieredCache("geocode", maxsize=GEOCODE_CACHE_MAXSIZE, ttl_seconds=GEOCODE_CACHE_TTL_SECONDS)
+_negative_cache = TieredCache("geocode_negative", maxsize=GEOCODE_CACHE_MAXSIZE, ttl_seconds=GEOCODE_NEGATIVE_TTL_SECONDS)
+_http = requests.Session()
+_geocode_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="geocode")
+
+
+def normalize_address(address):
+    """Cache-key form: lower-case, single-spaced, ", " separators, no trailing punctuation."""
+    text = normalize_text(address)
+    text = re.sub(r"\s*,\s*", ", ", text)
+    return text.strip(" ,.")
+
+
+def _fetch(address):
+    """Geocoding API call. Returns (record or None, cacheable)."""
+    incr("geocode.api_call")
+    try:
+        r = _http.get(GEOCODE_URL, params={"address": address, "key": GOOGLE_API_KEY}, timeout=GEOCODE_TIMEOUT_SECONDS)
+        j = r.json()
+    except (requests.RequestException, ValueError) as e:
+        incr("geocode.error")
+        print(f" Geocoding failed for '{address}': {e}")
+        return None, False
+
+    status = j.get("status")
+    if status == "OK" and j.get("results"):
+        result = j["results"][0]
+        loc = result["geometry"]["location"]
+        return {
+            "id": result.get("place_id"),
+            "name": result.get("formatted_address", address),
+            "lat": loc["lat"],
+            "lng": loc["lng"],
+            "types": result.get("types", []),
+        }, True
+
+    if status not in _NEGATIVE_STATUSES:
+        incr("geocode.error")
+        print(f" Geocoding '{address}' returned {status}")
+    return None, status in _NEGATIVE_STATUSES
+
+
+def geocode_record(address):
+    """{"id", "name", "lat", "lng", "types"} for `address`, or None if it does not resolve."""
+    if not address or not str(address).strip():
+        return None
+    key = make_cache_key("geocode", normalize_address(address))
+
+    record = _geocode_cache.get(key, _MISSING)
+    if record is not _MISSING:
+        return dict(record)
+    if _negative_cache.get(key, _MISSING) is not _MISSING:
+        incr("geocode.negative_hit")
+        return None
+
+    record, cacheable = _fetch(address)
+    if record is not None:
+        _geocode_cache.set(key, record)
+        index_places([record], kind="geocode")
+        return dict(record)
+    if cacheable:
+        _negative_cache.set(key, True)
+    return None
+
+
+def geocode(address):
+    """(lat, lng) for `address`, or None."""
+    record = geocode_record(address)
+    return (record["lat"], record["lng"]) if record else None
+
+
+def geocode_many(addresses):
+    """geocode() for each address, resolved concurrently, in input order."""
+    return list(_geocode_executor.map(geocode, addresses))
+
+
+def get_geocode_cache_stats():
+    return {"positive": _geocode_cache.stats(), "negative": _negative_cache.stats()}
@@ -0,0 +1,102 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from app.database.db_config import get_cache_collection
+from app.utils.metrics import incr
+from app.utils.spatial_index import GridIndex
+
+# -------------------------
+# CONFIG
+# -------------------------
+PLACE_INDEX_ENABLED = os.getenv("PLACE_INDEX_ENABLED", "true").lower() != "false"
+PLACE_INDEX_CELL_DEG = float(os.getenv("PLACE_INDEX_CELL_DEG", "0.1"))  # ~11 km cells
+PLACE_INDEX_MAX_POINTS = int(os.getenv("PLACE_INDEX_MAX_POINTS", "200000"))
+PLACE_INDEX_TTL_SECONDS = int(os.getenv("PLACE_INDEX_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# -------------------------
+# Grid index over every place we have fetched
+# -------------------------
+# Filled incrementally from the Places cache (search results and details) and
+# persisted to a Mongo TTL collection, so a fresh worker starts warm.
+_index = GridIndex(PLACE_INDEX_CELL_DEG)
+_load_lock = threading.Lock()
+_loaded = False
+
+
+def _collection():
+    return get_cache_collection("place_index")
+
+
+def place_kind(record):
+    return "lodging" if "lodging" in (record.get("types") or []) else "spot"
+
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if _loaded:
+            return
+        collection = _collection()
+        if collection is not None:
+            try:
+                docs = collection.find({"expires_at": {"$gt": datetime.utcnow()}}).limit(PLACE_INDEX_MAX_POINTS)
+                for doc in docs:
+                    _index.insert(doc["_id"], doc["lat"], doc["lng"], doc.get("kind"), doc.get("record"))
+                print(f" Place index loaded: {len(_index)} places")
+            except Exception as e:
+                print(f" Place index load failed: {e}")
+        _loaded = True
+
+
+def index_places(records, kind=None):
+    """Add records with an id and coordinates to the index; new ones are persisted.
+
+    `kind` defaults to place_kind(record). Returns the number of new places.
+    """
+    if not PLACE_INDEX_ENABLED:
+        return 0
+    _ensure_loaded()
+
+    new_docs = []
+    expires_at = datetime.utcnow() + timedelta(seconds=PLACE_INDEX_TTL_SECONDS)
+    for record in records:
+        point_id, lat, lng = record.get("id"), record.get("lat"), record.get("lng")
+        if point_id is None or lat is None or lng is None or point_id in _index:
+            continue
+        if len(_index) >= PLACE_INDEX_MAX_POINTS:
+            incr("place_index.full")
+            break
+        record_kind = kind or place_kind(record)
+        _index.insert(point_id, float(lat), float(lng), record_kind, dict(record))
+        new_docs.append({
+            "_id": point_id, "lat": float(lat), "lng": float(lng),
+            "kind": record_kind, "record": dict(record), "expires_at": expires_at,
+        })
+
+    if new_docs:
+        incr("place_index.inserted", len(new_docs))
+        collection = _collection()
+        if collection is not None:
+            try:
+                collection.insert_many(new_docs, ordered=False)
+            except Exception as e:
+                # Duplicate ids from another worker are expected; anything else is logged.
+                if "E11000" not in str(e):
+                    print(f" Place index write failed: {e}")
+    return len(new_docs)
+
+
+def places_within(lat, lng, radius_km, kind=None):
+    """Indexed place records within `radius_km` of (lat, lng), nearest first, each with "distance_km"."""
+    if not PLACE_INDEX_ENABLED:
+        return []
+    _ensure_loaded()
+    incr("place_index.query")
+    return [dict(record, distance_km=round(d, 3)) for d, _, record in _index.within(lat, lng, radius_km, kind)]
+
+
+def get_place_index_stats():
+    return {"enabled": PLACE_INDEX_ENABLED, **_index.stats()}
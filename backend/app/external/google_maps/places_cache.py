@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+from app.external.google_maps.place_index import index_places, get_place_index_stats
+from app.utils.cache import TieredCache, coalesced_get, inflight_count, make_cache_key, normalize_text
+from app.utils.metrics import incr
+
+# -------------------------
+# CONFIG
+# -------------------------
+PLACES_CACHE_ENABLED = os.getenv("PLACES_CACHE_ENABLED", "true").lower() != "false"
+PLACES_CACHE_TTL_SECONDS = int(os.getenv("PLACES_CACHE_TTL_SECONDS", str(3 * 24 * 3600)))
+PLACES_CACHE_MAXSIZE = int(os.getenv("PLACES_CACHE_MAXSIZE", "2048"))
+
+PLACE_DETAILS_TTL_SECONDS = int(os.getenv("PLACE_DETAILS_TTL_SECONDS", str(7 * 24 * 3600)))
+
+_places_cache = TieredCache("places_search", maxsize=PLACES_CACHE_MAXSIZE, ttl_seconds=PLACES_CACHE_TTL_SECONDS)
+_place_details_cache = TieredCache("place_details", maxsize=PLACES_CACHE_MAXSIZE * 4, ttl_seconds=PLACE_DETAILS_TTL_SECONDS)
+
+
+def places_cache_key(query, destination, variant):
+    return make_cache_key("places", variant, normalize_text(query), normalize_text(destination))
+
+
+async def cached_places_search(query, destination, variant, fetch):
+    """Trimmed spot records for a Places search, from cache or by awaiting `fetch()`.
+
+    Records are copied out of the cache so callers can annotate them freely.
+    """
+    if not PLACES_CACHE_ENABLED:
+        records = await fetch() or []
+    else:
+        key = places_cache_key(query, destination, variant)
+        records = await coalesced_get(_places_cache, key, fetch, "places.search") or []
+    await asyncio.to_thread(index_places, records)
+    return [dict(record) for record in records]
+
+
+async def cached_place_details(place_id, fetch):
+    """Trimmed spot record for one place_id, from cache or by awaiting `fetch()` (None if unavailable)."""
+    if not PLACES_CACHE_ENABLED:
+        record = await fetch()
+    else:
+        key = make_cache_key("place_details", place_id)
+        record = await coalesced_get(_place_details_cache, key, fetch, "places.details")
+    if not record:
+        return None
+    await asyncio.to_thread(index_places, [record])
+    return dict(record)
+
+
+def get_places_cache_stats():
+    return {
+        "search": _places_cache.stats(),
+        "details": _place_details_cache.stats(),
+        "inflight": inflight_count(),
+        "index": get_place_index_stats(),
+    }
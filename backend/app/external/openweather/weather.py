@@ -0,0 +1,163 @@
+import asyncio
+import os
+from datetime import date
+
+import aiohttp
+from aiohttp import ClientTimeout
+from dotenv import load_dotenv
+
+from app.utils.async_runtime import client_session, submit
+from app.utils.cache import TieredCache, coalesced_get, make_cache_key
+from app.utils.metrics import incr
+
+load_dotenv()
+
+# -------------------------
+# CONFIG
+# -------------------------
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+# Precision 5 cells are ~4.9 km x 4.9 km: spots in the same cell share one request.
+WEATHER_GEOHASH_PRECISION = int(os.getenv("WEATHER_GEOHASH_PRECISION", "5"))
+WEATHER_CACHE_TTL_SECONDS = int(os.getenv("WEATHER_CACHE_TTL_SECONDS", "1800"))
+WEATHER_CONCURRENCY = int(os.getenv("WEATHER_CONCURRENCY", "8"))
+WEATHER_TIMEOUT_SECONDS = 5
+WEATHER_RETRY_DELAY_SECONDS = 0.5
+
+_weather_cache = TieredCache("weather", maxsize=4096, ttl_seconds=WEATHER_CACHE_TTL_SECONDS)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# -------------------------
+# Geohash cells
+# -------------------------
+def geohash_encode(lat, lng, precision=WEATHER_GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_centre(cell):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+
+def activity_cell(act):
+    """Weather cell for an activity dict ("lat" + "long"/"lng"), or None without coordinates."""
+    try:
+        lat = float(act.get("lat"))
+        lng = float(act.get("long", act.get("lng")))
+    except (TypeError, ValueError):
+        return None
+    return geohash_encode(lat, lng)
+
+
+def _condition(data):
+    cond = data["weather"][0]["main"].lower()
+    if "rain" in cond:
+        return "rainy"
+    elif "cloud" in cond:
+        return "cloudy"
+    elif "clear" in cond:
+        return "clear"
+    return cond
+
+
+# -------------------------
+# Cached, one-request-per-cell lookups
+# -------------------------
+async def _fetch_cell(session, semaphore, cell):
+    """Condition for the cell centre, or None (not cached) if OpenWeather did not answer."""
+    lat, lng = geohash_centre(cell)
+    params = {"lat": lat, "lon": lng, "appid": OPENWEATHER_API_KEY or "", "units": "metric"}
+    async with semaphore:
+        for attempt in range(2):
+            try:
+                async with session.get(OPENWEATHER_URL, params=params, timeout=ClientTimeout(total=WEATHER_TIMEOUT_SECONDS)) as resp:
+                    if resp.status == 200:
+                        data = await resp.json()
+                        return _condition(data) if data.get("weather") else None
+                    if resp.status != 429 and resp.status < 500:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f" Weather fetch failed for cell {cell}: {e}")
+            if attempt == 0:
+                await asyncio.sleep(WEATHER_RETRY_DELAY_SECONDS)
+    incr("weather.error")
+    return None
+
+
+async def weather_for_cells(cells, session=None, semaphore=None):
+    """{cell: condition} for every distinct cell, one request per cell per day at most.
+
+    `semaphore` bounds concurrent requests across calls (default: WEATHER_CONCURRENCY per call).
+    """
+    cells = sorted({c for c in cells if c})
+    if not cells:
+        return {}
+    day = date.today().isoformat()
+
+    async def resolve(session):
+        limit = semaphore or asyncio.Semaphore(WEATHER_CONCURRENCY)
+
+        async def one(cell):
+            key = make_cache_key("weather", cell, day)
+            value = await coalesced_get(_weather_cache, key, lambda: _fetch_cell(session, limit, cell), "weather")
+            return value or "unknown"
+
+        return dict(zip(cells, await asyncio.gather(*(one(c) for c in cells))))
+
+    if session is not None:
+        return await resolve(session)
+    async with client_session() as own_session:
+        return await resolve(own_session)
+
+
+async def annotate_weather(activities, session=None, semaphore=None):
+    """Set act["weather"] on every activity; activities without coordinates get "unknown"."""
+    cells = [activity_cell(act) for act in activities]
+    conditions = await weather_for_cells(cells, session, semaphore)
+    incr("weather.activities", len(activities))
+    for act, cell in zip(activities, cells):
+        act["weather"] = conditions.get(cell, "unknown") if cell else "unknown"
+
+
+def prefetch_weather(points):
+    """Warm the cache for [(lat, lng), ...] on the async runtime; returns a concurrent Future.
+
+    Lookups that start while the prefetch is still running join its in-flight
+    requests instead of issuing their own.
+    """
+    cells = [geohash_encode(float(lat), float(lng)) for lat, lng in points]
+    incr("weather.prefetch")
+    return submit(weather_for_cells(cells))
+
+
+def get_weather_cache_stats():
+    return _weather_cache.stats()
@@ -1,7 +1,26 @@
-from langchain_core.messages import HumanMessage
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage, AIMessageChunk
 from app.agents.trip_graph import langgraph_app
-from app.database.chat_storage import store_chat_message, create_conversation, append_run_message
+from app.database.chat_storage import store_chat_message, create_conversation, append_run_message, get_conversation_context
 from app.services.translation_service import translate_auto_to_english, translate_to_language
+from app.agents.context_builder import update_rolling_summary, CONTEXT_RECENT_TURNS
+
+_pre_graph_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-pre-graph")
+
+# Rolling summaries are refreshed off the request path.
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="context-summary")
+
+
+def _schedule_summary_update(conversation_id):
+    def run():
+        try:
+            update_rolling_summary(conversation_id)
+        except Exception as e:
+            print(f" Rolling summary update failed: {e}")
+
+    _summary_executor.submit(run)
 
 def extract_user_facing_message(final_state):
 
@@ -18,38 +37,78 @@ def extract_user_facing_message(final_state):
     return "I've processed your travel request successfully!"
 
 
-def process_chat_message(user_query, conversation_id, run_id):
+def _timed_call(timings, stage, fn, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
+
 
-    if not conversation_id:
-        conversation = create_conversation()
-        conversation_id = conversation["conversation_id"]
-        print(f" Created conversation: {conversation_id}")
+def _prepare_chat_run(user_query, conversation_id, run_id):
+    """Pre-graph stage: conversation creation, translation, user-message persistence
+    and history fetch are independent, so they run concurrently.
+
+    Returns (conversation_id, detected_lang, graph_input, timings); graph_input carries
+    the loaded history so graph nodes don't fetch it again.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    is_new_conversation = not conversation_id
+    conversation_id = conversation_id or str(uuid.uuid4())
+    print(f" {'Creating' if is_new_conversation else 'Using existing'} conversation: {conversation_id}")
+
+    futures = {
+        "translate": _pre_graph_executor.submit(_timed_call, timings, "translate", translate_auto_to_english, user_query),
+        # store_chat_message does not persist metadata, so it need not wait for translation.
+        "store_user_message": _pre_graph_executor.submit(
+            _timed_call, timings, "store_user_message", store_chat_message,
+            conversation_id=conversation_id, run_id=run_id, role="user", content=user_query
+        ),
+    }
+    if is_new_conversation:
+        futures["create_conversation"] = _pre_graph_executor.submit(
+            _timed_call, timings, "create_conversation", create_conversation, conversation_id
+        )
     else:
-        print(f" Using existing conversation: {conversation_id}")
-    
-    detected_lang, query_en = translate_auto_to_english(user_query)
+        futures["history"] = _pre_graph_executor.submit(
+            _timed_call, timings, "history", get_conversation_context, conversation_id, CONTEXT_RECENT_TURNS
+        )
+
+    # Surface persistence errors exactly as the sequential version did.
+    for stage in ("create_conversation", "store_user_message"):
+        if stage in futures:
+            futures[stage].result()
+
+    detected_lang, query_en = futures["translate"].result()
     print(f" Detected: {detected_lang} | English: {query_en}")
-    
-    store_chat_message(
-        conversation_id=conversation_id,
-        run_id= run_id,
-        role="user",
-        content=user_query,
-        metadata={
-            "detected_language": detected_lang,
-            "query_en": query_en
-        }
-    )
-    
-    final_state = langgraph_app.invoke({
+
+    if "history" in futures:
+        conversation_history = futures["history"].result()
+    else:
+        conversation_history = {"summary": "", "summarized_runs": 0, "run_count": 0, "recent_messages": []}
+
+    # The history read raced the user-message write; make sure the current turn is in it.
+    current = {"role": "user", "content": user_query}
+    recent = conversation_history["recent_messages"]
+    if not recent or recent[-1] != current:
+        conversation_history["recent_messages"] = recent + [current]
+        conversation_history["run_count"] += 1
+
+    timings["pre_graph_total"] = round(time.perf_counter() - start, 3)
+    print(f" Pre-graph stage timings: {timings}")
+
+    graph_input = {
         "messages": [HumanMessage(content=query_en)],
         "user_query": query_en,
-        "conversation_id": conversation_id
-    })
-    print(" - "*50)
-    print("\n\nLangGraph execution complete : \n\n")
-    print(final_state)
-    print(" - " * 50)
+        "conversation_id": conversation_id,
+        "conversation_history": conversation_history
+    }
+    return conversation_id, detected_lang, graph_input, timings
+
+
+def _finalize_chat_run(final_state, conversation_id, run_id, detected_lang):
 
     assistant_message = extract_user_facing_message(final_state)
     response_type = "chat"
@@ -69,6 +128,7 @@ def process_chat_message(user_query, conversation_id, run_id):
             "follow": final_state.get("follow")
         }
     )
+    _schedule_summary_update(conversation_id)
     
     response_data = {
         "response_type": response_type,
@@ -91,3 +151,72 @@ def process_chat_message(user_query, conversation_id, run_id):
         response_data["response_type"] = "bookings"
     
     return response_data
+
+
+def process_chat_message(user_query, conversation_id, run_id):
+
+    conversation_id, detected_lang, graph_input, timings = _prepare_chat_run(user_query, conversation_id, run_id)
+    
+    final_state = _timed_call(timings, "graph", langgraph_app.invoke, graph_input)
+    print(" - "*50)
+    print("\n\nLangGraph execution complete : \n\n")
+    print(final_state)
+    print(" - " * 50)
+
+    response_data = _timed_call(timings, "post_graph", _finalize_chat_run, final_state, conversation_id, run_id, detected_lang)
+    print(f" Chat stage timings: {timings}")
+    response_data["timings"] = timings
+    return response_data
+
+
+def stream_chat_message(user_query, conversation_id, run_id):
+    """Run the chat graph and yield (event, data) pairs as it progresses.
+
+    Events: `start`, `node_started`, `node_finished` (with per-step timing), `token`
+    (GeneralChatagent deltas, English conversations only), `plan_ready` (each itinerary
+    plan as soon as it is drafted, before weather/enhancements) and finally `final` with
+    the same payload /api/chat returns.
+    """
+    t0 = time.perf_counter()
+    yield "start", {"run_id": run_id}
+
+    conversation_id, detected_lang, graph_input, pre_graph_timings = _prepare_chat_run(user_query, conversation_id, run_id)
+    yield "conversation", {"conversation_id": conversation_id, "detected_language": detected_lang,
+                           "pre_graph": pre_graph_timings, "elapsed_sec": round(time.perf_counter() - t0, 3)}
+
+    started = {}
+    step_timings = []
+    final_state = None
+
+    for mode, chunk in langgraph_app.stream(graph_input, stream_mode=["tasks", "messages", "custom", "values"]):
+        now = time.perf_counter()
+
+        if mode == "tasks":
+            if "triggers" in chunk:
+                started[chunk["id"]] = now
+                yield "node_started", {"node": chunk["name"], "elapsed_sec": round(now - t0, 3)}
+            else:
+                duration = round(now - started.pop(chunk["id"], now), 3)
+                step_timings.append({"node": chunk["name"], "duration_sec": duration})
+                yield "node_finished", {"node": chunk["name"], "duration_sec": duration,
+                                        "error": str(chunk["error"]) if chunk.get("error") else None,
+                                        "elapsed_sec": round(now - t0, 3)}
+
+        elif mode == "messages":
+            message_chunk, metadata = chunk
+            if (metadata.get("langgraph_node") == "GeneralChatagent" and detected_lang == "en"
+                    and isinstance(message_chunk, AIMessageChunk) and message_chunk.text):
+                yield "token", {"node": "GeneralChatagent", "delta": message_chunk.text}
+
+        elif mode == "custom":
+            if isinstance(chunk, dict) and chunk.get("event"):
+                payload = {k: v for k, v in chunk.items() if k != "event"}
+                yield chunk["event"], {**payload, "elapsed_sec": round(now - t0, 3)}
+
+        elif mode == "values":
+            final_state = chunk
+
+    response_data = _finalize_chat_run(final_state or {}, conversation_id, run_id, detected_lang)
+    response_data["timings"] = {"pre_graph": pre_graph_timings, "steps": step_timings,
+                                "total_sec": round(time.perf_counter() - t0, 3)}
+    yield "final", response_data
@@ -11,31 +11,21 @@ from app.agents.re_planner import (
 from app.agents.llm_init import get_llm
 from app.agents.follow_up_generator import generate_contextual_follow_ups
 from app.services.translation_service import translate_auto_to_english
+from app.utils.async_runtime import run_sync
 
 
 
-def enhance_plan(plan_details, user_query, user_enhance_query, card_index):
-
-    print(f"\n Enhancing plan with query: {user_enhance_query}")
-    
-    new_enhance_query = f"{user_enhance_query} {user_query}"
-    
-    # Step 1: Get structured trip intent
-    trip1 = get_structured_trip_details(new_enhance_query)
-    if trip1 is None:
-        raise Exception("Failed to extract structured trip details from the query")
-    
-    print(" Step 1: Structured Trip Intent Extracted")
-    
-    step2 = asyncio.run(run_step2(trip1.model_dump()))
+async def _rebuild_plan(trip1, new_enhance_query, plan_details, card_index):
+    """Steps 2-6 of an enhancement on one event loop, so HTTP steps share connections."""
+    step2 = await run_step2(trip1.model_dump())
     print(" Step 2: Spots & Hotels Retrieved")
     
-    step3 = asyncio.run(process_spots(step2))
+    step3 = await process_spots(step2)
     print(" Step 3: Spots Processed")
     
-    python_output = optimize_day_plan(step2, step3)
-    final_itinerary = format_itinerary_with_llm(
-        python_output, new_enhance_query, plan_details
+    python_output = await asyncio.to_thread(optimize_day_plan, step2, step3)
+    final_itinerary = await asyncio.to_thread(
+        format_itinerary_with_llm, python_output, new_enhance_query, plan_details
     )
     
     if isinstance(final_itinerary, dict):
@@ -47,8 +37,24 @@ def enhance_plan(plan_details, user_query, user_enhance_query, card_index):
     
     print(" Step 4: Itinerary Optimized")
     
-    value = asyncio.run(run_itinerary_pipeline(final_itinerary))
+    return await run_itinerary_pipeline(final_itinerary)
+
+
+def enhance_plan(plan_details, user_query, user_enhance_query, card_index):
+
+    print(f"\n Enhancing plan with query: {user_enhance_query}")
+    
+    new_enhance_query = f"{user_enhance_query} {user_query}"
+    
+    # Step 1: Get structured trip intent
+    trip1 = get_structured_trip_details(new_enhance_query)
+    if trip1 is None:
+        raise Exception("Failed to extract structured trip details from the query")
     
+    print(" Step 1: Structured Trip Intent Extracted")
+    
+    value = run_sync(_rebuild_plan(trip1, new_enhance_query, plan_details, card_index))
+
     if isinstance(value, dict):
         value["card_index"] = card_index
     elif isinstance(value, list):
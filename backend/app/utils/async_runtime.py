@@ -0,0 +1,138 @@
+import asyncio
+import atexit
+import os
+import threading
+from contextlib import asynccontextmanager
+
+import aiohttp
+import httpx
+
+from app.utils.metrics import incr
+
+# -------------------------
+# CONFIG
+# -------------------------
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_SECONDS = 30
+DNS_CACHE_TTL_SECONDS = 300
+
+# -------------------------
+# One long-lived event loop + pooled HTTP clients
+# -------------------------
+# Flask handles requests on worker threads, and each used to asyncio.run() its
+# pipeline steps, so every step built a fresh loop and re-did DNS / TLS. Sync code
+# now hands coroutines to a single background loop; sessions created on that loop
+# stay open and keep their connections warm across steps and requests.
+_lock = threading.Lock()
+_loop = None
+_thread = None
+_aiohttp_session = None
+_httpx_client = None
+
+
+def get_loop():
+    """The runtime loop, started on a daemon thread on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True)
+            _thread.start()
+    return _loop
+
+
+def on_runtime_loop():
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def submit(coro):
+    """Schedule `coro` on the runtime loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro, timeout=None):
+    """Run `coro` on the runtime loop and block for its result (drop-in for asyncio.run)."""
+    if on_runtime_loop():
+        raise RuntimeError("run_sync() called from the runtime loop; await the coroutine instead")
+    incr("async_runtime.run_sync")
+    return submit(coro).result(timeout)
+
+
+def _pooled_aiohttp_session():
+    global _aiohttp_session
+    if _aiohttp_session is None or _aiohttp_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+        )
+        _aiohttp_session = aiohttp.ClientSession(connector=connector)
+    return _aiohttp_session
+
+
+def _pooled_httpx_client():
+    global _httpx_client
+    if _httpx_client is None or _httpx_client.is_closed:
+        limits = httpx.Limits(
+            max_connections=HTTP_POOL_LIMIT,
+            max_keepalive_connections=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+        )
+        _httpx_client = httpx.AsyncClient(timeout=20, limits=limits)
+    return _httpx_client
+
+
+@asynccontextmanager
+async def client_session(limit=None):
+    """aiohttp session for a block of requests.
+
+    On the runtime loop this is the shared pooled session (left open); anywhere
+    else (scripts, tests, asyncio.run) a private session, with at most `limit`
+    connections, that is closed on exit.
+    """
+    if on_runtime_loop():
+        yield _pooled_aiohttp_session()
+        return
+    connector = aiohttp.TCPConnector(limit=limit) if limit else None
+    async with aiohttp.ClientSession(connector=connector) as session:
+        yield session
+
+
+@asynccontextmanager
+async def httpx_client(**kwargs):
+    """httpx.AsyncClient counterpart of client_session()."""
+    if on_runtime_loop():
+        yield _pooled_httpx_client()
+        return
+    async with httpx.AsyncClient(**kwargs) as client:
+        yield client
+
+
+async def _close_clients():
+    if _aiohttp_session is not None and not _aiohttp_session.closed:
+        await _aiohttp_session.close()
+    if _httpx_client is not None and not _httpx_client.is_closed:
+        await _httpx_client.aclose()
+
+
+@atexit.register
+def shutdown():
+    if _loop is None or not _loop.is_running():
+        return
+    try:
+        submit(_close_clients()).result(5)
+    except Exception as e:
+        print(f" Async runtime shutdown: {e}")
+    _loop.call_soon_threadsafe(_loop.stop)
+
+
+def get_async_runtime_stats():
+    return {
+        "running": _loop is not None and _loop.is_running(),
+        "aiohttp_session_open": _aiohttp_session is not None and not _aiohttp_session.closed,
+    }
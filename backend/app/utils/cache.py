@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from cachetools import TTLCache
+
+from app.database.db_config import get_cache_collection
+from app.utils.metrics import incr, hit_rate
+
+_MISSING = object()
+
+
+def normalize_text(text):
+    return " ".join(str(text or "").lower().split())
+
+
+def make_cache_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -------------------------
+# Two-tier cache: in-process LRU ➜ MongoDB TTL collection
+# -------------------------
+class TieredCache:
+    """In-process LRU backed by a MongoDB TTL collection shared across workers.
+
+    Values must be JSON/BSON friendly. Hit/miss counters are recorded under
+    `cache.<name>.*` in app.utils.metrics.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl_seconds=24 * 3600, persistent=True):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._lru = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._persistent = persistent
+        self._collection = _MISSING
+
+    @property
+    def collection(self):
+        if self._collection is _MISSING:
+            self._collection = get_cache_collection(f"cache_{self.name}") if self._persistent else None
+        return self._collection
+
+    def _metric(self, event):
+        return f"cache.{self.name}.{event}"
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lru.get(key, _MISSING)
+        if value is not _MISSING:
+            incr(self._metric("hit"))
+            incr(self._metric("hit_lru"))
+            return value
+
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+            except Exception as e:
+                print(f" Cache read failed ({self.name}): {e}")
+                doc = None
+            if doc is not None:
+                with self._lock:
+                    self._lru[key] = doc["value"]
+                incr(self._metric("hit"))
+                incr(self._metric("hit_mongo"))
+                return doc["value"]
+
+        incr(self._metric("miss"))
+        return default
+
+    def set(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._lru[key] = value
+
+        if self.collection is not None:
+            expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds or self.ttl_seconds)
+            try:
+                self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "value": value, "expires_at": expires_at},
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f" Cache write failed ({self.name}): {e}")
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            size = len(self._lru)
+        return {"lru_size": size, "hit_rate": hit_rate(f"cache.{self.name}")}
+
+
+# -------------------------
+# Async read-through with in-flight coalescing
+# -------------------------
+# In-flight lookups keyed by cache key. Requests run their own event loops on
+# separate threads, so these are thread-safe concurrent futures; other loops await
+# them through asyncio.wrap_future.
+_inflight_lock = threading.Lock()
+_inflight = {}
+
+
+async def coalesced_get(cache, key, fetch, metric):
+    """Value for `key` from `cache`, or from `fetch()` with concurrent misses coalesced.
+
+    `fetch()` returns the value to cache, or None when the response should not be
+    cached (quota / request errors). Concurrent misses for the same key, from any
+    thread, share a single upstream call.
+    """
+    cached = await asyncio.to_thread(cache.get, key, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    with _inflight_lock:
+        leader_future = _inflight.get(key)
+        is_leader = leader_future is None
+        if is_leader:
+            leader_future = _inflight[key] = Future()
+
+    if not is_leader:
+        incr(f"{metric}.coalesced")
+        result = await asyncio.shield(asyncio.wrap_future(leader_future))
+        if result is not None:
+            return result
+        # Leader failed or was cancelled: fetch on our own, uncached.
+        return await fetch()
+
+    result = None
+    try:
+        incr(f"{metric}.api_call")
+        result = await fetch()
+        if result is not None:
+            await asyncio.to_thread(cache.set, key, result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        if not leader_future.done():
+            leader_future.set_result(result)
+
+
+def inflight_count():
+    with _inflight_lock:
+        return len(_inflight)
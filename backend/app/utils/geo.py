@@ -0,0 +1,96 @@
+import numpy as np
+
+# -------------------------
+# Vectorized great-circle distances
+# -------------------------
+# All matrices are float32 (4 bytes per pair: a 5,000-point matrix is ~100 MB)
+# but the haversine itself runs in float64, row block by row block, so short
+# hops keep metre-level precision.
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_SPEED_KMPH = 35
+_BLOCK_ELEMENTS = 2_000_000  # float64 temporaries per row block (~16 MB each)
+
+
+def to_lat_lng_array(points):
+    """(n, 2) float64 array from [(lat, lng), ...] or [{"lat":..., "lng"/"long":...}, ...]."""
+    if len(points) and isinstance(points[0], dict):
+        points = [(p["lat"], p["lng"] if "lng" in p else p["long"]) for p in points]
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def pairwise_distance_km(points, others=None):
+    """Great-circle distances between every point in `points` and every point in `others`.
+
+    `others` defaults to `points`. Returns an (n, m) float32 array.
+    """
+    a = np.radians(to_lat_lng_array(points))
+    b = a if others is None else np.radians(to_lat_lng_array(others))
+    n, m = len(a), len(b)
+    out = np.empty((n, m), dtype=np.float32)
+    if n == 0 or m == 0:
+        return out
+
+    lat_b, lng_b = b[:, 0][None, :], b[:, 1][None, :]
+    cos_lat_b = np.cos(lat_b)
+    rows = max(1, _BLOCK_ELEMENTS // m)
+
+    for start in range(0, n, rows):
+        lat_a = a[start:start + rows, 0][:, None]
+        lng_a = a[start:start + rows, 1][:, None]
+        h = (
+            np.sin((lat_b - lat_a) / 2) ** 2
+            + np.cos(lat_a) * cos_lat_b * np.sin((lng_b - lng_a) / 2) ** 2
+        )
+        out[start:start + rows] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+    if others is None:
+        np.fill_diagonal(out, 0.0)
+    return out
+
+
+def point_to_set_km(point, points):
+    """Distances from one (lat, lng) to each of `points` as an (n,) float32 array."""
+    return pairwise_distance_km([point], points)[0]
+
+
+def travel_time_min(distance_km, speed_kmph=DEFAULT_SPEED_KMPH):
+    """Straight-line travel time in minutes at `speed_kmph` (float32, same shape as input)."""
+    if speed_kmph <= 0:
+        return np.zeros_like(distance_km, dtype=np.float32)
+    return (np.asarray(distance_km, dtype=np.float32) * np.float32(60.0 / speed_kmph)).astype(np.float32)
+
+
+def pairwise_matrices(points, speed_kmph=DEFAULT_SPEED_KMPH):
+    """(distance_km, time_min) float32 matrices for `points`."""
+    distance = pairwise_distance_km(points)
+    return distance, travel_time_min(distance, speed_kmph)
+
+
+def matrix_to_nested_dict(names, distance_km, time_min, decimals=1):
+    """Adapter to the legacy {name: {other: {"distance_km", "time_min"}}} shape (diagonal skipped)."""
+    distance = np.round(distance_km.astype(np.float64), decimals).tolist()
+    minutes = np.round(time_min.astype(np.float64), decimals).tolist()
+    matrix = {}
+    for i, name in enumerate(names):
+        row = {}
+        dist_row, time_row = distance[i], minutes[i]
+        for j, other in enumerate(names):
+            if i != j:
+                row[other] = {"distance_km": dist_row[j], "time_min": time_row[j]}
+        matrix[name] = row
+    return matrix
+
+
+def weighted_medoid_index(points, weights=None, tie_keys=None):
+    """Index of the point minimising the weighted sum of distances to all points.
+
+    Exact ties go to the smallest `tie_keys` entry (e.g. place ids), so the
+    result depends only on the set of points, not their order.
+    """
+    distance = pairwise_distance_km(points).astype(np.float64)
+    w = np.ones(len(distance)) if weights is None else np.asarray(weights, dtype=np.float64)
+    cost = distance @ w
+    candidates = np.flatnonzero(cost <= cost.min() + 1e-9)
+    if tie_keys is not None and len(candidates) > 1:
+        return int(min(candidates, key=lambda i: str(tie_keys[i])))
+    return int(candidates[0])
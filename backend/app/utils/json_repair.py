@@ -0,0 +1,344 @@
+import json
+import re
+
+from app.utils.metrics import incr
+
+# -------------------------
+# Local, deterministic JSON repair for LLM output
+# -------------------------
+# Handles what Gemini actually gets wrong: markdown fences, prose around the
+# payload, trailing / missing commas, single-quoted or Python-style literals,
+# raw newlines or unescaped quotes inside strings, bare ".5" numbers, and output
+# truncated at max_output_tokens.
+# Runs in a single pass over the text, so it costs milliseconds instead of a
+# second LLM round trip.
+
+_FENCE_RE = re.compile(r"^\s*```(?:json|JSON)?\s*|\s*```\s*$")
+_NUMBER_CHARS = set("+-0123456789.eE")
+_JSON_NUMBER_RE = re.compile(r"-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?$")
+# A quote followed by one of these (or by the end of the text) closes a string;
+# any other quote inside a string is taken literally.
+_AFTER_STRING = set(",:}]/")
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+    "NaN": "null", "Infinity": "null", "undefined": "null",
+}
+
+
+def strip_code_fences(text):
+    return _FENCE_RE.sub("", text.strip()).strip()
+
+
+class _Frame:
+    __slots__ = ("kind", "state", "items", "item_start")
+
+    def __init__(self, kind):
+        self.kind = kind  # "{" or "["
+        self.state = "key" if kind == "{" else "value"
+        self.items = 0  # arrays: elements started so far
+        self.item_start = 0  # arrays: output position where the last element (and its comma) begins
+
+
+def _closes_string(text, i):
+    """Whether the quote at text[i] ends the string rather than being an unescaped inner quote."""
+    j = i + 1
+    n = len(text)
+    while j < n and text[j] in " \t\r":
+        j += 1
+    # A newline before the next token: a missing comma between fields, so it closes.
+    return j >= n or text[j] in _AFTER_STRING or text[j] == "\n"
+
+
+def _normalize_number(number):
+    """JSON form of a number-ish token ("0.5" for ".5", "5" for "+5"), or None."""
+    if _JSON_NUMBER_RE.match(number):
+        return number
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    if value != value or value in (float("inf"), float("-inf")):
+        return None
+    if value.is_integer() and not any(c in number for c in ".eE"):
+        return str(int(value))
+    return repr(value)
+
+
+def _read_string(text, i, quote):
+    """Read a string starting after the opening quote; returns (json_literal, next_index, closed)."""
+    chars = []
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\":
+            if i + 1 >= n:
+                i += 1
+                break
+            nxt = text[i + 1]
+            if quote == "'" and nxt == "'":
+                chars.append("'")
+            elif nxt in '"\\/bfnrtu':
+                chars.append(ch + nxt)
+            else:
+                chars.append("\\\\" + nxt if nxt != "\n" else "\\n")
+            i += 2
+            continue
+        if ch == quote and _closes_string(text, i):
+            return '"' + "".join(chars) + '"', i + 1, True
+        if ch == '"':
+            chars.append('\\"')
+        elif ch == "\n":
+            chars.append("\\n")
+        elif ch == "\r":
+            chars.append("\\r")
+        elif ch == "\t":
+            chars.append("\\t")
+        elif ord(ch) < 0x20:
+            chars.append(f"\\u{ord(ch):04x}")
+        else:
+            chars.append(ch)
+        i += 1
+    # Truncated inside a string: drop a dangling unicode escape and close it.
+    body = re.sub(r"\\u[0-9a-fA-F]{0,3}$", "", "".join(chars))
+    return '"' + body + '"', i, False
+
+
+def _strip_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _drop_unfinished_item(out, stack, cut_scalar):
+    """Remove the element the innermost open array was writing when the text ended.
+
+    That is an open container (anything stacked above the array) or a scalar cut
+    off by the end of the text. Completed elements, and everything outside the
+    array, are kept.
+    """
+    depth = next((d for d in range(len(stack) - 1, -1, -1) if stack[d].kind == "["), None)
+    if depth is None:
+        return
+    frame = stack[depth]
+    if frame.items == 0 or (depth == len(stack) - 1 and not (cut_scalar and frame.state == "after_value")):
+        return
+    del out[frame.item_start:]
+    del stack[depth + 1:]
+    frame.items -= 1
+    frame.state = "after_value" if frame.items else "value"
+    incr("json_repair.dropped_partial_item")
+
+
+def repair_json_text(text):
+    """Rewrite `text` into valid JSON.
+
+    Returns (json_text, truncated, complete_top_items) where `complete_top_items`
+    counts elements of a top-level array that were closed by the input itself
+    (not by auto-closing), which lets callers drop a half-written last item.
+    """
+    text = strip_code_fences(text)
+    start = min([p for p in (text.find("{"), text.find("[")) if p != -1], default=-1)
+    if start == -1:
+        raise ValueError("no JSON object or array found")
+    text = text[start:]
+
+    out = []
+    stack = []
+    top_level_values = 0
+    complete_top_items = 0
+    cut_scalar = False  # the last scalar ran into the end of the text
+    i = 0
+    n = len(text)
+
+    def begin_value():
+        """Fix up separators before a value/key and return the role it plays."""
+        nonlocal top_level_values
+        if not stack:
+            if top_level_values:
+                out.append(",")  # several top-level values -> wrapped into an array below
+            top_level_values += 1
+            return "value"
+        frame = stack[-1]
+        if frame.kind == "{":
+            if frame.state == "after_value":
+                out.append(",")
+                frame.state = "key"
+            if frame.state == "colon":
+                out.append(":")
+                frame.state = "value"
+            return "key" if frame.state == "key" else "value"
+        frame.item_start = len(out)
+        frame.items += 1
+        if frame.state == "after_value":
+            out.append(",")
+            frame.state = "value"
+        return "value"
+
+    def end_value(role):
+        if not stack:
+            return
+        frame = stack[-1]
+        if role == "key":
+            frame.state = "colon"
+        else:
+            frame.state = "after_value"
+
+    def close_frame(natural):
+        nonlocal complete_top_items
+        frame = stack.pop()
+        if frame.kind == "{":
+            if frame.state == "colon":
+                out.append(":null")
+            elif frame.state == "value" and out and out[-1] == ":":
+                out.append("null")
+        _strip_trailing_comma(out)
+        out.append("}" if frame.kind == "{" else "]")
+        if natural and len(stack) == 1 and stack[0].kind == "[":
+            complete_top_items += 1
+        end_value("value")
+
+    while i < n:
+        ch = text[i]
+
+        if ch.isspace():
+            out.append(ch)
+            i += 1
+            continue
+
+        if not stack and top_level_values and ch not in "{[,":
+            break  # trailing prose after the payload
+
+        if ch in "{[":
+            begin_value()
+            out.append(ch)
+            stack.append(_Frame(ch))
+            i += 1
+            continue
+
+        if ch in "}]":
+            # A closer that doesn't match the open container is a stray token; the
+            # missing closers (if any) are added at the end.
+            if stack and stack[-1].kind == ("{" if ch == "}" else "["):
+                close_frame(natural=True)
+            i += 1
+            continue
+
+        if ch == ":":
+            if stack and stack[-1].kind == "{" and stack[-1].state == "colon":
+                out.append(":")
+                stack[-1].state = "value"
+            i += 1
+            continue
+
+        if ch == ",":
+            if stack and stack[-1].state == "after_value":
+                out.append(",")
+                stack[-1].state = "key" if stack[-1].kind == "{" else "value"
+            i += 1
+            continue
+
+        if ch in "\"'":
+            role = begin_value()
+            literal, i, closed = _read_string(text, i + 1, ch)
+            cut_scalar = not closed
+            out.append(literal)
+            end_value(role)
+            continue
+
+        if ch == "/" and text.startswith("//", i):
+            nl = text.find("\n", i)
+            i = n if nl == -1 else nl
+            continue
+
+        if ch in _NUMBER_CHARS:
+            j = i
+            while j < n and text[j] in _NUMBER_CHARS:
+                j += 1
+            number = _normalize_number(text[i:j].rstrip("+-.eE"))
+            role = begin_value()
+            if role == "key":
+                out.append(json.dumps(text[i:j]))
+            else:
+                out.append(number or "null")
+            end_value(role)
+            cut_scalar = j >= n
+            i = j
+            continue
+
+        match = _WORD_RE.match(text, i)
+        if match:
+            word = match.group(0)
+            role = begin_value()
+            if role == "key":
+                out.append(json.dumps(word))
+            elif word in _LITERALS:
+                out.append(_LITERALS[word])
+            elif match.end() == n and any(lit.startswith(word) for lit in ("true", "false", "null")):
+                out.append(next(lit for lit in ("true", "false", "null") if lit.startswith(word)))
+            else:
+                out.append(json.dumps(word))
+            end_value(role)
+            cut_scalar = match.end() >= n
+            i = match.end()
+            continue
+
+        i += 1  # stray character
+
+    truncated = bool(stack)
+    if truncated:
+        _drop_unfinished_item(out, stack, cut_scalar)
+    while stack:
+        close_frame(natural=False)
+
+    repaired = "".join(out).strip()
+    if top_level_values > 1:
+        repaired = "[" + repaired + "]"
+    return repaired, truncated, complete_top_items
+
+
+def _missing_keys(items, required_keys):
+    return [key for item in items for key in required_keys if not isinstance(item, dict) or key not in item]
+
+
+def repair_json(text, salvage_complete_items=True, required_keys=()):
+    """Parse LLM JSON output, repairing it locally if needed. Raises ValueError when hopeless.
+
+    Truncated output loses the element the innermost open array was writing (a
+    half-written activity, say). When a top-level array was cut off mid-item and
+    `salvage_complete_items` is set, only the items the model finished writing are
+    returned. Truncated output that
+    leaves nothing usable (an empty array, or a half-written object missing any of
+    `required_keys`) raises too, so callers take their fallback path.
+    """
+    cleaned = strip_code_fences(text or "")
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+
+    repaired, truncated, complete_items = repair_json_text(cleaned)
+    try:
+        data = json.loads(repaired)
+    except json.JSONDecodeError as e:
+        incr("json_repair.failed")
+        raise ValueError(f"local JSON repair failed: {e}") from e
+
+    if truncated:
+        incr("json_repair.truncated")
+        if salvage_complete_items and isinstance(data, list) and 0 < complete_items < len(data):
+            incr("json_repair.salvaged")
+            data = data[:complete_items]
+        elif data in ([], {}):
+            incr("json_repair.failed")
+            raise ValueError("truncated output has no complete item")
+        elif required_keys and (not isinstance(data, list) or not complete_items):
+            missing = _missing_keys(data if isinstance(data, list) else [data], required_keys)
+            if missing:
+                incr("json_repair.failed")
+                raise ValueError(f"truncated output is missing {sorted(set(missing))}")
+
+    incr("json_repair.ok")
+    return data
@@ -0,0 +1,59 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------
+# Process-wide counters / timings
+# -------------------------
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, seconds):
+    with _lock:
+        stat = _timings.setdefault(name, {"count": 0, "total_sec": 0.0, "max_sec": 0.0})
+        stat["count"] += 1
+        stat["total_sec"] += seconds
+        stat["max_sec"] = max(stat["max_sec"], seconds)
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def get_counter(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def get_metrics(prefix=None):
+    with _lock:
+        counters = {k: v for k, v in _counters.items() if not prefix or k.startswith(prefix)}
+        timings = {
+            k: {
+                "count": v["count"],
+                "avg_sec": round(v["total_sec"] / v["count"], 4) if v["count"] else 0.0,
+                "max_sec": round(v["max_sec"], 4),
+            }
+            for k, v in _timings.items()
+            if not prefix or k.startswith(prefix)
+        }
+    return {"counters": counters, "timings": timings}
+
+
+def hit_rate(prefix):
+    hits = get_counter(f"{prefix}.hit")
+    misses = get_counter(f"{prefix}.miss")
+    total = hits + misses
+    return round(hits / total, 4) if total else 0.0
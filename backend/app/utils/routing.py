@@ -0,0 +1,152 @@
+import os
+import time
+
+import numpy as np
+
+from app.utils.metrics import observe
+
+# -------------------------
+# Route improvement on a precomputed matrix
+# -------------------------
+# Tours are lists of node indices into `dist`. tour[0] is the fixed start
+# (the hotel); with closed=True the route returns to it at the end.
+
+_EPS = 1e-6
+ROUTE_TIME_BUDGET_MS = int(os.getenv("ROUTE_TIME_BUDGET_MS", "20"))
+ROUTE_MAX_ROUNDS = 20
+
+
+def _as_rows(dist):
+    """Symmetric, finite python rows (fast scalar indexing for small tours)."""
+    d = np.asarray(dist, dtype=np.float64)
+    d = (d + d.T) / 2
+    finite = d[np.isfinite(d)]
+    big = (finite.max() if finite.size else 1.0) * 10 + 1
+    return np.where(np.isfinite(d), d, big).tolist()
+
+
+def tour_length(tour, dist, closed=True):
+    d = dist if isinstance(dist, list) else _as_rows(dist)
+    total = sum(d[a][b] for a, b in zip(tour, tour[1:]))
+    if closed and len(tour) > 1:
+        total += d[tour[-1]][tour[0]]
+    return total
+
+
+def two_opt(tour, dist, closed=True, deadline=None, max_passes=50):
+    """2-opt with the first node fixed. Stops at a local optimum, `max_passes` or `deadline` (perf_counter)."""
+    d = dist if isinstance(dist, list) else _as_rows(dist)
+    tour = list(tour)
+    n = len(tour)
+    if n < 4:
+        return tour
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, n):
+                c = tour[j]
+                if j + 1 < n or closed:
+                    nxt = tour[(j + 1) % n]
+                    delta = d[a][c] + d[b][nxt] - d[a][b] - d[c][nxt]
+                else:
+                    # Open path: reversing the tail only changes the a-b edge.
+                    delta = d[a][c] - d[a][b]
+                if delta < -_EPS:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    a, b = tour[i - 1], tour[i]
+                    improved = True
+            if deadline is not None and time.perf_counter() > deadline:
+                return tour
+        if not improved:
+            break
+    return tour
+
+
+def nearest_neighbour_tour(dist, start=0):
+    d = dist if isinstance(dist, list) else _as_rows(dist)
+    unvisited = [i for i in range(len(d)) if i != start]
+    tour = [start]
+    while unvisited:
+        row = d[tour[-1]]
+        nxt = min(unvisited, key=row.__getitem__)
+        tour.append(nxt)
+        unvisited.remove(nxt)
+    return tour
+
+
+def or_opt(tour, dist, closed=True, deadline=None, max_passes=50, max_segment=3):
+    """Move runs of 1..`max_segment` nodes to a better position (first node stays fixed)."""
+    d = dist if isinstance(dist, list) else _as_rows(dist)
+    tour = list(tour)
+    n = len(tour)
+    if n < 3:
+        return tour
+
+    def link(a, b):
+        return 0.0 if a is None or b is None else d[a][b]
+
+    def after(k):
+        return tour[k + 1] if k + 1 < n else (tour[0] if closed else None)
+
+    for _ in range(max_passes):
+        improved = False
+        for seg_len in range(1, max_segment + 1):
+            i = 1
+            while i + seg_len <= n:
+                seg = tour[i:i + seg_len]
+                prev, nxt = tour[i - 1], after(i + seg_len - 1)
+                removed_gain = link(prev, seg[0]) + link(seg[-1], nxt) - link(prev, nxt)
+
+                rest = tour[:i] + tour[i + seg_len:]
+                best_delta, best_pos, best_seg = -_EPS, None, None
+                for pos in range(len(rest)):
+                    if pos == i - 1:
+                        continue
+                    a = rest[pos]
+                    b = rest[pos + 1] if pos + 1 < len(rest) else (rest[0] if closed else None)
+                    for candidate in (seg, seg[::-1]):
+                        delta = link(a, candidate[0]) + link(candidate[-1], b) - link(a, b) - removed_gain
+                        if delta < best_delta:
+                            best_delta, best_pos, best_seg = delta, pos, candidate
+
+                if best_pos is not None:
+                    tour = rest[:best_pos + 1] + list(best_seg) + rest[best_pos + 1:]
+                    improved = True
+                i += 1
+            if deadline is not None and time.perf_counter() > deadline:
+                return tour
+        if not improved:
+            break
+    return tour
+
+
+def improve_route(dist, initial=None, closed=True, time_budget_ms=None):
+    """Best route from node 0 over every node of `dist`.
+
+    Seeds with the better of `initial` and a nearest-neighbour tour, then alternates
+    2-opt and Or-opt until neither improves, ROUTE_MAX_ROUNDS, or the time budget.
+    Returns (tour, {"initial": length, "seed": length, "final": length}).
+    """
+    start = time.perf_counter()
+    deadline = start + (ROUTE_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms) / 1000
+    d = _as_rows(dist)
+
+    nn = nearest_neighbour_tour(d)
+    initial = list(initial) if initial is not None else nn
+    initial_length = tour_length(initial, d, closed)
+    nn_length = tour_length(nn, d, closed)
+    tour, length = (initial, initial_length) if initial_length <= nn_length else (nn, nn_length)
+    seed_length = length
+
+    for _ in range(ROUTE_MAX_ROUNDS):
+        tour = or_opt(two_opt(tour, d, closed, deadline), d, closed, deadline)
+        new_length = tour_length(tour, d, closed)
+        if new_length >= length - _EPS or time.perf_counter() > deadline:
+            length = min(length, new_length)
+            break
+        length = new_length
+
+    observe("routing.improve_route", time.perf_counter() - start)
+    return tour, {"initial": initial_length, "seed": seed_length, "final": length}
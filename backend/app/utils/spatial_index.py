@@ -0,0 +1,94 @@
+import math
+import threading
+
+import numpy as np
+
+from app.utils.geo import point_to_set_km
+
+# -------------------------
+# Fixed-size lat/lng grid for radius and k-nearest queries
+# -------------------------
+# Cells are `cell_deg` degrees square. A query only touches the cells that can
+# intersect its circle, then computes exact great-circle distances for the
+# points in those cells in one vectorized call.
+KM_PER_DEG_LAT = 111.32
+
+
+class GridIndex:
+    """Thread-safe in-memory point index keyed by id (re-inserting an id moves it)."""
+
+    def __init__(self, cell_deg=0.1):
+        self.cell_deg = cell_deg
+        self._cells = {}
+        self._points = {}  # id -> (lat, lng, kind, payload)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, point_id):
+        return point_id in self._points
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def insert(self, point_id, lat, lng, kind=None, payload=None):
+        """Add or move a point. Returns True if the id was new."""
+        cell = self._cell(lat, lng)
+        with self._lock:
+            previous = self._points.get(point_id)
+            if previous is not None:
+                self._cells[self._cell(previous[0], previous[1])].discard(point_id)
+            self._points[point_id] = (lat, lng, kind, payload)
+            self._cells.setdefault(cell, set()).add(point_id)
+        return previous is None
+
+    def _ring_candidates(self, lat, lng, rings, kind):
+        """Ids, coords and payloads of points within `rings` cells of (lat, lng), filtered by kind."""
+        row, col = self._cell(lat, lng)
+        # A degree of longitude shrinks with latitude; widen the column span to match.
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + rings * self.cell_deg, 89.0))), 0.01)
+        col_rings = min(int(math.ceil(rings / cos_lat)), int(180 / self.cell_deg))
+
+        ids, coords, payloads = [], [], []
+        with self._lock:
+            for r in range(row - rings, row + rings + 1):
+                for c in range(col - col_rings, col + col_rings + 1):
+                    for point_id in self._cells.get((r, c), ()):
+                        p_lat, p_lng, p_kind, payload = self._points[point_id]
+                        if kind is None or p_kind == kind:
+                            ids.append(point_id)
+                            coords.append((p_lat, p_lng))
+                            payloads.append(payload)
+        return ids, coords, payloads
+
+    def within(self, lat, lng, radius_km, kind=None):
+        """[(distance_km, id, payload), ...] within `radius_km`, nearest first."""
+        rings = int(math.ceil(radius_km / (KM_PER_DEG_LAT * self.cell_deg)))
+        ids, coords, payloads = self._ring_candidates(lat, lng, rings, kind)
+        if not ids:
+            return []
+        distance = point_to_set_km((lat, lng), coords)
+        order = np.argsort(distance, kind="stable")
+        return [(float(distance[i]), ids[i], payloads[i]) for i in order if distance[i] <= radius_km]
+
+    def nearest(self, lat, lng, k=1, kind=None, max_km=50):
+        """Up to `k` [(distance_km, id, payload), ...] within `max_km`, nearest first."""
+        cell_km = KM_PER_DEG_LAT * self.cell_deg
+        max_rings = int(math.ceil(max_km / cell_km))
+        rings = 0
+        while True:
+            ids, coords, payloads = self._ring_candidates(lat, lng, rings, kind)
+            if ids:
+                distance = point_to_set_km((lat, lng), coords)
+                order = np.argsort(distance, kind="stable")[:k]
+                # Anything outside the searched block is at least `rings` cells away.
+                if len(order) == k and distance[order[-1]] <= rings * cell_km or rings >= max_rings:
+                    return [(float(distance[i]), ids[i], payloads[i]) for i in order if distance[i] <= max_km]
+            elif rings >= max_rings or not self._points:
+                return []
+            rings = min(max(1, rings * 2), max_rings)
+
+    def stats(self):
+        with self._lock:
+            return {"points": len(self._points), "cells": sum(1 for ids in self._cells.values() if ids)}
@@ -0,0 +1,91 @@
+"""Benchmark for app.utils.geo against the pure-Python haversine double loop.
+
+Times the full pairwise distance + time matrix for 25 to 5,000 points, the
+legacy dict-of-dicts adapter, and (up to --max-python points) the old
+per-pair haversine loop. Run from backend/:
+
+    python benchmarks/bench_geo.py [--sizes 25,100,500,1000,2500,5000] [--max-python 1000]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.geo import pairwise_matrices, matrix_to_nested_dict  # noqa: E402
+
+AVG_SPEED_KMPH = 35
+ADAPTER_MAX_POINTS = 1000  # the nested dict itself gets too big to be meaningful past this
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def python_matrix(spots):
+    matrix = {}
+    for i, s1 in enumerate(spots):
+        matrix[s1["name"]] = {}
+        for j, s2 in enumerate(spots):
+            if i == j:
+                continue
+            dist_km = haversine_km(s1["lat"], s1["lng"], s2["lat"], s2["lng"])
+            matrix[s1["name"]][s2["name"]] = {
+                "distance_km": round(dist_km, 1),
+                "time_min": round(dist_km / AVG_SPEED_KMPH * 60, 1),
+            }
+    return matrix
+
+
+def cell(value, width, spec):
+    return format("-" if value is None else format(value, spec), f">{width}")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="25,100,500,1000,2500,5000")
+    parser.add_argument("--max-python", type=int, default=1000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{'points':>7} {'numpy ms':>10} {'adapter ms':>11} {'python ms':>10} {'speedup':>8} {'max err km':>11} {'matrix MB':>10}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        # Spots scattered over a ~100 km region, like a long multi-city trip
+        spots = [{"name": f"spot-{i}", "lat": 15.0 + random.random(), "lng": 73.5 + random.random()} for i in range(n)]
+
+        (distance, minutes), numpy_ms = timed(pairwise_matrices, spots, AVG_SPEED_KMPH)
+        matrix_mb = (distance.nbytes + minutes.nbytes) / 1e6
+
+        adapter_ms = None
+        if n <= ADAPTER_MAX_POINTS:
+            _, adapter_ms = timed(matrix_to_nested_dict, [s["name"] for s in spots], distance, minutes)
+
+        python_ms = max_err = None
+        if n <= args.max_python:
+            _, python_ms = timed(python_matrix, spots)
+            sample = random.sample(range(n), min(n, 50))
+            max_err = max(
+                abs(float(distance[i, j]) - haversine_km(spots[i]["lat"], spots[i]["lng"], spots[j]["lat"], spots[j]["lng"]))
+                for i in sample for j in sample
+            )
+
+        speedup = f"{python_ms / numpy_ms:.0f}x" if python_ms else None
+        print(f"{n:>7} {numpy_ms:>10.2f} {cell(adapter_ms, 11, '.2f')} {cell(python_ms, 10, '.2f')} "
+              f"{cell(speedup, 8, '')} {cell(max_err, 11, '.5f')} {matrix_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark + correctness check for app.utils.json_repair.
+
+Runs every fixture in benchmarks/json_repair_fixtures/ through repair_json,
+checks the recovered shape against expected.json and reports per-fixture
+timings. Run from backend/:
+
+    python benchmarks/bench_json_repair.py [--repeat 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.json_repair import repair_json  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_repair_fixtures")
+
+
+def check(data, expected):
+    if expected["type"] == "list":
+        return isinstance(data, list) and len(data) == expected["items"]
+    return isinstance(data, dict)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURE_DIR, "expected.json")) as f:
+        expected = json.load(f)
+
+    failures = 0
+    print(f"{'fixture':<40} {'ok':<4} {'bytes':>7} {'median ms':>10} {'p95 ms':>8}")
+    for name, exp in sorted(expected.items()):
+        with open(os.path.join(FIXTURE_DIR, name)) as f:
+            text = f.read()
+
+        try:
+            ok = check(repair_json(text), exp)
+        except ValueError:
+            ok = False
+        failures += not ok
+
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            try:
+                repair_json(text)
+            except ValueError:
+                pass
+            samples.append((time.perf_counter() - t0) * 1000)
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{name:<40} {'yes' if ok else 'NO':<4} {len(text):>7} {statistics.median(samples):>10.3f} {p95:>8.3f}")
+
+    print(f"\n{len(expected) - failures}/{len(expected)} fixtures repaired as expected")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
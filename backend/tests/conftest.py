@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Run from backend/ (python -m pytest) or anywhere else: make `app` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules read these at import time. Fail fast instead of waiting 30s for a
+# MongoDB that is not there; the cache tiers fall back to memory only.
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:1/?serverSelectionTimeoutMS=100")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+# re_planner copies this back into os.environ at import time.
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "")
+# googlemaps.Client validates the key format at import time in accomdation.py.
+os.environ.setdefault("GOOGLE_MAPS_API_KEY", "AIza" + "0" * 35)
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.utils import async_runtime
+from app.utils.async_runtime import client_session, on_runtime_loop, run_sync, submit
+
+
+def test_run_sync_runs_the_coroutine_on_the_runtime_loop():
+    async def where():
+        return on_runtime_loop()
+
+    assert run_sync(where(), timeout=5) is True
+    assert on_runtime_loop() is False
+
+
+def test_run_sync_refuses_to_block_the_runtime_loop():
+    async def nested():
+        inner = asyncio.sleep(0)
+        try:
+            run_sync(inner)
+        finally:
+            inner.close()
+
+    with pytest.raises(RuntimeError, match="await the coroutine instead"):
+        submit(nested()).result(5)
+
+
+def test_runtime_loop_shares_one_pooled_session():
+    async def sessions():
+        async with client_session() as first:
+            pass
+        async with client_session() as second:
+            return first, second, first.closed
+
+    first, second, closed = run_sync(sessions(), timeout=5)
+    assert first is second is async_runtime._aiohttp_session
+    assert not closed
+
+
+def test_other_loops_get_a_private_session_that_is_closed():
+    async def session():
+        async with client_session(limit=2) as s:
+            assert s.connector.limit == 2
+        return s
+
+    s = asyncio.run(session())
+    assert s.closed and s is not async_runtime._aiohttp_session
+
+
+def test_day_ordering_runs_off_the_runtime_loop(monkeypatch):
+    from app.agents import planner
+
+    threads = []
+
+    def fake_order(hotel, activities):
+        threads.append(on_runtime_loop())
+        return activities
+
+    monkeypatch.setattr(planner, "tsp_order_day", fake_order)
+    trip = {"hotel": {"name": "Stay", "lat": 15.5, "lng": 73.8}, "itinerary": {"Day 1": [], "Day 2": []}}
+
+    result = run_sync(planner.process_single_trip(trip))
+
+    assert threads == [False, False]
+    assert result["trip_details"]["duration_days"] == 2
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from app.utils.cache import TieredCache, coalesced_get, inflight_count
+
+
+def _cache():
+    return TieredCache("test", maxsize=16, ttl_seconds=60, persistent=False)
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache, calls = _cache(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["value"]
+
+    async def main():
+        return await asyncio.gather(*[coalesced_get(cache, "k", fetch, "test") for _ in range(5)])
+
+    assert asyncio.run(main()) == [["value"]] * 5
+    assert len(calls) == 1
+    assert inflight_count() == 0
+    # Now served from the cache.
+    assert asyncio.run(coalesced_get(cache, "k", fetch, "test")) == ["value"]
+    assert len(calls) == 1
+
+
+def test_misses_on_other_threads_join_the_leader():
+    cache, calls = _cache(), []
+    started = threading.Event()
+
+    async def fetch():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.1)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(asyncio.run(coalesced_get(cache, "k", fetch, "test"))))
+    leader.start()
+    started.wait(5)
+    results.append(asyncio.run(coalesced_get(cache, "k", fetch, "test")))
+    leader.join(5)
+
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+
+
+def test_none_is_not_cached():
+    cache, calls = _cache(), []
+
+    async def fetch():
+        calls.append(1)
+        return None
+
+    assert asyncio.run(coalesced_get(cache, "k", fetch, "test")) is None
+    assert asyncio.run(coalesced_get(cache, "k", fetch, "test")) is None
+    assert len(calls) == 2
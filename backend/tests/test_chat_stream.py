@@ -0,0 +1,91 @@
+import json
+
+from flask import Flask
+from langchain_core.messages import AIMessageChunk
+
+from app.api import chat
+from app.services import chat_service
+
+
+class FakeGraph:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, graph_input, stream_mode):
+        yield from self.chunks
+
+
+def _stream(monkeypatch, chunks, detected_lang="en"):
+    monkeypatch.setattr(chat_service, "_prepare_chat_run",
+                        lambda query, conversation_id, run_id: ("conv-1", detected_lang, {"user_query": query}, {}))
+    monkeypatch.setattr(chat_service, "langgraph_app", FakeGraph(chunks))
+    monkeypatch.setattr(chat_service, "_finalize_chat_run",
+                        lambda state, conversation_id, run_id, lang: {"response_type": "chat", "message": state.get("reply")})
+    return list(chat_service.stream_chat_message("hi", None, "run-1"))
+
+
+def _token(text, node="GeneralChatagent"):
+    return ("messages", (AIMessageChunk(content=text), {"langgraph_node": node}))
+
+
+CHUNKS = [
+    ("tasks", {"id": "t1", "name": "Supervisor", "triggers": ["start"]}),
+    ("tasks", {"id": "t1", "name": "Supervisor", "error": None}),
+    ("tasks", {"id": "t2", "name": "GeneralChatagent", "triggers": ["branch"]}),
+    _token("Hel"),
+    _token("{\"next\":", node="Supervisor"),
+    _token("lo"),
+    ("custom", {"event": "plan_ready", "plan_index": 0}),
+    ("tasks", {"id": "t2", "name": "GeneralChatagent", "error": None}),
+    ("values", {"reply": "Hello"}),
+]
+
+
+def test_events_follow_the_graph_and_end_with_the_final_payload(monkeypatch):
+    events = _stream(monkeypatch, CHUNKS)
+
+    assert [event for event, _ in events] == [
+        "start", "conversation", "node_started", "node_finished", "node_started",
+        "token", "token", "plan_ready", "node_finished", "final",
+    ]
+    assert events[1][1]["conversation_id"] == "conv-1"
+    assert "".join(data["delta"] for event, data in events if event == "token") == "Hello"
+    assert events[7][1]["plan_index"] == 0
+    final = events[-1][1]
+    assert final["message"] == "Hello"
+    assert [step["node"] for step in final["timings"]["steps"]] == ["Supervisor", "GeneralChatagent"]
+
+
+def test_tokens_are_not_streamed_for_translated_conversations(monkeypatch):
+    events = _stream(monkeypatch, CHUNKS, detected_lang="hi")
+    assert "token" not in [event for event, _ in events]
+    assert events[-1][0] == "final"
+
+
+def _post_stream(monkeypatch, fake_stream):
+    monkeypatch.setattr(chat, "stream_chat_message", fake_stream)
+    app = Flask(__name__)
+    app.register_blueprint(chat.chat_bp)
+    response = app.test_client().post("/api/chat/stream", json={"query": "hi"})
+    frames = [frame for frame in response.get_data(as_text=True).split("\n\n") if frame]
+    return response, [(f.split("\n")[0][len("event: "):], json.loads(f.split("\n")[1][len("data: "):])) for f in frames]
+
+
+def test_endpoint_frames_each_event_as_sse(monkeypatch):
+    def fake_stream(query, conversation_id, run_id):
+        yield "start", {"run_id": run_id}
+        yield "final", {"message": "नमस्ते"}
+
+    response, frames = _post_stream(monkeypatch, fake_stream)
+    assert response.mimetype == "text/event-stream"
+    assert frames == [("start", {"run_id": None}), ("final", {"message": "नमस्ते"})]
+
+
+def test_errors_mid_stream_become_an_error_event(monkeypatch):
+    def fake_stream(query, conversation_id, run_id):
+        yield "start", {"run_id": run_id}
+        raise RuntimeError("graph failed")
+
+    _, frames = _post_stream(monkeypatch, fake_stream)
+    assert [event for event, _ in frames] == ["start", "error"]
+    assert frames[1][1]["response_type"] == "error"
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+from app.agents import context_builder
+from app.agents.context_builder import CONTEXT_RECENT_TURNS, build_conversation_context, estimate_tokens, update_rolling_summary
+from app.database import chat_storage
+
+
+def _conversation(summary="", messages=(), summarized_runs=0, run_count=0):
+    return {
+        "summary": summary,
+        "summarized_runs": summarized_runs,
+        "run_count": run_count,
+        "recent_messages": [{"role": role, "content": content} for role, content in messages],
+    }
+
+
+def test_context_keeps_summary_and_recent_turns_within_budget():
+    conversation = _conversation("Trip to Goa, 3 days", [("user", "hi"), ("assistant", "hello")])
+
+    context = build_conversation_context("c1", agent="supervisor", conversation=conversation)
+
+    assert context == [
+        {"role": "summary", "content": "Trip to Goa, 3 days"},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ]
+
+
+def test_oldest_turns_are_dropped_first_and_the_latest_is_always_kept():
+    long_turns = [("user", "x" * 500), ("assistant", "y" * 500), ("user", "z" * 500), ("assistant", "latest " * 200)]
+    context = build_conversation_context("c1", agent="follow_up", conversation=_conversation("s" * 3000, long_turns))
+
+    assert context[-1]["content"].startswith("latest")
+    assert [m["role"] for m in context] == ["summary", "assistant"]
+    # The summary is clipped to whatever budget the kept turns leave.
+    assert len(context[0]["content"]) < 3000
+    tokens = sum(estimate_tokens(m["content"]) + (m["role"] != "summary") * 2 for m in context)
+    assert tokens <= context_builder.CONTEXT_TOKEN_BUDGETS["follow_up"] + 1
+
+
+def test_rolling_summary_only_folds_runs_outside_the_window(monkeypatch):
+    run_count = CONTEXT_RECENT_TURNS + 3
+    stored, prompts = {}, []
+
+    monkeypatch.setattr(context_builder, "get_conversation_context",
+                        lambda cid, recent: _conversation("old summary", summarized_runs=1, run_count=run_count))
+    monkeypatch.setattr(context_builder, "get_conversation_runs",
+                        lambda cid, start, end: stored.setdefault("range", (start, end)) and [{"role": "user", "content": "to Goa"}])
+    monkeypatch.setattr(context_builder, "get_llm",
+                        lambda: SimpleNamespace(invoke=lambda prompt: prompts.append(prompt) or SimpleNamespace(text=" new summary ")))
+    monkeypatch.setattr(context_builder, "update_conversation_summary",
+                        lambda cid, summary, runs: stored.update(summary=summary, runs=runs) or True)
+
+    assert update_rolling_summary("c1") == "new summary"
+    assert stored == {"range": (1, 3), "summary": "new summary", "runs": 3}
+    assert "old summary" in prompts[0] and "to Goa" in prompts[0]
+
+
+def test_nothing_to_fold_skips_the_llm(monkeypatch):
+    monkeypatch.setattr(context_builder, "get_conversation_context",
+                        lambda cid, recent: _conversation("kept", summarized_runs=0, run_count=CONTEXT_RECENT_TURNS))
+    monkeypatch.setattr(context_builder, "get_llm", lambda: (_ for _ in ()).throw(AssertionError("LLM called")))
+
+    assert update_rolling_summary("c1") == "kept"
+
+
+class FakeMessages:
+    """Just enough of a pymongo collection for update_conversation_summary's filter."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def update_one(self, query, update):
+        runs = query["context_summary_runs"]["$not"]["$gte"]
+        matched = self.doc["conversation_id"] == query["conversation_id"] and not self.doc.get("context_summary_runs", -1) >= runs
+        if matched:
+            self.doc.update(update["$set"])
+        return SimpleNamespace(modified_count=int(matched))
+
+
+def test_stale_fold_does_not_overwrite_a_newer_summary(monkeypatch):
+    messages = FakeMessages({"conversation_id": "c1"})
+    monkeypatch.setattr(chat_storage, "get_messages_collection", lambda: messages)
+
+    assert chat_storage.update_conversation_summary("c1", "up to run 6", 6) is True
+    assert chat_storage.update_conversation_summary("c1", "up to run 4", 4) is False
+    assert messages.doc["context_summary"] == "up to run 6"
+    assert messages.doc["context_summary_runs"] == 6
+
+
+def test_summary_update_without_database_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(chat_storage, "get_messages_collection", lambda: None)
+    assert chat_storage.update_conversation_summary("c1", "summary", 3) is False
@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.agents.day_planner import estimate_dwell_min, plan_days
+from app.agents.spot_table import SpotTable
+
+
+def _line_of_spots(positions):
+    """Spots on a line with the hotel at 0; travel minutes = distance along the line."""
+    records = [{"id": f"s{i}", "name": f"Spot {i}", "lat": 0.0, "lng": float(x)} for i, x in enumerate(positions)]
+    spots = SpotTable.from_records(records)
+    x = np.asarray(positions, dtype=np.float64)
+    spots.hotel_min = np.abs(x)
+    return spots, np.abs(x[:, None] - x[None, :])
+
+
+def test_separate_areas_become_separate_days_nearest_first():
+    # Far area listed first, so the split can't just follow input order.
+    spots, time_matrix = _line_of_spots([104, 100, 102, 14, 10, 12])
+
+    days = plan_days(spots, time_matrix, 2)
+
+    assert [sorted(day) for day in days] == [[3, 4, 5], [0, 1, 2]]
+    # Each day is routed along the line (either direction is the same loop).
+    assert days[0] in ([4, 5, 3], [3, 5, 4])
+
+
+def test_every_spot_is_planned_exactly_once():
+    rng = np.random.default_rng(7)
+    spots, time_matrix = _line_of_spots(rng.uniform(-60, 60, 17).tolist())
+
+    days = plan_days(spots, time_matrix, 4)
+
+    assert len(days) == 4
+    assert sorted(i for day in days for i in day) == list(range(17))
+
+
+def test_days_are_capped_by_spot_count_and_empty_input_is_empty():
+    spots, time_matrix = _line_of_spots([5, 10])
+    assert len(plan_days(spots, time_matrix, 5)) == 2
+
+    empty, _ = _line_of_spots([])
+    assert plan_days(empty, np.zeros((0, 0)), 3) == []
+
+
+def test_dwell_time_uses_the_longest_known_type():
+    assert estimate_dwell_min(["church", "beach"]) == 180
+    assert estimate_dwell_min(["unknown"]) == estimate_dwell_min(None)
@@ -0,0 +1,89 @@
+import asyncio
+
+from app.external.google_maps import distance_matrix
+from app.external.google_maps.distance_matrix import MAX_ELEMENTS, build_distance_matrix
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class FakeClient:
+    """Distance Matrix stand-in: distance = 1000 m x |index difference|, duration = 60 s x the same."""
+
+    def __init__(self, points):
+        self.index = {distance_matrix._point_key(p): i for i, p in enumerate(points)}
+        self.requests = []
+
+    async def get(self, url, params):
+        origins = [self.index[p] for p in params["origins"].split("|")]
+        destinations = [self.index[p] for p in params["destinations"].split("|")]
+        self.requests.append((origins, destinations))
+        rows = [
+            {"elements": [
+                {"status": "OK", "distance": {"value": 1000 * abs(o - d)}, "duration": {"value": 60 * abs(o - d)}}
+                for d in destinations
+            ]}
+            for o in origins
+        ]
+        return FakeResponse({"status": "OK", "rows": rows})
+
+
+def _points(n, lat):
+    # Distinct coordinates per test, so the process-wide pair cache starts cold.
+    return [(lat, 70.0 + i * 0.01) for i in range(n)]
+
+
+def test_square_matrix_is_tiled_within_api_limits():
+    points = _points(23, 10.0)
+    client = FakeClient(points)
+
+    result = asyncio.run(build_distance_matrix(points, client=client))
+
+    assert all(len(o) * len(d) <= MAX_ELEMENTS for o, d in client.requests)
+    assert len(client.requests) == 9  # 3 x 3 tiles of at most 10 x 10
+    for i in range(23):
+        assert result["distance_km"][i][i] == 0
+        for j in range(23):
+            assert result["distance_km"][i][j] == abs(i - j)
+            assert result["time_min"][i][j] == abs(i - j)
+
+
+def test_symmetric_matrix_skips_lower_tiles_and_mirrors():
+    points = _points(12, 11.0)
+    client = FakeClient(points)
+
+    result = asyncio.run(build_distance_matrix(points, symmetric=True, client=client))
+
+    # Blocks (0, 0), (0, 1) and (1, 1); block (1, 0) is mirrored from (0, 1).
+    assert len(client.requests) == 3
+    assert all(min(origins) <= max(destinations) for origins, destinations in client.requests)
+    assert result["distance_km"][7][2] == result["distance_km"][2][7] == 5
+
+
+def test_cached_pairs_are_not_requested_again():
+    points = _points(5, 12.0)
+    first = FakeClient(points)
+    asyncio.run(build_distance_matrix(points, client=first))
+    second = FakeClient(points)
+    result = asyncio.run(build_distance_matrix(points, client=second))
+
+    assert first.requests and not second.requests
+    assert result["distance_km"][0][4] == 4
+
+
+def test_rectangular_matrix_has_no_zeroed_diagonal():
+    origins, destinations = _points(1, 13.0), _points(3, 13.0)
+    client = FakeClient(destinations)
+
+    result = asyncio.run(build_distance_matrix(origins, destinations, client=client))
+
+    assert result["distance_km"] == [[0, 1, 2]]
+    assert len(client.requests) == 1
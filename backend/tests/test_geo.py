@@ -0,0 +1,57 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.utils import geo
+from app.utils.geo import matrix_to_nested_dict, pairwise_distance_km, pairwise_matrices, point_to_set_km, travel_time_min
+
+
+def haversine_km(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def _points(n, seed=3, spread=1.0):
+    rng = random.Random(seed)
+    return [(15.5 + rng.uniform(-spread, spread), 73.8 + rng.uniform(-spread, spread)) for _ in range(n)]
+
+
+@pytest.mark.parametrize("spread", [0.001, 1.0, 60.0])
+def test_matrix_matches_scalar_haversine(spread):
+    points = _points(40, spread=spread)
+    expected = np.array([[haversine_km(a, b) for b in points] for a in points])
+
+    distance = pairwise_distance_km(points)
+
+    assert distance.dtype == np.float32
+    # float32 storage: relative error ~1e-7, so well under a metre at these ranges.
+    assert np.allclose(distance, expected, rtol=1e-6, atol=1e-3)
+    assert np.all(np.diag(distance) == 0)
+
+
+def test_row_blocks_give_the_same_answer(monkeypatch):
+    points, others = _points(25), _points(7, seed=9)
+    whole = pairwise_distance_km(points, others)
+    monkeypatch.setattr(geo, "_BLOCK_ELEMENTS", 10)  # one row per block
+    assert np.array_equal(pairwise_distance_km(points, others), whole)
+    assert whole.shape == (25, 7)
+
+
+def test_dict_points_with_lng_or_long_and_point_to_set():
+    points = [{"lat": 15.5, "lng": 73.8}, {"lat": 15.6, "long": 73.9}]
+    expected = [haversine_km((15.0, 74.0), p) for p in [(15.5, 73.8), (15.6, 73.9)]]
+    assert np.allclose(point_to_set_km((15.0, 74.0), points), expected, atol=1e-3)
+    assert pairwise_distance_km([]).shape == (0, 0)
+
+
+def test_travel_time_and_legacy_nested_dict():
+    distance, minutes = pairwise_matrices([(15.5, 73.8), (15.6, 73.8)], speed_kmph=30)
+    assert np.allclose(minutes, distance * 2)
+    assert np.all(travel_time_min(distance, speed_kmph=0) == 0)
+
+    nested = matrix_to_nested_dict(["Fort", "Beach"], distance, minutes)
+    assert set(nested["Fort"]) == {"Beach"}
+    assert nested["Fort"]["Beach"]["distance_km"] == round(haversine_km((15.5, 73.8), (15.6, 73.8)), 1)
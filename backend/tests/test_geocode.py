@@ -0,0 +1,79 @@
+import pytest
+import requests
+
+from app.external.google_maps import geocode as geocode_module
+from app.external.google_maps.geocode import geocode, geocode_many, geocode_record, normalize_address
+from app.utils.cache import TieredCache
+
+GOA = {"status": "OK", "results": [{"place_id": "goa", "formatted_address": "Goa, India",
+                                    "geometry": {"location": {"lat": 15.3, "lng": 74.1}}, "types": ["administrative_area_level_1"]}]}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Canned Geocoding API: {address: response json or exception}; returns the list of requested addresses."""
+    responses, calls = {}, []
+
+    class FakeResponse:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def json(self):
+            return self.payload
+
+    class FakeSession:
+        def get(self, url, params, timeout):
+            calls.append(params["address"])
+            answer = responses[params["address"]]
+            if isinstance(answer, Exception):
+                raise answer
+            return FakeResponse(answer)
+
+    monkeypatch.setattr(geocode_module, "_http", FakeSession())
+    monkeypatch.setattr(geocode_module, "_geocode_cache", TieredCache("test_geocode", persistent=False))
+    monkeypatch.setattr(geocode_module, "_negative_cache", TieredCache("test_geocode_negative", persistent=False))
+    monkeypatch.setattr(geocode_module, "index_places", lambda records, kind=None: 0)
+    return responses, calls
+
+
+def test_addresses_are_normalised_for_the_cache_key():
+    assert normalize_address("  Panaji ,Goa. ") == normalize_address("panaji, goa") == "panaji, goa"
+
+
+def test_positive_answers_are_cached_across_spellings(api):
+    responses, calls = api
+    responses["Goa"] = GOA
+
+    assert geocode("Goa") == (15.3, 74.1)
+    assert geocode(" goa ") == (15.3, 74.1)
+    assert geocode_record("GOA")["types"] == ["administrative_area_level_1"]
+    assert calls == ["Goa"]
+
+
+def test_unresolvable_addresses_are_negatively_cached(api):
+    responses, calls = api
+    responses["Atlantis"] = {"status": "ZERO_RESULTS", "results": []}
+
+    assert geocode("Atlantis") is None
+    assert geocode("atlantis") is None
+    assert calls == ["Atlantis"]
+
+
+@pytest.mark.parametrize("answer", [{"status": "OVER_QUERY_LIMIT"}, requests.ConnectionError("down")])
+def test_transient_failures_are_not_cached(api, answer):
+    responses, calls = api
+    responses["Goa"] = answer
+    assert geocode("Goa") is None
+
+    responses["Goa"] = GOA
+    assert geocode("Goa") == (15.3, 74.1)
+    assert calls == ["Goa", "Goa"]
+
+
+def test_geocode_many_keeps_input_order_and_skips_blank_addresses(api):
+    responses, calls = api
+    responses["Goa"] = GOA
+    responses["Atlantis"] = {"status": "ZERO_RESULTS"}
+
+    assert geocode_many(["Goa", "", "Atlantis", "goa"]) == [(15.3, 74.1), None, None, (15.3, 74.1)]
+    assert "" not in calls
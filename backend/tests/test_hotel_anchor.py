@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+import numpy as np
+
+from app.agents import planner
+from app.agents.planner import select_central_hotel_location
+from app.utils.geo import pairwise_distance_km, weighted_medoid_index
+
+
+def _spots(n, seed=5):
+    rng = random.Random(seed)
+    return [{"id": f"s{i}", "lat": 15.5 + rng.uniform(-0.2, 0.2), "lng": 73.8 + rng.uniform(-0.2, 0.2),
+             "rating": round(rng.uniform(3.5, 5.0), 1)} for i in range(n)]
+
+
+def test_medoid_minimises_the_weighted_distance_sum():
+    spots = _spots(30)
+    weights = np.array([s["rating"] for s in spots])
+    distance = pairwise_distance_km(spots).astype(np.float64)
+    expected = int(np.argmin([distance[i] @ weights for i in range(len(spots))]))
+    assert weighted_medoid_index(spots, weights) == expected
+
+
+def test_anchor_depends_only_on_the_spot_set():
+    spots = _spots(20)
+    anchor = select_central_hotel_location(spots)
+    for seed in range(5):
+        shuffled = list(spots)
+        random.Random(seed).shuffle(shuffled)
+        assert select_central_hotel_location(shuffled)["id"] == anchor["id"]
+
+
+def test_exact_ties_go_to_the_smallest_id_and_missing_ratings_are_tolerated():
+    spots = [{"id": "b", "lat": 15.0, "lng": 73.0, "rating": None}, {"id": "a", "lat": 15.1, "lng": 73.0}]
+    assert select_central_hotel_location(spots)["id"] == "a"
+    assert select_central_hotel_location([]) == {"lat": None, "lng": None}
+
+
+def _snap(monkeypatch, hotels, max_km=5):
+    async def fake_search(session, query, location):
+        return hotels
+
+    monkeypatch.setattr(planner, "HOTEL_ANCHOR_SNAP_LODGING", True)
+    monkeypatch.setattr(planner, "HOTEL_SNAP_MAX_KM", max_km)
+    monkeypatch.setattr(planner, "places_text_search", fake_search)
+    # Keep the process-wide place index out of it.
+    monkeypatch.setattr(planner, "places_within", lambda *args, **kwargs: [], raising=False)
+    return asyncio.run(planner.snap_to_lodging({"id": "fort", "lat": 15.5, "lng": 73.8}, "Goa"))
+
+
+def test_anchor_snaps_to_the_nearest_well_rated_lodging(monkeypatch):
+    hotels = [
+        {"id": "near-but-poor", "lat": 15.501, "lng": 73.8, "rating": 2.0},
+        {"id": "near", "lat": 15.51, "lng": 73.8, "rating": 4.1},
+        {"id": "far", "lat": 15.45, "lng": 73.8, "rating": 4.8},
+    ]
+    assert _snap(monkeypatch, hotels)["id"] == "near"
+
+
+def test_anchor_stays_put_when_no_lodging_is_close_enough(monkeypatch):
+    hotels = [{"id": "far", "lat": 15.6, "lng": 73.8, "rating": 4.8}]  # ~11 km away
+    assert _snap(monkeypatch, hotels)["id"] == "fort"
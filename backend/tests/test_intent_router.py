@@ -0,0 +1,39 @@
+import pytest
+
+from app.agents.intent_router import FAST_ROUTER_THRESHOLD, classify_intent
+
+
+@pytest.mark.parametrize("query", [
+    "summarize plan 2",
+    "explain this plan",
+    "what's the stay like",
+    "tell me more about the tour",
+])
+def test_questions_about_a_plan_are_left_to_the_llm(query):
+    assert classify_intent(query)["confidence"] < FAST_ROUTER_THRESHOLD
+
+
+@pytest.mark.parametrize("query", ["plan something nice", "any rooms near the beach", "book a tour"])
+def test_weak_keyword_alone_is_below_threshold(query):
+    route = classify_intent(query)
+    assert route["next"] == "initialAgent"
+    assert route["confidence"] < FAST_ROUTER_THRESHOLD
+
+
+@pytest.mark.parametrize("query, scenario_agent", [
+    ("plan a 3 day trip to goa", "Iterationagent"),
+    ("book a flight from delhi to mumbai", "FlightBookingagent"),
+    ("bus tickets to pune tomorrow", "BusBookingAgent"),
+    ("find me a hotel in jaipur", "AccomodationAgent"),
+])
+def test_clear_booking_intents_route_locally(query, scenario_agent):
+    route = classify_intent(query)
+    assert route["next"] == "initialAgent"
+    assert route["confidence"] >= FAST_ROUTER_THRESHOLD
+    assert classify_intent(query, initial_agent_done=True)["next"] == scenario_agent
+
+
+def test_small_talk_routes_to_general_chat():
+    route = classify_intent("thanks so much!")
+    assert route["next"] == "GeneralChatagent"
+    assert route["confidence"] >= FAST_ROUTER_THRESHOLD
@@ -0,0 +1,64 @@
+import json
+import os
+
+from app.agents import planner
+from app.agents.planner import _ITINERARY_PLAN_ADAPTER, _ITINERARY_PLANS_ADAPTER, _parse_itinerary_output
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "json_repair_fixtures")
+
+
+def _activity(name):
+    return {"spot_name": name, "lat": 15.5, "long": 73.8, "description": "Nice", "estimated_time_spent": "1 hour"}
+
+
+def _plan(name="Goa Escape", days=None):
+    return {
+        "date": "2025-12-12",
+        "duration_days": 1,
+        "itinerary_name": name,
+        "hotel": {"name": "Hotel", "lat": 15.5, "lng": 73.8},
+        "itinerary": days if days is not None else [{"day": "Day 1", "activities": [_activity("Fort")]}],
+    }
+
+
+def test_schema_output_is_converted_to_the_pipeline_shape():
+    plans = _parse_itinerary_output(json.dumps(_plan()), _ITINERARY_PLAN_ADAPTER)
+
+    assert len(plans) == 1
+    assert plans[0]["itinerary"] == {"Day 1": [_activity("Fort")]}
+    assert plans[0]["hotel"]["rating"] is None
+
+
+def test_fallback_drops_plans_that_fail_the_schema():
+    broken = _plan("Broken", days=[{"day": "Day 1", "activities": [{"spot_name": "B", "la": None}]}])
+    # Extra prose fails validate_json and forces the fallback path.
+    text = json.dumps([_plan("Good"), broken]) + "\nHope you enjoy!"
+
+    plans = _parse_itinerary_output(text, _ITINERARY_PLANS_ADAPTER)
+
+    assert [p["itinerary_name"] for p in plans] == ["Good"]
+
+
+def test_fallback_accepts_the_day_keyed_itinerary_shape():
+    plan = _plan(days=None)
+    plan["itinerary"] = {"Day 1": [_activity("Fort")]}
+
+    plans = _parse_itinerary_output(json.dumps([plan]) + " trailing", _ITINERARY_PLANS_ADAPTER)
+
+    assert plans[0]["itinerary"] == {"Day 1": [_activity("Fort")]}
+
+
+def test_truncated_single_plan_is_repaired_without_its_half_written_activity():
+    with open(os.path.join(FIXTURE_DIR, "13_truncated_single_plan.txt")) as f:
+        plans = _parse_itinerary_output(f.read(), _ITINERARY_PLAN_ADAPTER)
+
+    assert len(plans) == 1 and "error" not in plans[0]
+    assert [a["spot_name"] for a in plans[0]["itinerary"]["Day 2"]] == ["Fort St. George"]
+
+
+def test_nothing_valid_is_reported_as_an_error(monkeypatch):
+    monkeypatch.setattr(planner, "fix_broken_json", lambda text: {"error": "Invalid JSON even after fix"})
+
+    plans = _parse_itinerary_output('{"date": ', _ITINERARY_PLAN_ADAPTER)
+
+    assert len(plans) == 1 and "error" in plans[0]
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+from app.utils.json_repair import repair_json
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "json_repair_fixtures")
+PLAN_KEYS = ("hotel", "itinerary")
+ACTIVITY_KEYS = {"spot_name", "lat", "long", "description", "estimated_time_spent"}
+
+with open(os.path.join(FIXTURE_DIR, "expected.json")) as f:
+    EXPECTED = json.load(f)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_fixture_repairs_to_expected_shape(name):
+    with open(os.path.join(FIXTURE_DIR, name)) as f:
+        data = repair_json(f.read(), required_keys=PLAN_KEYS)
+
+    expected = EXPECTED[name]
+    plans = data if expected["type"] == "list" else [data]
+    assert isinstance(data, list if expected["type"] == "list" else dict)
+    assert len(plans) == expected["items"]
+    assert all(set(PLAN_KEYS) <= set(plan) for plan in plans)
+    # Half-written activities are dropped, never returned with missing fields.
+    for plan in plans:
+        itinerary = plan["itinerary"]
+        # Both shapes occur: [{"day", "activities"}] and {"Day 1": [...]}.
+        days = itinerary.values() if isinstance(itinerary, dict) else [day["activities"] for day in itinerary]
+        assert all(ACTIVITY_KEYS <= set(act) for activities in days for act in activities)
+
+
+def test_valid_json_is_returned_untouched():
+    assert repair_json('```json\n{"a": [1, 2]}\n```') == {"a": [1, 2]}
+
+
+def test_truncated_array_keeps_only_complete_items():
+    assert repair_json('[{"a": 1}, {"a": 2}, {"a"') == [{"a": 1}, {"a": 2}]
+
+
+@pytest.mark.parametrize("text", [
+    '{"itinerary": [{"day": "Day 1", "activities": [{"name": "A", "lat": 1}, {"name": "B", "la',
+    '{"itinerary": [{"day": "Day 1", "activities": [{"name": "A", "lat": 1}, {"name": "B"}, ',
+    '{"itinerary": [{"day": "Day 1", "activities": [{"name": "A", "lat": 1}, "half-writ',
+])
+def test_truncated_object_drops_the_unfinished_element_of_the_innermost_array(text):
+    data = repair_json(text)
+    activities = data["itinerary"][0]["activities"]
+    assert activities[0] == {"name": "A", "lat": 1}
+    assert activities[1:] in ([], [{"name": "B"}])
+
+
+def test_unescaped_inner_quotes_stay_inside_the_string():
+    assert repair_json('{"note": "He said "hi" there", "x": 1}') == {"note": 'He said "hi" there', "x": 1}
+    assert repair_json("{'note': 'it's fine'}") == {"note": "it's fine"}
+
+
+def test_missing_comma_between_lines_still_splits_fields():
+    assert repair_json('{"a": "x"\n "b": "y"}') == {"a": "x", "b": "y"}
+
+
+def test_numbers_are_normalised():
+    assert repair_json('{"a": .5, "b": -.25, "c": +3, "d": 05,}') == {"a": 0.5, "b": -0.25, "c": 3, "d": 5}
+
+
+@pytest.mark.parametrize("text", ["[", "```json\n[\n", "{"])
+def test_truncated_output_without_items_raises(text):
+    with pytest.raises(ValueError):
+        repair_json(text)
+
+
+def test_half_written_first_plan_raises():
+    with pytest.raises(ValueError):
+        repair_json('[{"date": "2025-01-01", "itinerary_name": "Goa Bea')
+
+
+def test_truncated_plan_object_without_required_keys_raises():
+    text = '{"date": "2025-01-01", "itinerary_name": "Goa Bea'
+    assert repair_json(text) == {"date": "2025-01-01", "itinerary_name": "Goa Bea"}
+    with pytest.raises(ValueError):
+        repair_json(text, required_keys=PLAN_KEYS)
+
+
+def test_hopeless_text_raises():
+    with pytest.raises(ValueError):
+        repair_json("no json here")
@@ -0,0 +1,45 @@
+from datetime import date
+
+from app.agents import llm_cache
+from app.agents.llm_cache import cached_llm_json, llm_cache_key
+from app.utils.cache import TieredCache
+
+
+def test_key_ignores_case_and_whitespace_but_not_content():
+    key = llm_cache_key("flash", "Extract trip details.", "3 days in  Goa\n", "2026-01-01")
+    assert key == llm_cache_key("flash", "extract trip   details.", "3 DAYS IN GOA", "2026-01-01")
+    assert key != llm_cache_key("flash", "Extract trip details.", "4 days in Goa", "2026-01-01")
+    assert key != llm_cache_key("pro", "Extract trip details.", "3 days in Goa", "2026-01-01")
+
+
+def test_answers_do_not_leak_across_days(monkeypatch):
+    class FakeDate(date):
+        today_value = date(2026, 1, 1)
+
+        @classmethod
+        def today(cls):
+            return cls.today_value
+
+    monkeypatch.setattr(llm_cache, "date", FakeDate)
+    monday = llm_cache_key("flash", "prompt", "trip starting tomorrow")
+    FakeDate.today_value = date(2026, 1, 2)
+    assert llm_cache_key("flash", "prompt", "trip starting tomorrow") != monday
+
+
+def test_extraction_is_computed_once_and_failures_are_not_cached(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_llm_cache", TieredCache("test_llm", persistent=False))
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            return value
+        return run
+
+    assert cached_llm_json("flash", "prompt", "Goa trip", compute({"destination": "Goa"})) == {"destination": "Goa"}
+    assert cached_llm_json("flash", "PROMPT", "goa  trip", compute({"destination": "other"})) == {"destination": "Goa"}
+    assert calls == [{"destination": "Goa"}]
+
+    cached_llm_json("flash", "prompt", "Pune trip", compute(None))
+    cached_llm_json("flash", "prompt", "Pune trip", compute(None))
+    assert calls[1:] == [None, None]
@@ -0,0 +1,25 @@
+import threading
+
+from app.agents import llm_init
+
+
+def test_genai_client_resolves_credentials_without_deadlock(monkeypatch):
+    """The client factory takes the credentials lock while the registry lock is held."""
+    credentials = object()
+    monkeypatch.setattr(llm_init, "_pools", {})
+    monkeypatch.setattr(llm_init, "_credentials", None)
+    monkeypatch.setattr(
+        llm_init.service_account.Credentials,
+        "from_service_account_file",
+        staticmethod(lambda path, scopes=None: credentials),
+    )
+    monkeypatch.setattr(llm_init.genai, "Client", lambda **kwargs: kwargs)
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault("client", llm_init.get_genai_client()), daemon=True)
+    worker.start()
+    worker.join(5)
+
+    assert not worker.is_alive(), "get_genai_client() deadlocked"
+    assert result["client"]["credentials"] is credentials
+    assert llm_init.get_genai_client() is result["client"]
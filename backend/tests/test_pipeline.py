@@ -0,0 +1,81 @@
+import asyncio
+
+from app.agents import planner
+from app.external.openweather import weather
+from app.utils.metrics import get_counter
+
+
+def _trip(name, *coords):
+    return {"itinerary_name": name, "itinerary": {"Day 1": [{"spot_name": f"{name}{i}", "lat": lat, "lng": lng} for i, (lat, lng) in enumerate(coords)]}}
+
+
+def _fake_weather(monkeypatch, delays=None, active=None):
+    delays = delays or {}
+
+    async def fake_fetch_cell(session, semaphore, cell):
+        async with semaphore:
+            if active is not None:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            try:
+                await asyncio.sleep(delays.get(cell, 0.01))
+            finally:
+                if active is not None:
+                    active["now"] -= 1
+        return "clear"
+
+    monkeypatch.setattr(weather, "_fetch_cell", fake_fetch_cell)
+    monkeypatch.setattr(weather, "_weather_cache", weather.TieredCache("test_pipeline", persistent=False))
+
+
+async def _identity(trip):
+    return trip
+
+
+def test_deadline_drops_plans_still_fetching_weather(monkeypatch):
+    slow_cell = weather.geohash_encode(8.5, 76.9, weather.WEATHER_GEOHASH_PRECISION)
+    _fake_weather(monkeypatch, {slow_cell: 1.0})
+    trips = [_trip("Goa", (15.5, 73.8)), _trip("Kerala", (8.5, 76.9)), _trip("Pune", (18.5, 73.9))]
+
+    results = asyncio.run(planner.process_trips(trips, _identity, deadline_seconds=0.3))
+
+    assert [t["itinerary_name"] for t in results] == ["Goa", "Pune"]
+    assert results[0]["itinerary"]["Day 1"][0]["weather"] == "clear"
+
+
+def test_no_finished_plan_returns_every_ordered_plan_with_unknown_weather(monkeypatch):
+    _fake_weather(monkeypatch, {weather.geohash_encode(8.5, 76.9, weather.WEATHER_GEOHASH_PRECISION): 1.0})
+    trips = [_trip("Kerala", (8.5, 76.9))]
+
+    results = asyncio.run(planner.process_trips(trips, _identity, deadline_seconds=0.1))
+
+    assert [t["itinerary_name"] for t in results] == ["Kerala"]
+    assert results[0]["itinerary"]["Day 1"][0]["weather"] == "unknown"
+
+
+def test_a_failing_plan_is_skipped_and_counted(monkeypatch):
+    _fake_weather(monkeypatch)
+    failed_before = get_counter("itinerary_pipeline.failed_plans")
+
+    async def process(trip):
+        if trip["itinerary_name"] == "Broken":
+            raise KeyError("hotel")
+        return trip
+
+    trips = [_trip("Goa", (15.5, 73.8)), _trip("Broken", (8.5, 76.9)), _trip("Pune", (18.5, 73.9))]
+    results = asyncio.run(planner.process_trips(trips, process, deadline_seconds=0))
+
+    assert [t["itinerary_name"] for t in results] == ["Goa", "Pune"]
+    assert get_counter("itinerary_pipeline.failed_plans") == failed_before + 1
+
+
+def test_connection_limit_caps_weather_requests_across_plans(monkeypatch):
+    active = {"now": 0, "max": 0}
+    _fake_weather(monkeypatch, active=active)
+    monkeypatch.setattr(planner, "PIPELINE_CONNECTION_LIMIT", 2)
+    trips = [_trip(f"Plan{p}", *[(10.0 + p, 70.0 + c * 0.5) for c in range(4)]) for p in range(3)]
+
+    results = asyncio.run(planner.process_trips(trips, _identity, deadline_seconds=0))
+
+    assert len(results) == 3
+    assert active["max"] == 2
@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+
+from app.external.google_maps import accomdation, place_index
+from app.utils.geo import point_to_set_km
+from app.utils.spatial_index import GridIndex
+
+
+def _points(n, seed=7):
+    rng = random.Random(seed)
+    return [(f"p{i}", rng.uniform(12.0, 14.0), rng.uniform(76.5, 78.5)) for i in range(n)]
+
+
+def _brute_force(points, lat, lng):
+    distance = point_to_set_km((lat, lng), [(p_lat, p_lng) for _, p_lat, p_lng in points])
+    return [(float(distance[i]), points[i][0]) for i in np.argsort(distance, kind="stable")]
+
+
+def test_within_and_nearest_match_brute_force():
+    points = _points(2000)
+    index = GridIndex(0.1)
+    for point_id, lat, lng in points:
+        index.insert(point_id, lat, lng)
+
+    for lat, lng in [(13.0, 77.6), (12.05, 76.55), (13.97, 78.4)]:
+        expected = _brute_force(points, lat, lng)
+        within = [point_id for _, point_id, _ in index.within(lat, lng, 15)]
+        assert within == [point_id for d, point_id in expected if d <= 15]
+        nearest = [point_id for _, point_id, _ in index.nearest(lat, lng, k=5, max_km=200)]
+        assert nearest == [point_id for _, point_id in expected[:5]]
+
+
+def test_kind_filter_and_reinsert_moves_the_point():
+    index = GridIndex(0.1)
+    index.insert("hotel", 13.0, 77.6, kind="lodging")
+    index.insert("fort", 13.0, 77.6, kind="spot")
+    assert [point_id for _, point_id, _ in index.within(13.0, 77.6, 1, kind="lodging")] == ["hotel"]
+
+    assert index.insert("hotel", 15.5, 73.8, kind="lodging") is False
+    assert index.within(13.0, 77.6, 1, kind="lodging") == []
+    assert len(index) == 2
+
+
+def _fake_gmaps(monkeypatch, nearby):
+    calls = {"nearby": 0, "details": []}
+
+    class FakeClient:
+        def places_nearby(self, location, radius, type):
+            calls["nearby"] += 1
+            return {"results": nearby}
+
+        def place(self, place_id, fields):
+            calls["details"].append(place_id)
+            return {"status": "OK", "result": {"name": place_id, "rating": 4.0, "url": f"maps/{place_id}"}}
+
+    monkeypatch.setattr(accomdation, "gmaps", FakeClient())
+    monkeypatch.setattr(accomdation, "geocode", lambda address: (13.0, 77.6))
+    monkeypatch.setattr(place_index, "_index", GridIndex(0.1))
+    monkeypatch.setattr(place_index, "_loaded", True)
+    monkeypatch.setattr(place_index, "_collection", lambda: None)
+    return calls
+
+
+def _nearby_hotel(place_id, rating, offset):
+    return {
+        "place_id": place_id, "name": place_id, "rating": rating, "types": ["lodging"],
+        "geometry": {"location": {"lat": 13.0 + offset, "lng": 77.6}},
+    }
+
+
+def test_warm_hotel_lookup_is_answered_from_the_index(monkeypatch):
+    nearby = [_nearby_hotel(f"h{i}", 3.0 + i / 10, i / 1000) for i in range(6)]
+    calls = _fake_gmaps(monkeypatch, nearby)
+
+    accomdation.find_best_nearby_hotels("MG Road, Bangalore", radius=3000, limit=3)
+    # Details are only fetched for the best-rated candidates.
+    assert calls["nearby"] == 1
+    assert calls["details"] == ["h5", "h4", "h3"]
+
+    hotels = accomdation.find_best_nearby_hotels("MG Road, Bangalore", radius=3000, limit=3)
+    assert calls["nearby"] == 1
+    assert calls["details"][3:] == ["h5", "h4", "h3"]
+    assert len(hotels) == 3
+
+
+def test_sparse_index_falls_back_to_nearby_search(monkeypatch):
+    calls = _fake_gmaps(monkeypatch, [_nearby_hotel("h0", 4.2, 0.0)])
+
+    accomdation.find_best_nearby_hotels("MG Road, Bangalore", radius=3000, limit=3)
+    accomdation.find_best_nearby_hotels("MG Road, Bangalore", radius=3000, limit=3)
+    assert calls["nearby"] == 2
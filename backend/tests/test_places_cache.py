@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from app.external.google_maps import places_cache
+from app.external.google_maps.places_cache import cached_places_search
+from app.utils.cache import TieredCache
+
+
+def _fresh_cache(monkeypatch):
+    monkeypatch.setattr(places_cache, "_places_cache", TieredCache("test_places", persistent=False))
+
+
+def test_concurrent_searches_share_one_upstream_call(monkeypatch):
+    _fresh_cache(monkeypatch)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [{"id": "fort", "name": "Fort"}]
+
+    async def main():
+        return await asyncio.gather(*[cached_places_search("Forts", "Goa", "top10", fetch) for _ in range(5)])
+
+    assert asyncio.run(main()) == [[{"id": "fort", "name": "Fort"}]] * 5
+    # Same search, different spelling: served from the cache.
+    assert asyncio.run(cached_places_search(" forts ", "GOA", "top10", fetch)) == [{"id": "fort", "name": "Fort"}]
+    assert len(calls) == 1
+
+
+def test_searches_on_other_threads_join_the_leader(monkeypatch):
+    _fresh_cache(monkeypatch)
+    calls, results = [], []
+    started = threading.Event()
+
+    async def fetch():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.2)
+        return [{"id": "beach"}]
+
+    def follower():
+        started.wait(1)
+        results.append(asyncio.run(cached_places_search("Beaches", "Goa", "top10", fetch)))
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    results.append(asyncio.run(cached_places_search("Beaches", "Goa", "top10", fetch)))
+    thread.join()
+
+    assert results == [[{"id": "beach"}]] * 2
+    assert len(calls) == 1
+
+
+def test_failed_searches_are_not_cached(monkeypatch):
+    _fresh_cache(monkeypatch)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return None
+
+    assert asyncio.run(cached_places_search("Markets", "Goa", "top10", fetch)) == []
+    assert asyncio.run(cached_places_search("Markets", "Goa", "top10", fetch)) == []
+    assert len(calls) == 2
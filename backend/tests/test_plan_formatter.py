@@ -0,0 +1,63 @@
+import copy
+import time
+
+from app.agents import planner
+
+
+def _plan(name, *days):
+    return {"itinerary_name": name, "itinerary": {f"Day {n}": [{"spot_name": s} for s in spots] for n, spots in enumerate(days, 1)}}
+
+
+def _format(monkeypatch, outputs, delays):
+    def fake_format(partition, user_query, plan_index, excluded):
+        time.sleep(delays[plan_index])
+        if isinstance(outputs[plan_index], Exception):
+            raise outputs[plan_index]
+        return copy.deepcopy(outputs[plan_index])
+
+    monkeypatch.setattr(planner, "FORMATTER_PARALLEL_PLANS", True)
+    monkeypatch.setattr(planner, "partition_spots_for_plans", lambda data: [{} for _ in outputs])
+    monkeypatch.setattr(planner, "_partition_spot_names", lambda partition: set())
+    monkeypatch.setattr(planner, "format_plan_with_llm", fake_format)
+
+    emitted = []
+    merged = planner.format_itinerary_with_llm({}, "3 days in goa", lambda i, plan: emitted.append((i, copy.deepcopy(plan))))
+    return merged, emitted
+
+
+def test_shared_spots_stay_with_the_lower_index_plan_whatever_finishes_first(monkeypatch):
+    outputs = {
+        0: [_plan("First", ["Fort", "Beach"])],
+        1: [_plan("Second", ["fort ", "Market"])],
+        2: [{"error": "bad output"}],
+    }
+    # The second plan finishes first; it still loses the shared spot.
+    merged, emitted = _format(monkeypatch, outputs, {0: 0.2, 1: 0.0, 2: 0.1})
+
+    assert [p["itinerary_name"] for p in merged] == ["First", "Second"]
+    assert [a["spot_name"] for a in merged[0]["itinerary"]["Day 1"]] == ["Fort", "Beach"]
+    assert [a["spot_name"] for a in merged[1]["itinerary"]["Day 1"]] == ["Market"]
+    # Emitted in plan order, each payload identical to the merged plan.
+    assert emitted == [(0, merged[0]), (1, merged[1])]
+
+
+def test_plan_emptied_by_dedup_is_neither_emitted_nor_merged(monkeypatch):
+    outputs = {
+        0: [_plan("First", ["Fort"], ["Beach"])],
+        1: [_plan("Second", ["Market"], ["beach"])],
+        2: [_plan("Third", ["Temple"], ["Museum"])],
+    }
+    merged, emitted = _format(monkeypatch, outputs, {0: 0.0, 1: 0.0, 2: 0.0})
+
+    assert [p["itinerary_name"] for p in merged] == ["First", "Third"]
+    assert [i for i, _ in emitted] == [0, 2]
+    # The dropped plan's spots are not reserved: nothing was taken from "Third".
+    assert [a["spot_name"] for a in merged[1]["itinerary"]["Day 1"]] == ["Temple"]
+
+
+def test_failed_plan_does_not_block_later_plans(monkeypatch):
+    outputs = {0: RuntimeError("LLM down"), 1: [_plan("Second", ["Market"])]}
+    merged, emitted = _format(monkeypatch, outputs, {0: 0.1, 1: 0.0})
+
+    assert [p["itinerary_name"] for p in merged] == ["Second"]
+    assert [i for i, _ in emitted] == [1]
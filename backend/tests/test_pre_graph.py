@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from app.services import chat_service
+
+
+def _patch(monkeypatch, history=None, delay=0.2, fail=None):
+    calls = []
+
+    def stage(name, result=None):
+        def run(*args, **kwargs):
+            calls.append(name)
+            time.sleep(delay)
+            if fail == name:
+                raise RuntimeError(f"{name} failed")
+            return result
+        return run
+
+    monkeypatch.setattr(chat_service, "translate_auto_to_english", stage("translate", ("hi", "3 days in goa")))
+    monkeypatch.setattr(chat_service, "store_chat_message", stage("store_user_message"))
+    monkeypatch.setattr(chat_service, "create_conversation", stage("create_conversation"))
+    monkeypatch.setattr(chat_service, "get_conversation_context", stage("history", history))
+    return calls
+
+
+def test_existing_conversation_stages_run_concurrently_and_history_is_preloaded(monkeypatch):
+    history = {"summary": "Planning Goa", "summarized_runs": 2, "run_count": 3,
+               "recent_messages": [{"role": "assistant", "content": "Sure"}]}
+    calls = _patch(monkeypatch, history)
+
+    start = time.perf_counter()
+    conversation_id, lang, graph_input, timings = chat_service._prepare_chat_run("गोवा में 3 दिन", "conv-1", "run-1")
+    elapsed = time.perf_counter() - start
+
+    assert sorted(calls) == ["history", "store_user_message", "translate"]
+    assert elapsed < 0.5  # three 0.2 s stages, not 0.6 s
+    assert (conversation_id, lang) == ("conv-1", "hi")
+    assert graph_input["user_query"] == "3 days in goa"
+    # The history read raced the user-message write; the current turn is appended.
+    assert graph_input["conversation_history"]["recent_messages"][-1] == {"role": "user", "content": "गोवा में 3 दिन"}
+    assert graph_input["conversation_history"]["run_count"] == 4
+    assert set(timings) >= {"translate", "store_user_message", "history", "pre_graph_total"}
+
+
+def test_new_conversation_skips_the_history_read(monkeypatch):
+    calls = _patch(monkeypatch, delay=0.0)
+
+    conversation_id, _, graph_input, _ = chat_service._prepare_chat_run("hi", None, "run-1")
+
+    assert conversation_id
+    assert "history" not in calls and "create_conversation" in calls
+    assert graph_input["conversation_history"]["recent_messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_persistence_errors_surface(monkeypatch):
+    _patch(monkeypatch, history={"recent_messages": [], "run_count": 0}, delay=0.0, fail="store_user_message")
+    with pytest.raises(RuntimeError, match="store_user_message failed"):
+        chat_service._prepare_chat_run("hi", "conv-1", "run-1")
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.agents import re_planner
+
+
+def test_resolve_spots_dedupes_and_only_fetches_incomplete_records(monkeypatch):
+    requested = []
+
+    async def fake_place_details(session, place_id):
+        requested.append(place_id)
+        if place_id == "t13-missing":
+            return None
+        return {"place_id": place_id, "name": "Fort", "geometry": {"location": {"lat": 15.5, "lng": 73.8}}}
+
+    monkeypatch.setattr(re_planner, "place_details", fake_place_details)
+
+    spots = [
+        {"id": "t13-full", "name": "Beach", "lat": 15.1, "lng": 73.9, "rating": 4.5},
+        {"id": "t13-full", "name": "Beach (dup)", "lat": 15.1, "lng": 73.9, "rating": 4.5},
+        {"id": "t13-partial", "name": None, "lat": None, "lng": None, "rating": 4.2},
+        {"id": "t13-missing", "name": "Ghost", "lat": None, "lng": None, "rating": 4.0},
+        {"id": None, "name": "No id", "lat": 1.0, "lng": 1.0},
+    ]
+
+    resolved = asyncio.run(re_planner.resolve_spots(None, asyncio.Semaphore(2), spots))
+
+    assert sorted(requested) == ["t13-missing", "t13-partial"]
+    assert [s["id"] for s in resolved] == ["t13-full", "t13-partial"]
+    assert resolved[0]["name"] == "Beach"
+    assert (resolved[1]["name"], resolved[1]["lat"], resolved[1]["rating"]) == ("Fort", 15.5, 4.2)
@@ -0,0 +1,27 @@
+from app.agents import trip_graph
+from app.agents.route_extract_executor import DEFAULT_CLARIFY_QUESTION, RouteAndSlots
+
+
+def _run(monkeypatch, **fields):
+    result = RouteAndSlots(next="Iterationagent", reasoning="trip", scenario="trip", **fields)
+    monkeypatch.setattr(trip_graph, "_route_and_extract", lambda state: result)
+    return trip_graph.RouteExtractAgent({"messages": [], "user_query": "plan a trip to goa"})
+
+
+def test_missing_slots_without_question_end_the_turn_with_a_default(monkeypatch):
+    command = _run(monkeypatch, clarify_question_status=True, clarify_question="")
+    assert command.goto == "END"
+    assert command.update["clarify_question"] == DEFAULT_CLARIFY_QUESTION
+    assert command.update["initial_agent_done"] is False
+
+
+def test_models_question_is_kept(monkeypatch):
+    command = _run(monkeypatch, clarify_question_status=True, clarify_question="Which dates? 📅")
+    assert command.goto == "END"
+    assert command.update["clarify_question"] == "Which dates? 📅"
+
+
+def test_complete_slots_route_to_the_worker(monkeypatch):
+    command = _run(monkeypatch, destination_city="Goa", number_of_days=3)
+    assert command.goto == "Iterationagent"
+    assert command.update["initial_agent_done"] is True
@@ -0,0 +1,76 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.utils.routing import improve_route, or_opt, tour_length, two_opt
+
+BUDGET_MS = 1000  # generous, so results don't depend on machine speed
+
+
+def _euclidean(points):
+    p = np.asarray(points, dtype=np.float64)
+    return np.sqrt(((p[:, None, :] - p[None, :, :]) ** 2).sum(axis=2))
+
+
+def _brute_force(dist, closed=True):
+    n = len(dist)
+    return min(tour_length([0, *perm], dist, closed) for perm in itertools.permutations(range(1, n)))
+
+
+def test_shuffled_circle_is_routed_around_the_perimeter():
+    n = 12
+    order = list(range(1, n))
+    random.Random(3).shuffle(order)
+    angles = [0.0] + [2 * math.pi * k / n for k in order]
+    dist = _euclidean([(math.cos(a), math.sin(a)) for a in angles])
+
+    tour, lengths = improve_route(dist, initial=list(range(n)), time_budget_ms=BUDGET_MS)
+
+    assert tour[0] == 0 and sorted(tour) == list(range(n))
+    assert lengths["final"] == pytest.approx(2 * n * math.sin(math.pi / n))
+    assert lengths["final"] <= lengths["seed"] <= lengths["initial"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("closed", [True, False])
+def test_small_instances_match_brute_force(seed, closed):
+    rng = np.random.default_rng(seed)
+    dist = _euclidean(rng.uniform(0, 10, (8, 2)))
+
+    tour, lengths = improve_route(dist, closed=closed, time_budget_ms=BUDGET_MS)
+
+    assert lengths["final"] == pytest.approx(tour_length(tour, dist, closed))
+    assert lengths["final"] <= _brute_force(dist, closed) * 1.02
+
+
+def test_open_path_on_a_line_is_visited_in_order():
+    xs = [0, 5, 1, 4, 2, 3]
+    dist = np.abs(np.subtract.outer(xs, xs)).astype(float)
+
+    tour, lengths = improve_route(dist, initial=list(range(6)), closed=False, time_budget_ms=BUDGET_MS)
+
+    assert [xs[i] for i in tour] == [0, 1, 2, 3, 4, 5]
+    assert lengths["final"] == 5
+
+
+def test_unreachable_legs_are_avoided():
+    dist = _euclidean([(0, 0), (1, 0), (2, 0), (3, 0)])
+    dist[0, 1] = dist[1, 0] = np.inf
+
+    tour, _ = improve_route(dist, time_budget_ms=BUDGET_MS)
+
+    assert tour[1] != 1 and tour[-1] != 1
+
+
+def test_local_moves_keep_the_start_and_never_get_worse():
+    rng = np.random.default_rng(11)
+    dist = _euclidean(rng.uniform(0, 10, (15, 2)))
+    initial = [0, *rng.permutation(range(1, 15)).tolist()]
+
+    for move in (two_opt, or_opt):
+        tour = move(initial, dist)
+        assert tour[0] == 0 and sorted(tour) == list(range(15))
+        assert tour_length(tour, dist) <= tour_length(initial, dist) + 1e-9
@@ -0,0 +1,72 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.agents import planner
+
+
+def _spot(spot_id, lat=15.5, lng=73.8):
+    return {"id": spot_id, "name": spot_id, "rating": 4.5, "lat": lat, "lng": lng}
+
+
+def _run_step2(monkeypatch, results, delays, centre=None, radius_km=None, max_spots=1):
+    searched, cancelled = [], []
+
+    @asynccontextmanager
+    async def fake_session(limit=None):
+        yield None
+
+    async def fake_search(session, query, location):
+        keyword = query.split(" top attractions")[0]
+        searched.append(keyword)
+        try:
+            await asyncio.sleep(delays[keyword])
+        except asyncio.CancelledError:
+            cancelled.append(keyword)
+            raise
+        return results[keyword]
+
+    async def no_snap(anchor, destination):
+        return anchor
+
+    monkeypatch.setattr(planner, "client_session", fake_session)
+    monkeypatch.setattr(planner, "places_text_search", fake_search)
+    monkeypatch.setattr(planner, "destination_centre", lambda destination: centre)
+    monkeypatch.setattr(planner, "snap_to_lodging", no_snap)
+    monkeypatch.setattr(planner, "PLACES_SEARCH_CONCURRENCY", 4)
+
+    output = asyncio.run(planner.run_step2({
+        "destination": "Goa",
+        "max_spots": max_spots,  # run_step2 wants max_spots + 3
+        "search_keywords": {str(n): kw for n, kw in enumerate(results)},
+        "search_radius_km": radius_km,
+        "duration_days": 2,
+    }))
+    return output, searched, cancelled
+
+
+def test_results_follow_keyword_priority_and_later_searches_are_cancelled(monkeypatch):
+    results = {
+        "beaches": [_spot(f"b{n}") for n in range(3)],
+        "forts": [_spot(f"f{n}") for n in range(3)],
+        "markets": [_spot(f"m{n}") for n in range(3)],
+    }
+    # "forts" finishes first, but "beaches" is still consumed first.
+    output, searched, cancelled = _run_step2(monkeypatch, results, {"beaches": 0.05, "forts": 0.0, "markets": 1.0})
+
+    assert [spot["id"] for spot in output["spots"].to_records()] == ["b0", "b1", "b2", "f0"]
+    assert cancelled == ["markets"]
+
+
+def test_out_of_radius_spots_do_not_stop_the_search_early(monkeypatch):
+    goa = (15.5, 73.8)
+    results = {
+        # Same-named places in another state: far outside the radius.
+        "beaches": [_spot(f"far{n}", lat=8.5, lng=76.9) for n in range(4)],
+        "forts": [_spot(f"f{n}") for n in range(4)],
+    }
+    output, searched, cancelled = _run_step2(
+        monkeypatch, results, {"beaches": 0.0, "forts": 0.05}, centre=goa, radius_km=50,
+    )
+
+    assert cancelled == []
+    assert [spot["id"] for spot in output["spots"].to_records()] == ["f0", "f1", "f2", "f3"]
@@ -0,0 +1,46 @@
+import numpy as np
+
+from app.agents.spot_table import SpotTable, day_plan_to_llm_json
+
+RECORDS = [
+    {"id": "p1", "name": "Fort", "lat": 15.5, "lng": 73.8, "rating": 4.5, "types": ["museum"], "open_now": True},
+    {"id": "p2", "name": "Fort", "lat": 16.1, "lng": 73.4, "rating": None, "types": [], "open_now": None},
+    {"id": "p3", "name": "Beach", "lat": 15.2, "lng": 73.9, "rating": 4.2, "types": ["natural_feature"], "open_now": False},
+]
+
+
+def test_records_round_trip_and_unrated_spots_stay_unrated():
+    table = SpotTable.from_records(RECORDS)
+    assert len(table) == 3
+    assert table.to_records() == RECORDS
+    assert np.isnan(table.rating[1])
+    assert table.coords().shape == (3, 2)
+
+
+def test_same_named_spots_are_separate_rows():
+    table = SpotTable.from_records(RECORDS)
+    assert [r["id"] for r in table.to_records() if r["name"] == "Fort"] == ["p1", "p2"]
+
+
+def test_subset_reorders_every_column_including_hotel_legs():
+    table = SpotTable.from_records(RECORDS)
+    table.hotel_km = np.array([1.0, 2.0, 3.0])
+    table.hotel_min = np.array([10.0, 20.0, 30.0])
+
+    picked = table.subset([2, 0])
+
+    assert picked.ids == ["p3", "p1"]
+    assert picked.lat.tolist() == [15.2, 15.5]
+    assert picked.hotel_km.tolist() == [3.0, 1.0]
+    assert picked.hotel_min.tolist() == [30.0, 10.0]
+    assert table.ids == ["p1", "p2", "p3"]  # the source table is untouched
+
+
+def test_llm_payload_skips_empty_days_and_sends_only_name_and_coordinates():
+    table = SpotTable.from_records(RECORDS)
+    hotel = {"lat": 15.4, "lng": 73.8}
+    payload = day_plan_to_llm_json({"spots": table, "days": [[2, 0], [], [1]], "hotel_location": hotel})
+
+    assert list(payload) == ["Day 1", "Day 3", "hotel_location"]
+    assert payload["Day 1"] == [{"name": "Beach", "lat": 15.2, "lng": 73.9}, {"name": "Fort", "lat": 15.5, "lng": 73.8}]
+    assert payload["hotel_location"] == hotel
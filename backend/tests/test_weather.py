@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.external.openweather import weather
+from app.external.openweather.weather import activity_cell, annotate_weather, geohash_centre, geohash_encode
+
+
+def test_geohash_matches_the_reference_encoding():
+    assert geohash_encode(57.64911, 10.40744, precision=11) == "u4pruydqqvj"
+    assert geohash_encode(-33.8688, 151.2093, precision=5) == "r3gx2"
+
+
+@pytest.mark.parametrize("lat, lng", [(15.4909, 73.8278), (-33.8688, 151.2093), (0.0, 0.0), (89.9, -179.9)])
+def test_cell_centre_encodes_back_to_the_same_cell(lat, lng):
+    cell = geohash_encode(lat, lng, precision=5)
+    c_lat, c_lng = geohash_centre(cell)
+    assert geohash_encode(c_lat, c_lng, precision=5) == cell
+    # Precision 5 cells are ~4.9 km x 4.9 km, so the centre is within half a cell.
+    assert abs(c_lat - lat) <= 0.022 and abs(c_lng - lng) <= 0.022
+
+
+def test_activity_cell_accepts_long_or_lng_and_rejects_missing_coordinates():
+    assert activity_cell({"lat": "15.49", "long": "73.82"}) == activity_cell({"lat": 15.49, "lng": 73.82})
+    assert activity_cell({"lat": None, "long": 73.82}) is None
+    assert activity_cell({}) is None
+
+
+def test_annotate_weather_fetches_each_cell_once(monkeypatch):
+    fetched = []
+
+    async def fake_fetch_cell(session, semaphore, cell):
+        fetched.append(cell)
+        return "clear" if cell.startswith("t") else "rainy"
+
+    monkeypatch.setattr(weather, "_fetch_cell", fake_fetch_cell)
+    monkeypatch.setattr(weather, "_weather_cache", weather.TieredCache("test_weather", persistent=False))
+
+    activities = [
+        {"lat": 15.4909, "long": 73.8278},
+        {"lat": 15.4910, "long": 73.8280},  # same ~5 km cell
+        {"lat": -33.8688, "lng": 151.2093},
+        {"spot_name": "No coordinates"},
+    ]
+    asyncio.run(annotate_weather(activities, session=object()))
+    asyncio.run(annotate_weather([dict(activities[0])], session=object()))
+
+    assert len(fetched) == 2
+    assert [a["weather"] for a in activities] == ["clear", "clear", "rainy", "unknown"]
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from app.external.openweather import weather
+from app.external.openweather.weather import annotate_weather, prefetch_weather
+
+
+def _slow_weather(monkeypatch, delay):
+    fetched = []
+
+    async def fake_fetch_cell(session, semaphore, cell):
+        fetched.append(cell)
+        await asyncio.sleep(delay)
+        return "clear"
+
+    monkeypatch.setattr(weather, "_fetch_cell", fake_fetch_cell)
+    monkeypatch.setattr(weather, "_weather_cache", weather.TieredCache("test_prefetch", persistent=False))
+    return fetched
+
+
+SPOTS = [(15.49, 73.82), (15.55, 73.75), (15.60, 73.90)]
+
+
+def test_enrichment_after_the_prefetch_is_served_from_cache(monkeypatch):
+    fetched = _slow_weather(monkeypatch, 0.0)
+    prefetch_weather(SPOTS).result(timeout=5)
+
+    activities = [{"lat": lat, "lng": lng} for lat, lng in SPOTS]
+    asyncio.run(annotate_weather(activities, session=object()))
+
+    assert len(fetched) == 3
+    assert {a["weather"] for a in activities} == {"clear"}
+
+
+def test_enrichment_during_the_prefetch_joins_its_requests(monkeypatch):
+    fetched = _slow_weather(monkeypatch, 0.3)
+    future = prefetch_weather(SPOTS)
+    time.sleep(0.05)  # the prefetch requests are now in flight
+
+    # One spot the formatter added on its own.
+    activities = [{"lat": lat, "lng": lng} for lat, lng in SPOTS] + [{"lat": 15.30, "lng": 74.10}]
+    asyncio.run(annotate_weather(activities, session=object()))
+    future.result(timeout=5)
+
+    assert len(fetched) == 4
+    assert [a["weather"] for a in activities] == ["clear"] * 4